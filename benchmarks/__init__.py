@@ -0,0 +1,7 @@
+"""Offline benchmarks. Like the tests, they're part of the repo's package, so
+run them from the directory above the repo's (named trademe, as cloned), e.g.:
+
+    python -m trademe.benchmarks.parsing
+
+None of them touch TradeMe, so they're repeatable.
+"""
@@ -0,0 +1,134 @@
+"""Benchmarks search() end to end, against a local ReplayServer.
+
+Searches a batch of generated multi-page URLs with each number of workers,
+and reports pages/sec and listings/sec, as well as any listings lost along
+the way (e.g. to injected errors that weren't retried). e.g.
+
+    python -m trademe.benchmarks.crawl --workers 1 2 4 --latency 0.1
+    python -m trademe.benchmarks.crawl --error-rate 0.1 --retries 3
+    python -m trademe.benchmarks.crawl --fetcher selenium  # Needs Chrome.
+"""
+
+
+import argparse
+import sys
+import time
+
+from ..trademe.fetchers import HTTPFetcher, SeleniumFetcher
+from ..trademe.search import make_url, search
+from ..trademe.throttle import ThrottledFetcher
+from .replay_server import ReplayServer, generated_site
+
+
+# Public methods: -------------------------------------------------------------
+
+
+def run(
+        server,
+        num_urls=4,
+        workers=1,
+        prefetch=0,
+        fetcher="http",
+        retries=0,
+        backoff=0.01
+        ):
+    """Searches num_urls of the server's URLs, timing it.
+
+    Args:
+        server: A started ReplayServer, serving generated_site() pages.
+        num_urls: Number of URLs searched.
+        workers: search()'s max_workers.
+        prefetch: search()'s prefetch.
+        fetcher: "http" or "selenium".
+        retries: Times failed fetches are retried.
+        backoff: Base seconds to wait before retrying; see ThrottledFetcher.
+
+    Returns:
+        A dict with the number of "pages" and "listings" scraped,
+        "requests" made, "errors" injected, and "seconds" taken.
+    """
+    urls = [server.url(make_url("sale", id=i)) for i in range(1, num_urls + 1)]
+    connections = workers * max(prefetch, 1)
+    if fetcher == "http":
+        base_fetcher = HTTPFetcher(pool_maxsize=connections)
+    else:
+        # Owns its pool, so closing it quits the browsers:
+        base_fetcher = SeleniumFetcher(size=connections)
+    if retries:
+        base_fetcher = ThrottledFetcher(base_fetcher, retries=retries,
+                                        backoff=backoff)
+
+    requests_before = server.requests
+    errors_before = server.errors
+    pages = set()
+    start = time.perf_counter()
+    try:
+        listings = search(None, [], *urls, max_workers=workers,
+                          prefetch=prefetch, fetcher=base_fetcher)
+    finally:
+        seconds = time.perf_counter() - start
+        base_fetcher.close()
+
+    for listing in listings:
+        # Generated listing IDs are the URL's id, page, then card number:
+        pages.add(listing.listing_id[:-3])
+    return {
+        "pages": len(pages),
+        "listings": len(listings),
+        "requests": server.requests - requests_before,
+        "errors": server.errors - errors_before,
+        "seconds": seconds,
+    }
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    arg_parser.add_argument("--urls", type=int, default=4,
+                            help="Number of URLs searched.")
+    arg_parser.add_argument("--pages", type=int, default=10,
+                            help="Pages of results per URL.")
+    arg_parser.add_argument("--cards", type=int, default=22,
+                            help="Listings per page.")
+    arg_parser.add_argument("--workers", type=int, nargs="+", default=[1, 4],
+                            help="max_workers values to try.")
+    arg_parser.add_argument("--prefetch", type=int, default=0)
+    arg_parser.add_argument("--fetcher", choices=["http", "selenium"],
+                            default="http")
+    arg_parser.add_argument("--latency", type=float, default=0.05,
+                            help="Seconds each response is delayed by.")
+    arg_parser.add_argument("--jitter", type=float, default=0.0,
+                            help="Most extra seconds added to latency.")
+    arg_parser.add_argument("--error-rate", type=float, default=0.0,
+                            help="Fraction of responses that are errors.")
+    arg_parser.add_argument("--retries", type=int, default=0)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args(argv)
+
+    expected = args.urls * args.pages * args.cards
+    site = generated_site(args.pages, cards_per_page=args.cards)
+    print(f"{'workers':>8}{'seconds':>10}{'pages/sec':>12}"
+          f"{'listings/sec':>14}{'requests':>10}{'errors':>8}{'lost':>8}")
+    lost_any = False
+    with ReplayServer(site, latency=args.latency, jitter=args.jitter,
+                      error_rate=args.error_rate, seed=args.seed) as server:
+        for workers in args.workers:
+            try:
+                stats = run(server, args.urls, workers, args.prefetch,
+                            args.fetcher, args.retries)
+            except Exception as e:  # e.g. an injected error, not retried.
+                print(f"{workers:>8}  failed: {e}")
+                lost_any = True
+                continue
+            lost = expected - stats["listings"]
+            lost_any = lost_any or lost > 0
+            print(
+                f"{workers:>8}{stats['seconds']:>9.2f}s"
+                f"{stats['pages'] / stats['seconds']:>12.1f}"
+                f"{stats['listings'] / stats['seconds']:>14.1f}"
+                f"{stats['requests']:>10}{stats['errors']:>8}{lost:>8}"
+            )
+    return 1 if lost_any else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+"""Page sources for the benchmarks, built from the tests' saved html fixtures.
+
+The fixtures are found relative to this file, so it works wherever the
+benchmarks are run from. tests/fakes.py imports these too, so the tests and
+benchmarks use the same pages.
+"""
+
+
+from pathlib import Path
+
+
+FIXTURES_DIR = Path(__file__).resolve().parent.parent / "tests" / "html"
+
+FIXTURES = sorted(path.name for path in FIXTURES_DIR.glob("*.html"))
+
+NO_RESULTS_PAGE = """<html><body>
+<h2 class="tm-no-results__heading">No results found</h2>
+</body></html>"""
+
+# The fixtures' listing IDs, swapped out by make_card():
+FIXTURE_IDS = ("4324246903", "4332904134", "4117008125", "4324065029",
+               "4331757012", "3888296961")
+
+
+# Public methods: -------------------------------------------------------------
+
+
+def make_results_page(cards, result_count=None):
+    """Wraps card html strings in a page, the way search results are."""
+    heading = ""
+    if result_count is not None:
+        heading = (f'<h3 class="tm-search-header-result-count__heading">'
+                   f'Showing {result_count:,} results</h3>')
+    return "<html><body>" + heading + "<div>" + "".join(cards) + \
+        "</div></body></html>"
+
+
+def make_card(fixture, listing_id):
+    """Returns a fixture card's html, with its listing ID swapped out."""
+    card = (FIXTURES_DIR / fixture).read_text()
+    for old_id in FIXTURE_IDS:
+        card = card.replace(old_id, str(listing_id))
+    return card
@@ -0,0 +1,283 @@
+"""Benchmarks parsing saved pages, with each parser, against a baseline.
+
+Pages are the tests/html fixtures (one card per page), plus a synthetic page
+of a few hundred cards cycling through every fixture. For each parser, it
+reports:
+- listings/sec: cards turned into Listings per second, parsing included.
+- parse and extract time: _make_soup() vs _page_soup_to_listings().
+- peak memory: the most memory (traced by tracemalloc) parsing the
+  synthetic page and extracting its listings took.
+It also reports each field's extraction cost, per listing type: the time to
+extract just that field from a card, on its own.
+
+Results are compared against baseline.json (next to this file), and anything
+worse than the baseline by more than --tolerance is flagged as a regression
+(and the exit code is 1). Timings depend on the machine, so the baseline isn't
+committed: save your own first, on a quiet machine (single field costs
+especially jump around on a busy one), then compare against it:
+
+    python -m trademe.benchmarks.parsing --save-baseline  # Before a change.
+    python -m trademe.benchmarks.parsing                  # After it.
+"""
+
+
+import argparse
+import importlib.util
+import itertools
+import json
+import sys
+import time
+import timeit
+import tracemalloc
+from pathlib import Path
+
+from ..trademe import constants
+from ..trademe.extraction import ExtractionSpec
+from ..trademe.search import PARSERS, _make_soup, _page_soup_to_listings
+from .pages import FIXTURES, make_card, make_results_page
+
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+# Listing tag -> its fields, for per-field costs:
+LISTING_FIELDS = {
+    constants.SUPER_FEATURE_TAG: constants.SUPER_FEATURE_FIELDS,
+    constants.PREMIUM_TAG: constants.PREMIUM_FIELDS,
+    constants.NORMAL_TAG: constants.NORMAL_FIELDS,
+}
+
+
+# Public methods: -------------------------------------------------------------
+
+
+def make_pages(cards_per_page=300):
+    """Returns a dict of page name: page source to benchmark.
+
+    Args:
+        cards_per_page: Number of cards on the synthetic page.
+    """
+    pages = {
+        fixture: make_results_page([make_card(fixture, 1)])
+        for fixture in FIXTURES
+    }
+    cards = (
+        make_card(fixture, listing_id)
+        for listing_id, fixture in zip(range(cards_per_page),
+                                       itertools.cycle(FIXTURES))
+    )
+    pages["synthetic"] = make_results_page(cards)
+    return pages
+
+
+def run(pages, parsers=None, repeat=3, min_field_time=0.2):
+    """Benchmarks parsing pages with each parser.
+
+    Args:
+        pages: Dict of page name: page source, e.g. from make_pages().
+        parsers: Parsers to benchmark. None means every installed one.
+        repeat: Number of times each page is timed; the fastest is used.
+        min_field_time: Least seconds each field's timed for, each repeat.
+
+    Returns:
+        A dict of results, in the same format as baseline.json:
+        {"parsers": {parser: {...}}, "fields": {listing tag: {field:
+        seconds per card}}}.
+    """
+    if parsers is None:
+        parsers = [parser for parser in PARSERS if _is_installed(parser)]
+
+    results = {"parsers": {}, "fields": {}}
+    for parser in parsers:
+        parse_time = extract_time = 0
+        num_listings = 0
+        for page_source in pages.values():
+            page_parse_time, page_extract_time, listings = _time_page(
+                page_source, parser, repeat
+            )
+            parse_time += page_parse_time
+            extract_time += page_extract_time
+            num_listings += len(listings)
+
+        results["parsers"][parser] = {
+            "listings": num_listings,
+            "listings_per_sec": num_listings / (parse_time + extract_time),
+            "parse_time": parse_time,
+            "extract_time": extract_time,
+            "peak_memory": _peak_memory(pages["synthetic"], parser),
+        }
+
+    # Field costs don't depend on the parser much, so just use the default:
+    results["fields"] = _field_costs(
+        _make_soup(pages["synthetic"]), repeat, min_field_time
+    )
+    return results
+
+
+def compare(results, baseline, tolerance=0.3):
+    """Compares results against a baseline.
+
+    Args:
+        results: Dict from run().
+        baseline: Dict from run(), e.g. loaded from baseline.json.
+        tolerance: Fraction worse than the baseline a result can be.
+
+    Returns:
+        A list of regression messages; empty if there are none.
+    """
+    regressions = []
+    for parser, stats in results["parsers"].items():
+        base = baseline["parsers"].get(parser)
+        if base is None:
+            continue
+        if stats["listings_per_sec"] < \
+                base["listings_per_sec"] * (1 - tolerance):
+            regressions.append(
+                f"{parser}: {stats['listings_per_sec']:,.0f} listings/sec, "
+                f"down from {base['listings_per_sec']:,.0f}."
+            )
+        if stats["peak_memory"] > base["peak_memory"] * (1 + tolerance):
+            regressions.append(
+                f"{parser}: {_mib(stats['peak_memory'])} peak memory, up "
+                f"from {_mib(base['peak_memory'])}."
+            )
+
+    for tag, costs in results["fields"].items():
+        for field, cost in costs.items():
+            base_cost = baseline["fields"].get(tag, {}).get(field)
+            if base_cost is not None and cost > base_cost * (1 + tolerance):
+                regressions.append(
+                    f"{tag} {field}: {_us(cost)} per card, up from "
+                    f"{_us(base_cost)}."
+                )
+    return regressions
+
+
+def report(results):
+    """Returns results as a printable table."""
+    lines = [
+        f"{'parser':<12}{'listings/sec':>14}{'parse':>10}{'extract':>10}"
+        f"{'peak mem':>12}"
+    ]
+    for parser, stats in results["parsers"].items():
+        lines.append(
+            f"{parser:<12}{stats['listings_per_sec']:>14,.0f}"
+            f"{stats['parse_time']:>9.3f}s{stats['extract_time']:>9.3f}s"
+            f"{_mib(stats['peak_memory']):>12}"
+        )
+    for tag, costs in results["fields"].items():
+        lines.append("")
+        lines.append(f"{tag} (per card):")
+        for field, cost in costs.items():
+            lines.append(f"  {field:<24}{_us(cost):>10}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    arg_parser.add_argument("--cards", type=int, default=300,
+                            help="Cards on the synthetic page.")
+    arg_parser.add_argument("--repeat", type=int, default=3,
+                            help="Times each page is timed.")
+    arg_parser.add_argument("--parser", action="append", choices=PARSERS,
+                            help="Parser to benchmark (default: all).")
+    arg_parser.add_argument("--tolerance", type=float, default=0.3,
+                            help="Fraction worse than the baseline allowed.")
+    arg_parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    arg_parser.add_argument("--save-baseline", action="store_true",
+                            help="Save results as the new baseline.")
+    args = arg_parser.parse_args(argv)
+
+    results = run(make_pages(args.cards), parsers=args.parser,
+                  repeat=args.repeat)
+    print(report(results))
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"\nSaved baseline to {args.baseline}.")
+        return 0
+    if not args.baseline.exists():
+        print(f"\nNo baseline at {args.baseline}; save one with "
+              f"--save-baseline.")
+        return 0
+
+    regressions = compare(
+        results, json.loads(args.baseline.read_text()), args.tolerance
+    )
+    if not regressions:
+        print("\nNo regressions against the baseline.")
+        return 0
+    print("\nRegressions against the baseline:")
+    for regression in regressions:
+        print(f"  {regression}")
+    return 1
+
+
+# Private helper methods: -----------------------------------------------------
+
+
+def _is_installed(parser):
+    return parser == "html.parser" or \
+        importlib.util.find_spec(parser) is not None
+
+
+def _time_page(page_source, parser, repeat):
+    """Returns (parse time, extract time, listings) for a page: the fastest
+    of `repeat` runs of each.
+    """
+    parse_times = []
+    extract_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        page_soup = _make_soup(page_source, parser=parser)
+        parsed = time.perf_counter()
+        listings = _page_soup_to_listings(page_soup)
+        extracted = time.perf_counter()
+        parse_times.append(parsed - start)
+        extract_times.append(extracted - parsed)
+    return min(parse_times), min(extract_times), listings
+
+
+def _peak_memory(page_source, parser):
+    """Returns the peak bytes traced parsing a page and extracting it."""
+    tracemalloc.start()
+    try:
+        _page_soup_to_listings(_make_soup(page_source, parser=parser))
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _field_costs(page_soup, repeat, min_time):
+    """Returns {listing tag: {field: seconds per card}}.
+
+    Each field's timed with an ExtractionSpec of just that field, so it's
+    the cost of walking a card as far as that field's tags, and getting it.
+    """
+    costs = {}
+    for tag, fields in LISTING_FIELDS.items():
+        cards = page_soup.find_all(tag)
+        if not cards:
+            continue
+        costs[tag] = {}
+        for field, selectors in fields.items():
+            spec = ExtractionSpec({field: selectors})
+            timer = timeit.Timer(lambda: [spec.extract(c) for c in cards])
+            # Single fields are quick, so loop enough to time them properly:
+            number = 1
+            while timer.timeit(number) < min_time:
+                number *= 2
+            fastest = min(timer.repeat(repeat, number))
+            costs[tag][field] = fastest / number / len(cards)
+    return costs
+
+
+def _mib(num_bytes):
+    return f"{num_bytes / 2**20:.1f} MiB"
+
+
+def _us(seconds):
+    return f"{seconds * 1e6:.1f} us"
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""Contains ReplayServer, a local stand-in for TradeMe's search pages.
+
+It serves make_url()-shaped paths (e.g. /a/property/residential/sale/
+wellington/search?page=2) from a site function, which takes the TradeMe URL
+the path would've been and returns its page source:
+- generated_site(): made-up pages of fixture cards, then "No results found".
+- recorded_site(): pages recorded from TradeMe. To record some, search with a
+  cache directory once, e.g. search(None, [], url, cache="recorded"), which
+  saves every page fetched (including the last "No results found" one).
+Responses can be slowed down (latency) and made to fail (error injection), to
+see how search() copes. Point search() at it with server.url(make_url(...)).
+
+Usage:
+    with ReplayServer(generated_site(num_pages=5), latency=0.05) as server:
+        listings = search(None, [], server.url(make_url("sale")),
+                          fetcher="http")
+"""
+
+
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from ..trademe.cache import PageCache
+from ..trademe.constants import TM_BASE_URL
+from ..trademe.search import _get_page_url, _get_page_number
+from .pages import NO_RESULTS_PAGE, make_card, make_results_page
+
+
+class ReplayServer:
+    """Serves pages from a site function over HTTP, on a background thread.
+
+    Attributes:
+        base_url: The server's URL, e.g. "http://127.0.0.1:49152".
+        requests: Number of requests served so far (errors included).
+        errors: Number of those that were injected errors.
+    """
+
+    def __init__(
+            self,
+            site,
+            latency=0.0,
+            jitter=0.0,
+            error_rate=0.0,
+            error_status=503,
+            seed=None,
+            host="127.0.0.1",
+            port=0
+            ):
+        """
+        Args:
+            site: Function taking a TradeMe URL, and returning its page source,
+                or None for a 404.
+            latency: Seconds each response is delayed by.
+            jitter: Most extra seconds (chosen at random) added to latency.
+            error_rate: Fraction of requests answered with error_status
+                instead of the page.
+            error_status: HTTP status of injected errors.
+            seed: Optional seed for the jitter and errors, so runs repeat.
+            host: Address to listen on.
+            port: Port to listen on. 0 picks a free one.
+        """
+        self.site = site
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self.errors = 0
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+        host, port = self._server.server_address[:2]
+        self.base_url = f"http://{host}:{port}"
+
+
+    def __enter__(self):
+        self.start()
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    def start(self):
+        """Starts serving, on a background thread."""
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        )
+        self._thread.start()
+
+
+    def close(self):
+        """Stops serving."""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+        self._server.server_close()
+
+
+    def url(self, trademe_url):
+        """Returns the server's URL for a TradeMe URL, e.g. from make_url()."""
+        parsed = urlparse(trademe_url)
+        return parsed._replace(scheme="http",
+                               netloc=urlparse(self.base_url).netloc).geturl()
+
+
+    def _respond(self, path):
+        """Returns (status, page source) for a request's path."""
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            failed = self._random.random() < self.error_rate
+            if failed: self.errors += 1
+
+        if delay:
+            time.sleep(delay)
+        if failed:
+            return self.error_status, ""
+        page_source = self.site(TM_BASE_URL + path)
+        if page_source is None:
+            return 404, ""
+        return 200, page_source
+
+
+# Public methods: -------------------------------------------------------------
+
+
+def generated_site(num_pages, cards_per_page=22, show_count=True):
+    """Returns a site function of made-up pages.
+
+    Each URL gets num_pages of sale_normal cards, then "No results found".
+    Listing IDs are the URL's "id" query parameter (1 if it hasn't got one),
+    then the page and card numbers, 3 digits each. If show_count, pages show
+    the total number of results.
+    """
+    def page_source(url):
+        page = _get_page_number(url)
+        if page > num_pages:
+            return NO_RESULTS_PAGE
+        url_id = parse_qs(urlparse(url).query).get("id", ["1"])[0]
+        return make_results_page(
+            (make_card("sale_normal.html", f"{url_id}{page:03d}{card:03d}")
+             for card in range(cards_per_page)),
+            result_count=num_pages * cards_per_page if show_count else None
+        )
+
+    return page_source
+
+
+def recorded_site(directory):
+    """Returns a site function serving pages recorded in a cache directory.
+
+    Pages past the last one recorded for a search say "No results found";
+    searches that weren't recorded at all get a 404.
+
+    Args:
+        directory: A PageCache directory, e.g. from search(..., cache=...).
+    """
+    cache = PageCache(directory, ttl=float("inf"))
+
+    def page_source(url):
+        entry = cache.get(url)
+        if entry is not None:
+            return entry.page_source
+        recorded = cache.get(_get_page_url(url, 1)) is not None
+        if _get_page_number(url) > 1 and recorded:
+            return NO_RESULTS_PAGE
+        return None
+
+    return page_source
+
+
+# Private helper methods: -----------------------------------------------------
+
+
+def _make_handler(server):
+    """Returns a request handler class serving from a ReplayServer."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive, like TradeMe.
+
+        def do_GET(self):
+            status, page_source = server._respond(self.path)
+            body = page_source.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Quiet, since benchmarks make lots of requests.
+
+    return Handler
@@ -10,6 +10,14 @@ setuptools.setup(
     url="https://github.com/comprende-prod/trademe",
     license="GNU GPLv3",
     packages=["trademe"],
-    install_requires=["selenium", "bs4", "urllib3", "dataclasses"]
+    python_requires=">=3.10",
+    install_requires=["selenium", "bs4", "urllib3", "dataclasses", "requests"],
+    extras_require={
+        "async": ["aiohttp"],
+        "lxml": ["lxml"],
+        "html5lib": ["html5lib"],
+        "parquet": ["pyarrow"],
+        "pandas": ["pandas"]
+    }
 )
 
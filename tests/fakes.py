@@ -0,0 +1,164 @@
+"""Fakes shared between tests, so Chrome and TradeMe aren't needed."""
+
+
+import asyncio
+import time
+import requests
+from selenium.common.exceptions import WebDriverException
+# Page sources are shared with the benchmarks, so the two can't drift apart:
+from ..benchmarks.pages import (
+    NO_RESULTS_PAGE, make_card, make_results_page
+)
+from ..benchmarks.replay_server import generated_site
+
+
+UNRENDERED_PAGE = "<html><body><app-root></app-root></body></html>"
+
+
+def paged_site(num_pages, cards_per_page=3, show_count=False):
+    """Returns a page_source function for FakeDriver.
+
+    Each URL gets num_pages of sale_normal cards, with IDs built from the
+    URL's "id" query parameter and the page number. If show_count, pages
+    show the total number of results. See replay_server.generated_site().
+    """
+    return generated_site(num_pages, cards_per_page=cards_per_page,
+                          show_count=show_count)
+
+
+class FakeDriver:
+    """Stands in for webdriver.Chrome.
+
+    Set FakeDriver.site to a function from URL to page source, and 
+    FakeDriver.render_delay to the seconds pages take to render (before which
+    they're an empty JavaScript shell).
+    """
+    started = 0
+    site = staticmethod(lambda url: NO_RESULTS_PAGE)
+    render_delay = 0
+
+    def __init__(self, options=None):
+        FakeDriver.started += 1
+        self.options = options
+        self.alive = True
+        self.quit_called = False
+        self.url = None
+        self._page_source = None
+        self._loaded_at = 0
+        self.cdp_commands = []
+
+    def implicitly_wait(self, timeout):
+        self.timeout = timeout
+
+    def get(self, url):
+        self.url = url
+        self._page_source = None
+        self._loaded_at = time.monotonic()
+
+    @property
+    def page_source(self):
+        if time.monotonic() - self._loaded_at < FakeDriver.render_delay:
+            return UNRENDERED_PAGE
+        # Once per get(), like a real page load:
+        if self._page_source is None:
+            self._page_source = FakeDriver.site(self.url)
+        return self._page_source
+
+    def find_elements(self, by, selector):
+        """Finds anything (in a rendered page) for SeleniumFetcher's wait."""
+        page_source = self.page_source
+        if any(f"<{tag.split('.')[0]}" in page_source and 
+               tag.split(".")[-1] in page_source
+               for tag in selector.split(", ")):
+            return [object()]
+        return []
+
+    def execute_cdp_cmd(self, command, args):
+        self.cdp_commands.append((command, args))
+
+    @property
+    def current_url(self):
+        if not self.alive:
+            raise WebDriverException("Browser crashed.")
+        return self.url or "about:blank"
+
+    def quit(self):
+        self.quit_called = True
+
+
+class FakeResponse:
+    def __init__(self, text, status_code=200, headers=None):
+        self.text = text
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error")
+
+
+class FakeSession:
+    """Stands in for requests.Session, serving pages from a site function.
+    
+    If etag is given, pages have that ETag, and requests for it get a 304.
+    """
+
+    def __init__(self, site, etag=None):
+        self.site = site
+        self.etag = etag
+        self.requested = []
+
+    def get(self, url, timeout=None, headers=None):
+        self.requested.append(url)
+        if self.etag and (headers or {}).get("If-None-Match") == self.etag:
+            return FakeResponse("", status_code=304)
+        etag_headers = {"ETag": self.etag} if self.etag else {}
+        return FakeResponse(self.site(url), headers=etag_headers)
+
+    def close(self):
+        pass
+
+
+class FakeAsyncResponse:
+    def __init__(self, text):
+        self._text = text
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    def raise_for_status(self):
+        pass
+
+    async def text(self):
+        return self._text
+
+
+class FakeAsyncSession:
+    """Stands in for aiohttp.ClientSession, serving pages from a site function.
+
+    Keeps track of the most requests in flight at once.
+    """
+
+    def __init__(self, site):
+        self.site = site
+        self.requested = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def get(self, url):
+        self.requested.append(url)
+        session = self
+
+        class Response(FakeAsyncResponse):
+            async def __aenter__(self):
+                session.in_flight += 1
+                session.max_in_flight = max(session.max_in_flight, 
+                                            session.in_flight)
+                await asyncio.sleep(0.001)
+                session.in_flight -= 1
+                return self
+
+        return Response(self.site(url))
@@ -0,0 +1,68 @@
+"""Test async_search(), against a fake aiohttp session."""
+
+
+import asyncio
+import pytest
+from ..trademe.async_search import async_search
+from .fakes import FakeAsyncSession, UNRENDERED_PAGE, paged_site
+
+
+urls = [f"https://www.trademe.co.nz/a/property/residential/sale/search?id={i}" 
+        for i in range(1, 6)]
+
+
+def collect(*urls, **kwargs):
+    async def main():
+        return [listing async for listing in async_search(*urls, **kwargs)]
+    return asyncio.run(main())
+
+
+def test_finds_every_listing():
+    session = FakeAsyncSession(paged_site(num_pages=2))
+    listings = collect(*urls, session=session)
+    assert len(listings) == 5 * 2 * 3
+    assert len(set(l.link for l in listings)) == len(listings)
+    assert len(session.requested) == 5 * 3  # Including "No results" pages.
+
+
+def test_bounds_concurrency():
+    session = FakeAsyncSession(paged_site(num_pages=2))
+    collect(*urls, session=session, max_concurrency=2)
+    assert session.max_in_flight == 2
+
+
+def test_stops_early():
+    session = FakeAsyncSession(paged_site(num_pages=50))
+    async def main():
+        results = async_search(urls[0], session=session)
+        await results.__anext__()
+        await results.aclose()
+    asyncio.run(main())
+    assert len(session.requested) < 50
+
+
+def test_slow_consumer_holds_up_fetching():
+    session = FakeAsyncSession(paged_site(num_pages=20))
+    async def main():
+        results = async_search(urls[0], session=session, max_concurrency=2)
+        await results.__anext__()
+        await asyncio.sleep(1)  # Plenty of time to fetch every page.
+        await results.aclose()
+    asyncio.run(main())
+    assert len(session.requested) < 10
+
+
+def test_stops_at_unrendered_page():
+    site = paged_site(num_pages=2)
+    def blocked_site(url):
+        return UNRENDERED_PAGE if url.endswith("page=2") else site(url)
+    session = FakeAsyncSession(blocked_site)
+    assert len(collect(urls[0], session=session)) == 3
+    assert len(session.requested) == 2
+
+
+def test_raises_fetch_errors():
+    def broken_site(url):
+        raise ConnectionError("Site's down.")
+    with pytest.raises(ConnectionError):
+        collect(*urls, session=FakeAsyncSession(broken_site))
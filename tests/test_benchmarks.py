@@ -0,0 +1,36 @@
+"""Tests the parsing benchmark runs, and flags regressions."""
+
+
+import copy
+
+from ..benchmarks.parsing import compare, make_pages, report, run
+
+
+def test_run_counts_every_card():
+    pages = make_pages(cards_per_page=12)
+    results = run(pages, parsers=["html.parser"], repeat=1,
+                  min_field_time=0)
+
+    stats = results["parsers"]["html.parser"]
+    # One card per fixture page, plus the synthetic page's:
+    assert stats["listings"] == len(pages) - 1 + 12
+    assert stats["listings_per_sec"] > 0
+    assert stats["peak_memory"] > 0
+    # Each fixture's type of card shows up on the synthetic page:
+    assert len(results["fields"]) == 3
+    assert "html.parser" in report(results)
+
+
+def test_compare_flags_regressions():
+    results = run(make_pages(cards_per_page=6), parsers=["html.parser"],
+                  repeat=1, min_field_time=0)
+    assert compare(results, results) == []
+
+    baseline = copy.deepcopy(results)
+    baseline["parsers"]["html.parser"]["listings_per_sec"] *= 2
+    baseline["parsers"]["html.parser"]["peak_memory"] /= 2
+    tag, costs = next(iter(baseline["fields"].items()))
+    costs["title"] /= 2
+    regressions = compare(results, baseline)
+    assert len(regressions) == 3
+    assert any(tag in regression for regression in regressions)
@@ -0,0 +1,78 @@
+"""Test PageCache and CachingFetcher."""
+
+
+import os
+import time
+import pytest
+from ..trademe.cache import CachingFetcher, PageCache, normalise_url
+from ..trademe.fetchers import HTTPFetcher
+from ..trademe.search import search
+from .fakes import FakeSession, UNRENDERED_PAGE, paged_site
+
+
+url = "https://www.trademe.co.nz/a/property/residential/sale/search?id=1"
+
+
+@pytest.mark.parametrize(
+    "url_1, url_2",
+    [
+        (
+            "https://www.trademe.co.nz/a/property/residential/sale/wellington/"
+            "listing/1?rsqid=abc-001",
+            "https://www.trademe.co.nz/a/property/residential/sale/wellington/"
+            "listing/1?rsqid=def-002",
+        ),
+        (
+            "https://www.TradeMe.co.nz/a/property/residential/sale/Wellington/"
+            "search?price_min=1&bedrooms_min=2",
+            "https://www.trademe.co.nz/a/property/residential/sale/wellington/"
+            "search?bedrooms_min=2&price_min=1&page=1",
+        ),
+    ]
+)
+def test_normalise_url(url_1, url_2):
+    assert normalise_url(url_1) == normalise_url(url_2)
+
+
+def test_normalise_url_keeps_pages_apart():
+    assert normalise_url(url + "&page=2") != normalise_url(url + "&page=3")
+
+
+def test_fresh_pages_not_refetched(tmp_path):
+    session = FakeSession(paged_site(num_pages=2))
+    fetcher = HTTPFetcher(session=session)
+    for _ in range(3):
+        search(None, [], url, fetcher=fetcher, cache=tmp_path)
+    assert len(session.requested) == 3  # 2 pages + "No results", once.
+
+
+def test_stale_pages_revalidated(tmp_path):
+    session = FakeSession(paged_site(num_pages=2), etag='"v1"')
+    cache = PageCache(tmp_path, ttl=0)
+    fetcher = CachingFetcher(HTTPFetcher(session=session), cache)
+
+    first = fetcher.fetch(url)
+    assert fetcher.fetch(url) == first
+    assert len(session.requested) == 2  # Stale, so asked again...
+    assert cache.get(url).etag == '"v1"'  # ...but got a 304.
+
+
+def test_unrendered_pages_not_cached(tmp_path):
+    session = FakeSession(lambda url: UNRENDERED_PAGE)
+    cache = PageCache(tmp_path)
+    fetcher = CachingFetcher(HTTPFetcher(session=session), cache)
+
+    assert fetcher.fetch(url) == UNRENDERED_PAGE
+    assert cache.get(url) is None
+    fetcher.fetch(url)
+    assert len(session.requested) == 2
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = PageCache(tmp_path, max_bytes=10_000)
+    page = os.urandom(3000).hex()  # Doesn't compress much.
+    for i in range(4):
+        cache.put(f"{url}&page={i + 2}", page)
+        time.sleep(0.01)
+    assert cache.get(f"{url}&page=2") is None
+    assert cache.get(f"{url}&page=5").page_source == page
@@ -0,0 +1,150 @@
+"""Test resuming searches from a Checkpoint journal."""
+
+
+import pytest
+from ..trademe.checkpoint import Checkpoint
+from ..trademe.fetchers import HTTPFetcher
+from ..trademe.listing import Listing
+from ..trademe.search import search, iter_search
+from .fakes import FakeSession, make_results_page, paged_site
+
+
+urls = [f"https://www.trademe.co.nz/a/property/residential/sale/search?id={i}" 
+        for i in range(1, 4)]
+
+
+def crashing_site(crash_at):
+    """paged_site(3), which raises for one URL."""
+    site = paged_site(num_pages=3)
+
+    def page_source(url):
+        if url == crash_at:
+            raise ConnectionError("Chrome crashed.")
+        return site(url)
+    return page_source
+
+
+def run(site, journal, **kwargs):
+    session = FakeSession(site)
+    listings = search(None, [], *urls, fetcher=HTTPFetcher(session=session),
+                      resume=journal, **kwargs)
+    return listings, session.requested
+
+
+@pytest.mark.parametrize("prefetch", [0, 2])
+def test_resumes_after_crash(tmp_path, prefetch):
+    journal = tmp_path / "journal.jsonl"
+    expected, _ = run(paged_site(num_pages=3), tmp_path / "other.jsonl")
+
+    with pytest.raises(ConnectionError):
+        run(crashing_site(urls[1] + "&page=3"), journal, prefetch=prefetch)
+
+    listings, requested = run(paged_site(num_pages=3), journal, 
+                              prefetch=prefetch)
+    assert listings == expected
+    assert urls[0] not in requested  # Finished, so not fetched again.
+    assert urls[1] not in requested  # Pages 1 and 2 were journalled...
+    assert urls[1] + "&page=3" in requested  # ...so carry on from page 3.
+    assert urls[2] in requested
+
+
+def test_finished_search_fetches_nothing(tmp_path):
+    journal = tmp_path / "journal.jsonl"
+    expected, _ = run(paged_site(num_pages=3), journal)
+    listings, requested = run(paged_site(num_pages=3), journal)
+    assert listings == expected
+    assert requested == []
+
+
+def test_iter_search_resumes(tmp_path):
+    journal = tmp_path / "journal.jsonl"
+    fetcher = HTTPFetcher(session=FakeSession(paged_site(num_pages=3)))
+    listings = iter_search(*urls, fetcher=fetcher, resume=journal)
+    first_listings = [next(listings) for _ in range(4)]  # Into page 2...
+    listings.close()  # ...then stop.
+
+    session = FakeSession(paged_site(num_pages=3))
+    resumed = list(iter_search(*urls, fetcher=HTTPFetcher(session=session),
+                               resume=journal))
+    assert resumed[:4] == first_listings
+    assert len(resumed) == 27
+    assert urls[0] + "&page=3" in session.requested
+    assert urls[0] not in session.requested
+
+
+def test_ignores_cut_off_line(tmp_path):
+    journal = tmp_path / "journal.jsonl"
+    with Checkpoint(journal) as checkpoint:
+        checkpoint.record_page(urls[0], 1, [Listing(title="A")])
+    with open(journal, "a") as f:
+        f.write('{"url": "https://www.trademe.co.nz/", "pa')  # Crashed.
+
+    with Checkpoint(journal) as checkpoint:
+        assert checkpoint.pages(urls[0] + "&rsqid=1") == \
+            [(1, [Listing(title="A")])]
+        checkpoint.record_done(urls[0])
+    with Checkpoint(journal) as checkpoint:
+        assert checkpoint.is_done(urls[0])
+
+
+def test_new_pages_not_kept_in_memory(tmp_path):
+    with Checkpoint(tmp_path / "journal.jsonl") as checkpoint:
+        checkpoint.record_page(urls[0], 1, [Listing(title="A")])
+        assert checkpoint.pages(urls[0]) == []  # Only on disk...
+    with Checkpoint(tmp_path / "journal.jsonl") as checkpoint:
+        assert checkpoint.pages(urls[0]) == [(1, [Listing(title="A")])]
+
+
+def resume_single(site, start_url, crash_at, journal, **kwargs):
+    """Searches start_url, crashing at one page, then resumes it.
+
+    Returns:
+        A tuple of (clean run's listings, resumed run's listings, URLs the
+        resumed run fetched).
+    """
+    expected = search(None, [], start_url,
+                      fetcher=HTTPFetcher(session=FakeSession(site)))
+
+    def crashing_site(url):
+        if url == crash_at:
+            raise ConnectionError("Chrome crashed.")
+        return site(url)
+    with pytest.raises(ConnectionError):
+        search(None, [], start_url, resume=journal, 
+               fetcher=HTTPFetcher(session=FakeSession(crashing_site)), 
+               **kwargs)
+
+    session = FakeSession(site)
+    resumed = search(None, [], start_url, resume=journal, 
+                     fetcher=HTTPFetcher(session=session), **kwargs)
+    return expected, resumed, session.requested
+
+
+@pytest.mark.parametrize("prefetch", [0, 2])
+def test_resumes_url_starting_past_page_one(tmp_path, prefetch):
+    start_url = urls[0] + "&page=3"
+    expected, resumed, requested = resume_single(
+        paged_site(num_pages=6), start_url, urls[0] + "&page=5",
+        tmp_path / "journal.jsonl", prefetch=prefetch
+    )
+    assert resumed == expected
+    assert len(resumed) == 12
+    assert start_url not in requested
+    assert urls[0] + "&page=4" not in requested
+
+
+@pytest.mark.parametrize("prefetch", [0, 2])
+def test_resumes_past_empty_page(tmp_path, prefetch):
+    site = paged_site(num_pages=6)
+    def site_with_empty_page(url):
+        return make_results_page([]) if url.endswith("&page=2") \
+            else site(url)
+
+    expected, resumed, requested = resume_single(
+        site_with_empty_page, urls[0], urls[0] + "&page=5",
+        tmp_path / "journal.jsonl", prefetch=prefetch
+    )
+    assert resumed == expected
+    assert len(resumed) == 15
+    assert urls[0] + "&page=3" not in requested
+    assert urls[0] + "&page=5" in requested
@@ -0,0 +1,81 @@
+"""Test search()'s de-duplication, against FakeDriver pages."""
+
+
+import pytest
+from ..trademe import driver_pool
+from ..trademe.dedupe import Deduplicator
+from ..trademe.listing import Listing
+from ..trademe.search import search, iter_search
+from .fakes import (
+    FakeDriver, NO_RESULTS_PAGE, make_card, make_results_page, paged_site
+)
+
+
+url = "https://www.trademe.co.nz/a/property/residential/sale/search?id=1"
+
+
+@pytest.fixture
+def requested(monkeypatch):
+    """Serves paged_site(3), recording the URLs fetched."""
+    requested = []
+    site = paged_site(num_pages=3)
+
+    def recording_site(url):
+        requested.append(url)
+        return site(url)
+
+    FakeDriver.site = staticmethod(recording_site)
+    monkeypatch.setattr(driver_pool.webdriver, "Chrome", FakeDriver)
+    return requested
+
+
+def test_filter_by_listing_id():
+    deduplicator = Deduplicator()
+    listings = [
+        Listing(link="https://www.trademe.co.nz/a/x/listing/1?rsqid=a", 
+                listing_id="1"),
+        Listing(link="https://www.trademe.co.nz/a/x/listing/1?rsqid=b", 
+                listing_id="1"),
+        Listing(link="https://www.trademe.co.nz/a/x/listing/2", 
+                listing_id="2"),
+    ]
+    assert deduplicator.filter(listings) == [listings[0], listings[2]]
+    assert deduplicator.filter(listings) == []
+    assert len(deduplicator) == 2
+
+
+def test_repeated_urls_fetched_once(requested):
+    listings = search(None, [], url, url + "&rsqid=abc", url, dedupe=True)
+    assert len(listings) == 9
+    assert len(requested) == 4  # 3 pages and "No results found", once.
+
+
+@pytest.mark.parametrize("prefetch", [0, 2])
+def test_stops_at_already_scraped_page(requested, prefetch):
+    listings = search(None, [], url, url + "&page=2", dedupe=True, 
+                      prefetch=prefetch)
+    assert len(listings) == 9
+    assert len(set(requested)) == len(requested)
+
+
+def test_duplicate_cards_across_pages(monkeypatch):
+    pages = {
+        1: make_results_page([make_card("sale_premium.html", 7), 
+                              make_card("sale_normal.html", 1)]),
+        2: make_results_page([make_card("sale_premium.html", 7), 
+                              make_card("sale_normal.html", 2)]),
+    }
+    FakeDriver.site = staticmethod(
+        lambda url: pages.get(int(url.split("page=")[-1]) 
+                              if "page=" in url else 1, NO_RESULTS_PAGE)
+    )
+    monkeypatch.setattr(driver_pool.webdriver, "Chrome", FakeDriver)
+
+    listings = list(iter_search(url, dedupe=True))
+    assert [listing.listing_id for listing in listings] == ["7", "1", "2"]
+
+
+def test_shared_between_searches(requested):
+    deduplicator = Deduplicator()
+    search(None, [], url, dedupe=deduplicator)
+    assert search(None, [], url, dedupe=deduplicator) == []
@@ -0,0 +1,97 @@
+"""Test delta_search() and SeenStore, with a fake session."""
+
+
+from ..trademe.delta import SeenStore, delta_search
+from ..trademe.fetchers import HTTPFetcher
+from ..trademe.listing import get_listing_id
+from .fakes import (
+    FakeSession, NO_RESULTS_PAGE, make_card, make_results_page
+)
+
+
+url = "https://www.trademe.co.nz/a/property/residential/sale/search?" \
+    "sort_order=expirydesc"
+
+
+class NewestFirstSite:
+    """Serves `ids` (newest first) three to a page, like a sorted search."""
+
+    def __init__(self, ids):
+        self.ids = list(ids)
+        self.prices = {}  # Listing ID -> new price, for changed listings.
+
+    def __call__(self, url):
+        page = int(url.split("page=")[1]) if "page=" in url else 1
+        ids = self.ids[(page - 1) * 3:page * 3]
+        if not ids:
+            return NO_RESULTS_PAGE
+        return make_results_page(self._card(i) for i in ids)
+
+    def _card(self, listing_id):
+        card = make_card("sale_normal.html", listing_id)
+        return card.replace("$860,000", self.prices.get(listing_id, 
+                                                         "$860,000"))
+
+
+def run(site, seen, **kwargs):
+    session = FakeSession(site)
+    delta = delta_search(url, seen=seen, fetcher=HTTPFetcher(session=session),
+                         **kwargs)
+    return delta, session.requested
+
+
+def ids(listings):
+    return [get_listing_id(listing.link) for listing in listings]
+
+
+def test_get_listing_id():
+    link = "https://www.trademe.co.nz/a/property/residential/rent/auckland/" \
+        "waiheke-island/palm-beach/listing/4117008125?rsqid=8344-003"
+    assert get_listing_id(link) == "4117008125"
+    assert get_listing_id("https://www.trademe.co.nz/a/") is None
+
+
+def test_first_run_everything_new(tmp_path):
+    site = NewestFirstSite(range(100, 90, -1))
+    delta, requested = run(site, tmp_path / "seen.json")
+    assert ids(delta.new) == [str(i) for i in range(100, 90, -1)]
+    assert delta.changed == delta.removed == []
+    assert len(requested) == 5  # 4 pages, then "No results found".
+
+
+def test_stops_at_page_of_seen_listings(tmp_path):
+    path = tmp_path / "seen.json"
+    site = NewestFirstSite(range(100, 90, -1))
+    run(site, path)
+
+    site.ids = [102, 101] + site.ids
+    delta, requested = run(site, path)
+    assert ids(delta.new) == ["102", "101"]
+    assert len(requested) == 2  # Page 2 is all seen, so stop there.
+    assert len(SeenStore(path)) == 12
+
+
+def test_changed_and_removed(tmp_path):
+    path = tmp_path / "seen.json"
+    site = NewestFirstSite(range(100, 90, -1))
+    run(site, path)
+
+    site.ids.remove(99)
+    site.prices[98] = "$900,000"
+    delta, requested = run(site, path)
+    assert delta.new == []
+    assert ids(delta.changed) == ["98"]
+    assert delta.removed == ["99"]
+    assert len(requested) == 1  # Stopped early...
+    assert "91" in SeenStore(path)  # ...so older listings are kept.
+
+
+def test_full_crawl_when_not_newest_first(tmp_path):
+    path = tmp_path / "seen.json"
+    site = NewestFirstSite(range(100, 90, -1))
+    run(site, path)
+
+    site.ids.remove(91)
+    delta, requested = run(site, path, newest_first=False)
+    assert delta.removed == ["91"]
+    assert len(requested) == 4
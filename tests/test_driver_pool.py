@@ -0,0 +1,62 @@
+"""Test DriverPool, using a fake webdriver so Chrome isn't needed."""
+
+
+import pytest
+from ..trademe import driver_pool
+from ..trademe.driver_pool import DriverPool
+from .fakes import FakeDriver
+
+
+@pytest.fixture(autouse=True)
+def fake_chrome(monkeypatch):
+    FakeDriver.started = 0
+    monkeypatch.setattr(driver_pool.webdriver, "Chrome", FakeDriver)
+
+
+def test_reuses_driver():
+    with DriverPool() as pool:
+        for _ in range(10):
+            with pool.borrow():
+                pass
+    assert FakeDriver.started == 1
+
+
+def test_recycles_driver():
+    with DriverPool(recycle_after=3) as pool:
+        drivers = []
+        for _ in range(6):
+            with pool.borrow() as driver:
+                drivers.append(driver)
+    assert FakeDriver.started == 2
+    assert drivers[0].quit_called
+
+
+def test_replaces_dead_driver():
+    with DriverPool() as pool:
+        with pool.borrow() as driver:
+            driver.alive = False
+        with pool.borrow() as replacement:
+            pass
+    assert replacement is not driver
+    assert driver.quit_called
+
+
+def test_size_bounds_drivers():
+    with DriverPool(size=2) as pool:
+        first, second = pool.acquire(), pool.acquire()
+        pool.release(first)
+        third = pool.acquire()
+        pool.release(second)
+        pool.release(third)
+    assert third is first
+    assert FakeDriver.started == 2
+
+
+def test_close_quits_drivers():
+    pool = DriverPool()
+    with pool.borrow() as driver:
+        pass
+    pool.close()
+    assert driver.quit_called
+    with pytest.raises(RuntimeError):
+        pool.acquire()
@@ -0,0 +1,57 @@
+"""Test ExtractionSpec on small hand-written soups."""
+
+
+import pytest
+from bs4 import BeautifulSoup
+from ..trademe.extraction import ExtractionSpec
+
+
+card = BeautifulSoup("""
+<div>
+    <img class="logo top" src="a.png">
+    <img class="logo" alt="Agency" src="b.png">
+    <span class="name first">Agent</span>
+    <span class="name">Other agent</span>
+    <a href="/listing/1">Link</a>
+</div>
+""", "html.parser")
+
+
+@pytest.mark.parametrize(
+    "selectors, expected",
+    [
+        # First tag with matching class wins:
+        ([("span", "name", "string")], "Agent"),
+        # Matching all classes, in order:
+        ([("span", "name first", "string")], "Agent"),
+        ([("span", "first name", "string")], None),
+        # First matching img has no alt, so falls back to next selector:
+        ([("img", "top", "alt"), ("img", "logo", "alt")], None),
+        ([("img", "top", "alt"), ("a", None, "href")], "/listing/1"),
+        # Missing tag falls back:
+        ([("p", None, "string"), ("span", None, "text")], "Agent"),
+    ]
+)
+def test_selectors(selectors, expected):
+    spec = ExtractionSpec({"field": selectors})
+    assert spec.extract(card) == {"field": expected}
+
+
+def test_extracts_every_field():
+    spec = ExtractionSpec({
+        "agent": [("span", "name", "string")],
+        "link": [("a", None, "href")],
+        "missing": [("table", None, "text")],
+    })
+    assert spec.extract(card) == {
+        "agent": "Agent", 
+        "link": "/listing/1", 
+        "missing": None
+    }
+
+
+def test_raises_for_missing_required_field():
+    spec = ExtractionSpec({"missing": [("table", None, "text")]}, 
+                          required=["missing"])
+    with pytest.raises(ValueError):
+        spec.extract(card)
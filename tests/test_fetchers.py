@@ -0,0 +1,93 @@
+"""Test fetchers, with fake sessions and drivers."""
+
+
+import time
+import pytest
+from ..trademe import driver_pool
+from ..trademe.driver_pool import DriverPool
+from ..trademe.fetchers import Fetcher, HTTPFetcher, SeleniumFetcher
+from ..trademe.search import search
+from .fakes import (
+    FakeDriver, FakeSession, NO_RESULTS_PAGE, UNRENDERED_PAGE, paged_site
+)
+
+
+url = "https://www.trademe.co.nz/a/property/residential/sale/search?id=1"
+
+
+@pytest.fixture(autouse=True)
+def fake_chrome(monkeypatch):
+    FakeDriver.started = 0
+    FakeDriver.site = staticmethod(paged_site(num_pages=2))
+    monkeypatch.setattr(driver_pool.webdriver, "Chrome", FakeDriver)
+    monkeypatch.setattr(FakeDriver, "render_delay", 0)
+
+
+def test_http_fetcher_returns_source():
+    fetcher = HTTPFetcher(session=FakeSession(lambda url: NO_RESULTS_PAGE))
+    assert fetcher.fetch(url) == NO_RESULTS_PAGE
+
+
+def test_http_fetcher_falls_back_when_unrendered():
+    session = FakeSession(lambda url: UNRENDERED_PAGE)
+    with HTTPFetcher(session=session, fallback=SeleniumFetcher()) as fetcher:
+        page_source = fetcher.fetch(url)
+    assert "tm-property-search-card" in page_source
+    assert FakeDriver.started == 1
+
+
+def test_http_fetcher_skips_fallback_when_rendered():
+    session = FakeSession(paged_site(num_pages=2))
+    with HTTPFetcher(session=session, fallback=SeleniumFetcher()) as fetcher:
+        fetcher.fetch(url)
+    assert FakeDriver.started == 0
+
+
+def test_search_with_http_fetcher_matches_selenium():
+    session = FakeSession(paged_site(num_pages=2))
+    http_listings = search(None, [], url, fetcher=HTTPFetcher(session=session))
+    assert http_listings == search(None, [], url, fetcher="selenium")
+    assert len(session.requested) == 3  # 2 pages, then "No results found".
+
+
+def test_search_rejects_unknown_fetcher():
+    with pytest.raises(ValueError):
+        search(None, [], url, fetcher="carrier-pigeon")
+
+
+def test_fetcher_must_implement_fetch():
+    with pytest.raises(NotImplementedError):
+        Fetcher().fetch(url)
+
+
+def test_selenium_fetcher_waits_until_rendered(monkeypatch):
+    monkeypatch.setattr(FakeDriver, "render_delay", 0.2)
+    with SeleniumFetcher(timeout=5, poll_interval=0.01) as fetcher:
+        start = time.monotonic()
+        page_source = fetcher.fetch(url)
+    assert "tm-property-search-card" in page_source
+    assert time.monotonic() - start < 1  # Not the whole timeout.
+
+
+def test_selenium_fetcher_gives_up_waiting(monkeypatch):
+    monkeypatch.setattr(FakeDriver, "render_delay", 10)
+    with SeleniumFetcher(timeout=0.2, poll_interval=0.01) as fetcher:
+        assert fetcher.fetch(url) == UNRENDERED_PAGE
+
+
+def test_drivers_block_resources():
+    with DriverPool() as pool:
+        with pool.borrow() as driver:
+            pass
+    prefs = driver.options.experimental_options["prefs"]
+    assert prefs["profile.managed_default_content_settings.images"] == 2
+    blocked_urls = dict(driver.cdp_commands)["Network.setBlockedURLs"]["urls"]
+    assert "*.woff2" in blocked_urls
+
+
+def test_drivers_can_load_everything():
+    with DriverPool(block_resources=False) as pool:
+        with pool.borrow() as driver:
+            pass
+    assert "prefs" not in driver.options.experimental_options
+    assert driver.cdp_commands == []
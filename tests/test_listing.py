@@ -5,7 +5,7 @@ from functools import lru_cache
 from pathlib import Path
 import pytest
 from bs4 import BeautifulSoup
-from ..trademe.listing import Listing
+from ..trademe.listing import Listing, ListingBatch
 
 
 # Setup
@@ -143,6 +143,12 @@ class TestConstructors:
         assert listing.link == listing_attrs["link"]
 
 
+    def test_listing_id(self, html_path, listing_attrs):
+        listing = TestConstructors.make_listing(html_path)
+        link_id = listing_attrs["link"].split("/listing/")[1].split("?")[0]
+        assert listing.listing_id == link_id
+
+
     def test_availability(self, html_path, listing_attrs):
         listing = TestConstructors.make_listing(html_path)
         assert str(listing.availability).strip() == str(listing_attrs["availability"]).strip()
@@ -157,3 +163,37 @@ class TestConstructors:
         listing = TestConstructors.make_listing(html_path)
         assert str(listing.agency).strip() == str(listing_attrs["agency"]).strip()
 
+
+
+# Memory-related tests:
+
+
+all_html_paths = ["rent_super_feature.html", "rent_premium.html", 
+                  "rent_normal.html", "sale_super_feature.html", 
+                  "sale_premium.html", "sale_normal.html"]
+
+
+@pytest.mark.parametrize("html_path", all_html_paths)
+def test_plain_strings(html_path):
+    listing = TestConstructors.make_listing(html_path)
+    for value in (getattr(listing, f) for f in ListingBatch.FIELDS):
+        assert value is None or type(value) is str
+    assert not hasattr(listing, "__dict__")
+
+
+def test_listing_batch():
+    listings = [TestConstructors.make_listing(p) for p in all_html_paths]
+    batch = ListingBatch(listings)
+    assert len(batch) == len(listings)
+    assert list(batch) == listings
+    assert batch[1] == listings[1]
+    assert batch[-2:] == listings[-2:]
+    assert batch.to_dict()["title"] == [l.title for l in listings]
+
+
+def test_listing_batch_dataframe():
+    pytest.importorskip("pandas")
+    listings = [TestConstructors.make_listing(p) for p in all_html_paths]
+    df = ListingBatch(listings).to_dataframe()
+    assert list(df.columns) == list(ListingBatch.FIELDS)
+    assert df["price"].tolist() == [l.price for l in listings]
@@ -0,0 +1,140 @@
+"""Tests CrawlStats, and the stats search() fills it in with."""
+
+
+import json
+
+import pytest
+from bs4 import BeautifulSoup
+from ..trademe import driver_pool
+from ..trademe.driver_pool import DriverPool
+from ..trademe.extraction import ExtractionSpec
+from ..trademe.fetchers import Fetcher
+from ..trademe.metrics import CrawlStats, time_stage
+from ..trademe.search import search, iter_search
+from .fakes import FakeDriver, make_card, make_results_page, paged_site
+
+
+url = "https://www.trademe.co.nz/a/property/residential/sale/search?id=1"
+
+
+@pytest.fixture(autouse=True)
+def fake_chrome(monkeypatch):
+    FakeDriver.site = staticmethod(paged_site(num_pages=2))
+    monkeypatch.setattr(driver_pool.webdriver, "Chrome", FakeDriver)
+
+
+def test_counters_and_labels():
+    stats = CrawlStats()
+    stats.count("cards", type="normal")
+    stats.count("cards", 2, type="normal")
+    stats.count("cards", type="premium")
+    assert stats.get("cards", type="normal") == 3
+    assert stats.get("cards", type="super_feature") == 0
+    assert stats.total("cards") == 4
+
+
+def test_histograms():
+    stats = CrawlStats()
+    for value in (0.002, 0.2, 100):
+        stats.observe("parse_seconds", value)
+    histogram = stats.to_dict()["histograms"]["parse_seconds"]
+    assert histogram["count"] == 3
+    assert histogram["buckets"]["0.005"] == 1
+    assert histogram["buckets"]["0.25"] == 2
+    assert histogram["buckets"]["+Inf"] == 3
+    assert stats.total("parse_seconds") == pytest.approx(100.202)
+
+
+def test_prometheus_export():
+    stats = CrawlStats()
+    stats.count("failed_fields", field='a "quoted" field')
+    with stats.timer("parse"):
+        pass
+    text = stats.to_prometheus()
+    assert "# TYPE trademe_failed_fields_total counter\n" in text
+    assert 'trademe_failed_fields_total{field="a \\"quoted\\" field"} 1\n' \
+        in text
+    assert "# TYPE trademe_parse_seconds histogram\n" in text
+    assert 'trademe_parse_seconds_bucket{le="+Inf"} 1\n' in text
+    assert "trademe_parse_seconds_count 1\n" in text
+
+
+def test_callback():
+    recorded = []
+    stats = CrawlStats(callback=lambda *args: recorded.append(args))
+    stats.count("pages", kind="empty")
+    assert recorded == [("pages", 1, {"kind": "empty"})]
+
+
+def test_time_stage_without_stats():
+    with time_stage(None, "parse"):
+        pass  # Nothing to record it in, and nothing raised.
+
+
+@pytest.mark.parametrize("prefetch", [0, 2])
+def test_search_fills_in_stats(prefetch):
+    stats = CrawlStats()
+    listings = search(None, [], url, prefetch=prefetch, stats=stats)
+
+    assert stats.get("pages", kind="results") == 2
+    assert stats.get("pages", kind="no_results") == 1
+    assert stats.get("cards", type="normal") == len(listings) == 6
+    for stage in ("driver_start", "driver_get", "page_ready", "page_source",
+                  "fetch", "parse", "listings"):
+        assert f"{stage}_seconds" in {key[0] for key in stats.histograms}
+    assert stats.histograms[("cards_per_page", ())].sum == 6
+    json.loads(stats.to_json())
+
+
+def test_search_with_pool_times_driver_start():
+    stats = CrawlStats()
+    with DriverPool() as pool:
+        search(None, [], url, pool=pool, stats=stats)
+    assert ("driver_start_seconds", ()) in stats.histograms
+
+
+def test_iter_search_with_fetcher_instance():
+    class SiteFetcher(Fetcher):
+        def fetch(self, url):
+            return FakeDriver.site(url)
+
+    stats = CrawlStats()
+    assert list(iter_search(url, fetcher=SiteFetcher(), stats=stats)) == \
+        search(None, [], url)
+    # Fetcher instances aren't timed inside, but the fetch as a whole is:
+    assert ("fetch_seconds", ()) in stats.histograms
+    assert ("driver_get_seconds", ()) not in stats.histograms
+
+
+def test_fallback_and_failed_fields():
+    card = BeautifulSoup("""
+    <div><a href="/listing/1">Link</a><span class="name">Agent</span></div>
+    """, "html.parser")
+    spec = ExtractionSpec({
+        "link": [("a", None, "href")],
+        "agent": [("p", "name", "string"), ("span", "name", "string")],
+        "agency": [("img", None, "alt")],
+    })
+    stats = CrawlStats()
+    spec.extract(card, stats)
+    assert stats.get("fallback_selector_hits", field="agent") == 1
+    assert stats.get("fallback_selector_hits", field="link") == 0
+    assert stats.get("failed_fields", field="agency") == 1
+
+
+def test_stats_dont_change_results():
+    page = make_results_page(
+        make_card(fixture, i) for i, fixture in enumerate(
+            ["sale_super_feature.html", "rent_premium.html",
+             "sale_normal.html"]
+        )
+    )
+    FakeDriver.site = staticmethod(
+        lambda url: page if "page=" not in url else paged_site(0)(url)
+    )
+    stats = CrawlStats()
+    assert search(None, [], url, stats=stats) == search(None, [], url)
+    assert {key[1] for key in stats.counters if key[0] == "cards"} == {
+        (("type", "super_feature"),), (("type", "premium"),),
+        (("type", "normal"),)
+    }
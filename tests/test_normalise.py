@@ -0,0 +1,60 @@
+"""Test normalise()."""
+
+
+import pytest
+pd = pytest.importorskip("pandas")
+from ..trademe.listing import Listing, ListingBatch
+from ..trademe.normalise import normalise
+
+
+listings = [
+    Listing(price="$520 per week", features="1 bedrooms. 1 bathrooms.", 
+            availability="Available: Fri, 22 Sep"),
+    Listing(price="Enquiries over $2,295,000", 
+            features="5 bedrooms. 3 bathrooms. floor area 235 meters square. "
+                     "land area 889 meters square.",
+            address="Kelburn, Wellington"),
+    Listing(price="Deadline sale", features="3 bedrooms. 1 bathrooms. "
+            "land area 1.5 hectares.", address="Newtown, Wellington"),
+    Listing(price="$1,075 per week", features="4 bedrooms. 1 bathrooms.", 
+            availability="Available: Now"),
+    Listing(price="$2,000 per month", features=None, 
+            availability="Available: Mon, 8 Jan"),
+]
+
+
+@pytest.fixture
+def df():
+    return normalise(listings, reference_date="2023-12-15")
+
+
+def test_price(df):
+    assert df["price_amount"].tolist()[:2] == [520.0, 2_295_000.0]
+    assert df["price_amount"].isna().tolist() == [False, False, True, False, 
+                                                  False]
+    assert df["price_period"].fillna("").tolist() == ["week", "", "", "week", 
+                                                      "month"]
+
+
+def test_features(df):
+    assert df["bedrooms"].tolist()[:4] == [1, 5, 3, 4]
+    assert df["bathrooms"].tolist()[:4] == [1, 3, 1, 1]
+    assert df["floor_area"].tolist()[1] == 235.0
+    assert df["land_area"].tolist()[1:3] == [889.0, 15_000.0]
+    assert df["bedrooms"].isna().tolist()[4]
+
+
+def test_available_date(df):
+    dates = df["available_date"].tolist()
+    assert dates[0] == pd.Timestamp("2023-09-22")
+    assert dates[3] == pd.Timestamp("2023-12-15")  # "Now"
+    assert dates[4] == pd.Timestamp("2024-01-08")  # Rolls over to next year.
+    assert pd.isna(dates[1])
+
+
+def test_accepts_batches_and_dataframes(df):
+    batch = ListingBatch(listings)
+    from_batch = normalise(batch, reference_date="2023-12-15")
+    from_df = normalise(batch.to_dataframe(), reference_date="2023-12-15")
+    pd.testing.assert_frame_equal(from_batch, df)
+    pd.testing.assert_frame_equal(from_df, df)
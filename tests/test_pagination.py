@@ -0,0 +1,222 @@
+"""Tests search() and iter_search() offline, against FakeDriver pages.
+
+Unlike test_search.py, these don't touch TradeMe, so they're safe to run
+automatically.
+"""
+
+
+import sys
+import time
+
+import pytest
+from bs4 import BeautifulSoup
+from ..trademe import driver_pool
+from ..trademe.fetchers import Fetcher
+from ..trademe.search import (
+    search, iter_search, _page_soup_to_listings, _check_page_source,
+    _has_listings_source, _has_next_page_source
+)
+from .fakes import (
+    FakeDriver, NO_RESULTS_PAGE, make_card, make_results_page, paged_site
+)
+
+
+urls = [f"https://www.trademe.co.nz/a/property/residential/sale/search?id={i}" 
+        for i in range(1, 6)]
+
+
+@pytest.fixture(autouse=True)
+def fake_chrome(monkeypatch):
+    FakeDriver.started = 0
+    FakeDriver.site = staticmethod(paged_site(num_pages=3))
+    monkeypatch.setattr(driver_pool.webdriver, "Chrome", FakeDriver)
+
+
+def listing_ids(listings):
+    return [l.link.split("/")[-1].split("?")[0] for l in listings]
+
+
+def test_paginates_until_no_results():
+    listings = search(None, [], urls[0])
+    assert listing_ids(listings) == [
+        f"1{page:03d}{card:03d}" for page in (1, 2, 3) for card in range(3)
+    ]
+
+
+def test_one_driver_for_all_urls():
+    search(None, [], *urls)
+    assert FakeDriver.started == 1
+
+
+@pytest.mark.parametrize("max_workers", [2, 5])
+def test_max_workers_keeps_url_order(max_workers):
+    serial = search(None, [], *urls)
+    concurrent = search(None, [], *urls, max_workers=max_workers)
+    assert listing_ids(concurrent) == listing_ids(serial)
+
+
+def test_iter_search_matches_search():
+    assert list(iter_search(*urls)) == search(None, [], *urls)
+
+
+def test_iter_search_is_lazy():
+    pages_loaded = []
+    site = paged_site(num_pages=3)
+    def counting_site(url):
+        pages_loaded.append(url)
+        return site(url)
+    FakeDriver.site = staticmethod(counting_site)
+
+    results = iter_search(*urls)
+    next(results)
+    results.close()
+    assert len(pages_loaded) == 1
+
+
+@pytest.mark.parametrize("show_count", [True, False])
+@pytest.mark.parametrize("prefetch", [1, 4])
+def test_prefetch_matches_serial(show_count, prefetch):
+    site = paged_site(num_pages=7, show_count=show_count)
+    FakeDriver.site = staticmethod(site)
+    serial = search(None, [], *urls[:2])
+    prefetched = search(None, [], *urls[:2], prefetch=prefetch)
+    assert listing_ids(prefetched) == listing_ids(serial)
+
+
+def test_prefetch_uses_result_count():
+    pages_loaded = []
+    site = paged_site(num_pages=7, show_count=True)
+    def counting_site(url):
+        pages_loaded.append(url)
+        return site(url)
+    FakeDriver.site = staticmethod(counting_site)
+
+    search(None, [], urls[0], prefetch=4)
+    # 7 pages, plus the "No results found" page - nothing fetched past it:
+    assert len(pages_loaded) == 8
+
+
+def test_prefetch_bounded_for_large_result_count():
+    pages_loaded = []
+    site = paged_site(num_pages=50)
+    def big_count_site(url):
+        pages_loaded.append(url)
+        heading = ('<h3 class="tm-search-header-result-count__heading">'
+                   'Showing 100,000 results</h3>')
+        return site(url).replace("<div>", heading + "<div>", 1)
+    FakeDriver.site = staticmethod(big_count_site)
+
+    results = iter_search(urls[0], prefetch=2)
+    for _ in range(4):  # Into the second page.
+        next(results)
+    time.sleep(0.3)  # A slow consumer.
+    # The first two pages, and at most 2 more in flight, however many pages
+    # the result count says there are:
+    assert len(pages_loaded) <= 4
+    results.close()
+
+
+@pytest.mark.parametrize("strain", [False, True])
+@pytest.mark.parametrize("parser", ["html.parser", "lxml", "html5lib"])
+def test_parsers_match_default(parser, strain):
+    if parser != "html.parser": 
+        pytest.importorskip(parser)
+    expected = search(None, [], urls[0])
+    assert search(None, [], urls[0], parser=parser, strain=strain) == expected
+
+
+def test_rejects_unknown_parser():
+    with pytest.raises(ValueError):
+        search(None, [], urls[0], parser="regex")
+
+
+def test_listings_in_page_order():
+    fixtures = ["sale_normal.html", "sale_super_feature.html", 
+                "rent_premium.html", "rent_normal.html"]
+    page = make_results_page(
+        make_card(fixture, 100 + i) for i, fixture in enumerate(fixtures)
+    )
+    listings = _page_soup_to_listings(BeautifulSoup(page, "html.parser"))
+    assert listing_ids(listings) == ["100", "101", "102", "103"]
+
+
+def test_batch_matches_list():
+    batch = search(None, [], *urls[:2], batch=True, max_workers=2)
+    assert list(batch) == search(None, [], *urls[:2])
+
+
+@pytest.mark.parametrize("prefetch", [0, 4])
+def test_terminal_pages_not_parsed(monkeypatch, prefetch):
+    search_module = sys.modules[search.__module__]
+    parsed = []
+    make_soup = search_module._make_soup
+    def counting_make_soup(page_source, **kwargs):
+        parsed.append(page_source)
+        return make_soup(page_source, **kwargs)
+    monkeypatch.setattr(search_module, "_make_soup", counting_make_soup)
+
+    search(None, [], urls[0], prefetch=prefetch)
+    assert len(parsed) == 3
+    assert NO_RESULTS_PAGE not in parsed
+
+
+def test_empty_pages_skipped():
+    site = paged_site(num_pages=3)
+    def site_with_empty_page(url):
+        # Page 2 has no cards, but isn't the last page either:
+        return make_results_page([]) if url.endswith("page=2") else site(url)
+    class SiteFetcher(Fetcher):
+        def fetch(self, url):
+            return site_with_empty_page(url)
+
+    assert listing_ids(search(None, [], urls[0], fetcher=SiteFetcher())) == [
+        f"1{page:03d}{card:03d}" for page in (1, 3) for card in range(3)
+    ]
+
+
+@pytest.mark.parametrize("page_source, has_next_page", [
+    (NO_RESULTS_PAGE, False),
+    ('<h2 class="tm-no-results__heading foo">\n  <!-- x --> No Results '
+     'Found</h2>', False),
+    ('<h2 _ngcontent-c1="" class="tm-no-results__heading o-h2"><!---->'
+     ' No Results Found <!----></h2>', False),
+    ('<h2 class="tm-no-results__heading">Try widening your search</h2>', True),
+    ("<p>No results found</p>", True),
+])
+def test_has_next_page_source(page_source, has_next_page):
+    assert _has_next_page_source(page_source) == has_next_page
+
+
+# Headings _NO_RESULTS_PATTERN misses, which the fallback soup catches:
+odd_no_results_pages = [
+    "<h2 class='tm-no-results__heading'>No results found</h2>",
+    '<h2 class="tm-no-results__heading"><span>No results found</span></h2>',
+    '<h2 class="tm-no-results__heading">Sorry, no results found</h2>',
+]
+
+
+@pytest.mark.parametrize("page_source", odd_no_results_pages)
+def test_check_page_source_falls_back(page_source):
+    assert _check_page_source(page_source) == (False, False)
+    assert _check_page_source(make_results_page([])) == (True, False)
+
+
+@pytest.mark.parametrize("no_results_page", odd_no_results_pages)
+def test_odd_no_results_page_ends_pagination(no_results_page):
+    site = paged_site(num_pages=2)
+    def site_with_odd_last_page(url):
+        page_source = site(url)
+        return no_results_page if page_source == NO_RESULTS_PAGE \
+            else page_source
+    FakeDriver.site = staticmethod(site_with_odd_last_page)
+    assert len(search(None, [], urls[0])) == 6
+
+
+@pytest.mark.parametrize("page_source, has_listings", [
+    (make_results_page([make_card("sale_normal.html", 1)]), True),
+    (make_results_page([]), False),
+    ("<tm-property-search-card-listing-title>", False),
+    ("<tm-property-premium-listing-card\n>", True),
+])
+def test_has_listings_source(page_source, has_listings):
+    assert _has_listings_source(page_source) == has_listings
@@ -0,0 +1,90 @@
+"""Test pipelined_search() against search(), with a fake session."""
+
+
+import threading
+from concurrent.futures.process import BrokenProcessPool
+import pytest
+from ..trademe import pipeline
+from ..trademe.fetchers import HTTPFetcher
+from ..trademe.listing import ListingBatch
+from ..trademe.pipeline import pipelined_search
+from ..trademe.search import search
+from .fakes import FakeSession, paged_site
+
+
+urls = [f"https://www.trademe.co.nz/a/property/residential/sale/search?id={i}" 
+        for i in range(1, 6)]
+
+
+def fetcher(site=None):
+    return HTTPFetcher(session=FakeSession(site or paged_site(num_pages=4)))
+
+
+@pytest.mark.parametrize(
+    "max_workers, parse_workers, queue_size",
+    [(1, 1, 1), (3, 2, None), (5, 4, 2)]
+)
+def test_matches_search(max_workers, parse_workers, queue_size):
+    listings = pipelined_search(
+        *urls, fetcher=fetcher(), max_workers=max_workers, 
+        parse_workers=parse_workers, queue_size=queue_size
+    )
+    assert listings == search(None, [], *urls, fetcher=fetcher())
+
+
+def test_batch():
+    listings = pipelined_search(*urls[:2], fetcher=fetcher(), parse_workers=2,
+                                batch=True)
+    assert isinstance(listings, ListingBatch)
+    assert len(listings) == 24
+
+
+def test_fetch_errors_raised():
+    def site(url):
+        if "page=3" in url:
+            raise ConnectionError("Connection reset.")
+        return paged_site(num_pages=4)(url)
+
+    with pytest.raises(ConnectionError):
+        pipelined_search(*urls, fetcher=fetcher(site), max_workers=2, 
+                         parse_workers=2)
+
+
+def test_parsers_not_forked_from_fetch_threads():
+    # Forking with fetch threads running can deadlock the child:
+    assert pipeline._process_context().get_start_method() != "fork"
+
+
+class BrokenExecutor:
+    """Stands in for a ProcessPoolExecutor whose processes have died."""
+
+    def __init__(self, max_workers, mp_context=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def submit(self, *args, **kwargs):
+        raise BrokenProcessPool("A parser process died.")
+
+
+def test_parse_errors_stop_fetching(monkeypatch):
+    monkeypatch.setattr(pipeline, "ProcessPoolExecutor", BrokenExecutor)
+    raised = []
+
+    def run():
+        try:
+            # Fetch threads fill the 1-page queue, then wait on it:
+            pipelined_search(*urls, fetcher=fetcher(), max_workers=3,
+                             queue_size=1)
+        except BrokenProcessPool as e:
+            raised.append(e)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout=10)
+    assert not thread.is_alive()  # Rather than hanging.
+    assert raised
@@ -0,0 +1,160 @@
+"""Test plan_searches() and planned_search(), against a fake site."""
+
+
+from urllib.parse import urlparse, parse_qs
+import pytest
+from ..trademe.fetchers import HTTPFetcher
+from ..trademe.planner import plan_searches, planned_search
+from .fakes import FakeSession, NO_RESULTS_PAGE, make_card, make_results_page
+
+
+# (listing ID, region, district, suburb, bedrooms):
+LISTINGS = [
+    (1, "wellington", "wellington", "newtown", 2),
+    (2, "wellington", "wellington", "newtown", 4),
+    (3, "wellington", "wellington", "aro-valley", 1),
+    (4, "wellington", "lower-hutt", "petone", 3),
+    (5, "auckland", "auckland-city", "ponsonby", 3),
+]
+
+
+def card(listing_id, region, district, suburb, bedrooms):
+    return make_card("sale_normal.html", listing_id) \
+        .replace("wellington/wellington/newtown", 
+                 f"{region}/{district}/{suburb}") \
+        .replace("2 bedrooms", f"{bedrooms} bedrooms")
+
+
+def site(url, max_results=None):
+    """Filters LISTINGS like TradeMe would, all on one page (with only the
+    first max_results on it).
+    """
+    parsed = urlparse(url)
+    query = parse_qs(parsed.query)
+    if "page" in query:
+        return NO_RESULTS_PAGE
+    location = parsed.path.lower().split("/sale")[1].split("/search")[0] \
+        .strip("/").split("/")
+    bedrooms_min = int(query.get("bedrooms_min", [0])[0])
+    cards = [
+        card(*listing) for listing in LISTINGS
+        if listing[1:1 + len(location)] == tuple(location) or location == [""]
+        if listing[4] >= bedrooms_min
+    ]
+    if not cards:
+        return NO_RESULTS_PAGE
+    return make_results_page(cards[:max_results], result_count=len(cards))
+
+
+criteria = [
+    {"sale_or_rent": "sale", "region": "wellington", 
+     "district": "wellington", "suburb": "newtown"},
+    {"sale_or_rent": "sale", "region": "wellington"},
+    {"sale_or_rent": "sale", "region": "Wellington", "district": "wellington", 
+     "bedrooms_min": 2},
+    {"sale_or_rent": "sale", "region": "auckland"},
+    {"sale_or_rent": "sale", "region": "wellington"},  # Repeated.
+]
+
+
+def test_plan_merges_covered_criteria():
+    plan = plan_searches(criteria)
+    assert plan.merged_roots == [1]  # Wellington, with 0 and 2 merged in.
+    assert plan.urls == [
+        "https://www.trademe.co.nz/a/property/residential/sale/wellington/"
+        "search?",
+        "https://www.trademe.co.nz/a/property/residential/sale/auckland/"
+        "search?",
+    ]
+
+
+@pytest.mark.parametrize(
+    "broad, narrow",
+    [
+        # Different filters that can't be checked locally:
+        ({"price_max": 500_000}, {"price_max": 400_000}),
+        ({}, {"property_type": "house"}),
+        # Adjacent suburbs could be anywhere:
+        ({"adjacent_suburbs": "true"}, 
+         {"adjacent_suburbs": "true", "district": "wellington", 
+          "suburb": "newtown"}),
+        # Ranges that don't overlap:
+        ({"bedrooms_min": 3}, {"bedrooms_max": 2}),
+    ]
+)
+def test_plan_keeps_uncovered_criteria(broad, narrow):
+    plan = plan_searches([
+        {"sale_or_rent": "sale", "region": "wellington", **broad},
+        {"sale_or_rent": "sale", "region": "wellington", **narrow},
+    ])
+    assert len(plan.urls) == 2
+
+
+@pytest.mark.parametrize("prefetch", [0, 2])
+def test_planned_search_matches_separate_searches(prefetch):
+    session = FakeSession(site)
+    results = planned_search(criteria, fetcher=HTTPFetcher(session=session),
+                             prefetch=prefetch)
+
+    separate_session = FakeSession(site)
+    expected = [
+        planned_search([c], fetcher=HTTPFetcher(session=separate_session))[0]
+        for c in criteria
+    ]
+    assert results == expected
+    assert [[l.listing_id for l in r] for r in results] == [
+        ["1", "2"], ["1", "2", "3", "4"], ["1", "2"], ["5"], 
+        ["1", "2", "3", "4"]
+    ]
+    assert len(session.requested) < len(separate_session.requested)
+    # Counting a merged search's results doesn't cost an extra fetch:
+    assert len(session.requested) == len(set(session.requested))
+
+
+def test_planned_search_filters_new_homes_links():
+    # New homes' links aren't under /residential/, e.g.
+    # /a/property/new-homes/new-apartment/wellington/wellington/.../listing/.
+    new_home = card(6, "wellington", "wellington", "wellington-central", 2) \
+        .replace("residential/sale", "new-homes/new-apartment")
+
+    def new_homes_site(url):
+        if "page=" in url:
+            return NO_RESULTS_PAGE
+        return make_results_page([card(*LISTINGS[0]), new_home])
+
+    results = planned_search(
+        [{"sale_or_rent": "sale", "region": "wellington"},
+         {"sale_or_rent": "sale", "region": "wellington",
+          "district": "wellington", "suburb": "wellington-central"}],
+        fetcher=HTTPFetcher(session=FakeSession(new_homes_site))
+    )
+    assert [[l.listing_id for l in r] for r in results] == [["1", "6"], ["6"]]
+
+
+def test_planned_search_doesnt_merge_into_too_big_searches():
+    # Wellington has 4 listings, so with 3 at most, it'd lose Lower Hutt's
+    # listing 4 if Lower Hutt were merged into it:
+    def capped_site(url):
+        return site(url, max_results=3)
+
+    capped_criteria = [
+        {"sale_or_rent": "sale", "region": "wellington"},
+        {"sale_or_rent": "sale", "region": "wellington",
+         "district": "lower-hutt"},
+        {"sale_or_rent": "sale", "region": "wellington"},  # Repeated.
+    ]
+    session = FakeSession(capped_site)
+    results = planned_search(capped_criteria,
+                             fetcher=HTTPFetcher(session=session),
+                             max_results=3)
+
+    separate_session = FakeSession(capped_site)
+    expected = [
+        planned_search([c], fetcher=HTTPFetcher(session=separate_session))[0]
+        for c in capped_criteria
+    ]
+    assert results == expected
+    assert [[l.listing_id for l in r] for r in results] == [
+        ["1", "2", "3"], ["4"], ["1", "2", "3"]
+    ]
+    assert len(session.requested) == len(set(session.requested))
@@ -0,0 +1,94 @@
+"""Tests ReplayServer, and search() end to end against it."""
+
+
+import time
+
+import pytest
+import requests
+from ..benchmarks import crawl
+from ..benchmarks.pages import NO_RESULTS_PAGE
+from ..benchmarks.replay_server import (
+    ReplayServer, generated_site, recorded_site
+)
+from ..trademe import driver_pool
+from ..trademe.cache import PageCache
+from ..trademe.fetchers import HTTPFetcher
+from ..trademe.search import make_url, search
+from .fakes import FakeDriver
+
+
+@pytest.fixture
+def server():
+    with ReplayServer(generated_site(num_pages=3, cards_per_page=2)) as server:
+        yield server
+
+
+def test_serves_pages_then_no_results(server):
+    url = server.url(make_url("sale", region="wellington", id=1))
+    assert url.startswith(server.base_url + "/a/property/residential/sale/")
+    assert "tm-property-search-card" in requests.get(url).text
+    assert requests.get(f"{url}&page=4").text == NO_RESULTS_PAGE
+
+
+def test_search_paginates_over_http(server):
+    url = server.url(make_url("sale", id=1))
+    listings = search(None, [], url, fetcher=HTTPFetcher())
+    assert [l.listing_id for l in listings] == [
+        f"1{page:03d}{card:03d}" for page in (1, 2, 3) for card in range(2)
+    ]
+    assert server.requests == 4  # Including the "No results found" page.
+
+
+def test_latency():
+    with ReplayServer(generated_site(1), latency=0.2) as server:
+        start = time.perf_counter()
+        requests.get(server.url(make_url("sale")))
+        assert time.perf_counter() - start >= 0.2
+
+
+def test_error_injection():
+    with ReplayServer(generated_site(1), error_rate=1.0,
+                      error_status=429) as server:
+        assert requests.get(server.url(make_url("sale"))).status_code == 429
+        assert server.errors == 1
+
+
+def test_errors_retried_end_to_end():
+    with ReplayServer(generated_site(num_pages=3, cards_per_page=2),
+                      error_rate=0.3, seed=1) as server:
+        stats = crawl.run(server, num_urls=2, workers=2, retries=5)
+    assert stats["errors"] > 0
+    assert stats["listings"] == 2 * 3 * 2
+    assert stats["pages"] == 2 * 3
+
+
+def test_selenium_crawl_quits_drivers(server, monkeypatch):
+    drivers = []
+
+    class RecordedDriver(FakeDriver):
+        def __init__(self, options=None):
+            super().__init__(options)
+            drivers.append(self)
+
+    monkeypatch.setattr(FakeDriver, "site", staticmethod(
+        generated_site(num_pages=3, cards_per_page=2)
+    ))
+    monkeypatch.setattr(driver_pool.webdriver, "Chrome", RecordedDriver)
+    stats = crawl.run(server, num_urls=2, workers=2, fetcher="selenium")
+    assert stats["listings"] == 2 * 3 * 2
+    assert drivers and all(driver.quit_called for driver in drivers)
+
+
+def test_replays_recorded_pages(tmp_path):
+    # Record pages as if searched on TradeMe with cache=tmp_path:
+    url = make_url("sale", region="wellington")
+    site = generated_site(num_pages=2, cards_per_page=2)
+    cache = PageCache(tmp_path)
+    for page_url in (url, f"{url}&page=2"):
+        cache.put(page_url, site(page_url))
+
+    with ReplayServer(recorded_site(tmp_path)) as server:
+        listings = search(None, [], server.url(url), fetcher=HTTPFetcher())
+        missing = requests.get(server.url(make_url("rent")))
+    assert len(listings) == 4
+    assert missing.status_code == 404
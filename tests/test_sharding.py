@@ -0,0 +1,126 @@
+"""Test sharded_search(), against a fake site with a pagination cap."""
+
+
+from urllib.parse import urlparse, parse_qs
+import pytest
+from ..trademe.fetchers import HTTPFetcher
+from ..trademe.search import make_url, search
+from ..trademe.sharding import (
+    sharded_search, _split_by_location, _split_by_price
+)
+from .fakes import FakeSession, NO_RESULTS_PAGE, make_card, make_results_page
+
+
+CARDS_PER_PAGE = 3
+CAP = 6  # Most results the fake site paginates through.
+
+# (listing ID, district, price):
+LISTINGS = [
+    (i, "wellington" if i % 2 else "lower-hutt", 100_000 * i)
+    for i in range(1, 21)
+]
+
+
+def site(url):
+    parsed = urlparse(url)
+    query = {k: int(v[0]) for k, v in parse_qs(parsed.query).items()}
+    path = parsed.path.split("/")
+    district = path[path.index("wellington") + 1] \
+        if path[-2] != "wellington" else None
+    matches = [
+        (i, d, price) for i, d, price in LISTINGS
+        if query.get("price_min", 0) <= price <= query.get("price_max", 1e9)
+        if district in (None, d)
+    ]
+
+    page = query.get("page", 1)
+    shown = matches[:CAP][(page - 1) * CARDS_PER_PAGE:page * CARDS_PER_PAGE]
+    if not shown:
+        return NO_RESULTS_PAGE
+    return make_results_page(
+        (make_card("sale_normal.html", i).replace("$860,000", f"${price:,}")
+         for i, _, price in shown),
+        result_count=len(matches)
+    )
+
+
+criteria = {"sale_or_rent": "sale", "region": "wellington"}
+
+
+def fetcher():
+    return HTTPFetcher(session=FakeSession(site))
+
+
+def listing_ids(listings):
+    return sorted(int(listing.listing_id) for listing in listings)
+
+
+def test_unsharded_search_loses_listings():
+    assert len(search(None, [], make_url(**criteria), fetcher=fetcher())) \
+        == CAP
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_shards_by_price(max_workers):
+    listings = sharded_search(criteria, max_results=CAP, fetcher=fetcher(),
+                              max_workers=max_workers)
+    assert listing_ids(listings) == list(range(1, 21))
+    # Cheapest band first:
+    prices = [int(l.price.strip("$").replace(",", "")) for l in listings]
+    assert prices == sorted(prices)
+
+
+def test_shards_by_location_then_price():
+    locations = {"wellington": {"wellington": [], "lower-hutt": []}}
+    session = FakeSession(site)
+    listings = sharded_search(
+        criteria, max_results=CAP, locations=locations, 
+        fetcher=HTTPFetcher(session=session)
+    )
+    assert listing_ids(listings) == list(range(1, 21))
+    # Split into districts, then (since there are no suburbs) price bands:
+    district_urls = [url for url in session.requested if "hutt" in url]
+    assert district_urls[0].endswith("/lower-hutt/search?")
+    assert any("price_min" in url for url in district_urls)
+
+
+def test_falls_back_to_price_for_missing_locations():
+    locations = {"wellington": {"lower-hutt": []}}  # No wellington.
+    with pytest.warns(UserWarning, match="split by price too"):
+        listings = sharded_search(criteria, max_results=CAP,
+                                  locations=locations, fetcher=fetcher())
+    assert listing_ids(listings) == list(range(1, 21))
+    # Lower Hutt's (even IDs) first, then the price bands make up the rest:
+    assert all(int(l.listing_id) % 2 == 0 for l in listings[:10])
+
+
+def test_warns_when_unsplittable():
+    with pytest.warns(UserWarning):
+        sharded_search({**criteria, "price_min": 100_000, 
+                        "price_max": 100_000}, max_results=0, 
+                       fetcher=fetcher())
+
+
+def test_split_by_price():
+    assert _split_by_price({"sale_or_rent": "rent", "price_min": 400}) == [
+        {"sale_or_rent": "rent", "price_min": 400, "price_max": 1000},
+        {"sale_or_rent": "rent", "price_min": 1001},
+    ]
+    assert _split_by_price(
+        {"sale_or_rent": "rent", "price_min": 400, "price_max": 600}
+    ) == [
+        {"sale_or_rent": "rent", "price_min": 400, "price_max": 500},
+        {"sale_or_rent": "rent", "price_min": 501, "price_max": 600},
+    ]
+
+
+@pytest.mark.parametrize("adjacent_suburbs", ["true", "True", True])
+def test_adjacent_suburbs_not_split_by_location(adjacent_suburbs):
+    criteria = {"sale_or_rent": "sale", "region": "wellington",
+                "district": "wellington", "adjacent_suburbs": adjacent_suburbs}
+    locations = {"wellington": {"wellington": ["kelburn", "thorndon"]}}
+    assert _split_by_location(criteria, locations) is None
+    assert _split_by_location(
+        {**criteria, "adjacent_suburbs": False}, locations
+    ) == [{**criteria, "adjacent_suburbs": False, "suburb": suburb}
+          for suburb in ("kelburn", "thorndon")]
@@ -0,0 +1,90 @@
+"""Test sinks, writing to pytest's tmp_path."""
+
+
+import csv
+import pytest
+from ..trademe import driver_pool
+from ..trademe.listing import Listing, ListingBatch
+from ..trademe.search import iter_search
+from ..trademe.sinks import CSVSink, ParquetSink
+from .fakes import FakeDriver, paged_site
+
+
+listings = [
+    Listing(title=f"Listing {i}", price="$500 per week", 
+            features="1 bedrooms. 1 bathrooms.", link=f"link/{i}", 
+            availability="Available: Now")
+    for i in range(5)
+]
+
+
+def read_csv(path):
+    with open(path, newline="") as f:
+        return list(csv.reader(f))
+
+
+def test_csv_sink_buffers(tmp_path):
+    path = tmp_path / "results.csv"
+    with CSVSink(path, buffer_size=3) as sink:
+        sink.write(listings[:2])
+        assert path.read_text() == ""
+        sink.write(listings[2:3])
+        assert len(read_csv(path)) == 1 + 3  # Header, plus 3 rows.
+        sink.write(listings[3:])
+    assert len(read_csv(path)) == 1 + 5
+
+
+def test_csv_sink_appends(tmp_path):
+    path = tmp_path / "results.csv"
+    for listing in listings:
+        with CSVSink(path) as sink:
+            sink.write([listing])
+
+    rows = read_csv(path)
+    assert rows[0] == list(ListingBatch.FIELDS)
+    assert [row[0] for row in rows[1:]] == [l.title for l in listings]
+    assert rows[1][ListingBatch.FIELDS.index("address")] == ""
+
+
+def test_parquet_sink_appends(tmp_path):
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("pyarrow")
+    for part in (listings[:2], listings[2:]):
+        with ParquetSink(tmp_path / "results") as sink:
+            sink.write(part)
+
+    assert len(list((tmp_path / "results").glob("*.parquet"))) == 2
+    df = pd.read_parquet(tmp_path / "results")
+    assert sorted(df["title"]) == [l.title for l in listings]
+
+
+def test_iter_search_writes_each_page(tmp_path, monkeypatch):
+    FakeDriver.site = staticmethod(paged_site(num_pages=3))
+    monkeypatch.setattr(driver_pool.webdriver, "Chrome", FakeDriver)
+    path = tmp_path / "results.csv"
+
+    url = "https://www.trademe.co.nz/a/property/residential/sale/search?id=1"
+    with CSVSink(path) as sink:
+        results = iter_search(url, sink=sink)
+        next(results)
+        # The whole first page is on disk before the first listing's used:
+        assert len(read_csv(path)) == 1 + 3
+        results.close()
+
+
+def test_iter_search_leaves_parquet_buffered(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    FakeDriver.site = staticmethod(paged_site(num_pages=3))
+    monkeypatch.setattr(driver_pool.webdriver, "Chrome", FakeDriver)
+    path = tmp_path / "results"
+
+    url = "https://www.trademe.co.nz/a/property/residential/sale/search?id=1"
+    with ParquetSink(path, buffer_size=5) as sink:
+        results = iter_search(url, sink=sink)
+        next(results)
+        # Not a part file per page, just per full buffer:
+        assert list(path.glob("*.parquet")) == []
+        for _ in results:
+            pass
+        assert len(list(path.glob("*.parquet"))) == 1
+    assert len(list(path.glob("*.parquet"))) == 2  # The rest, on close.
@@ -0,0 +1,135 @@
+"""Test RateLimiter, ConcurrencyController and ThrottledFetcher."""
+
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from ..trademe.fetchers import Fetcher, HTTPFetcher
+from ..trademe.search import search
+from ..trademe.throttle import (
+    ConcurrencyController, RateLimiter, ThrottledFetcher
+)
+from .fakes import FakeSession, NO_RESULTS_PAGE, paged_site
+
+
+url = "https://www.trademe.co.nz/a/property/residential/sale/search?id=1"
+block_page = "<html><body>Access denied</body></html>"
+
+
+class FlakyFetcher(Fetcher):
+    """Fails (raising, or with a block page) a set number of times first."""
+
+    def __init__(self, failures, block=False):
+        self.failures = failures
+        self.block = block
+        self.attempts = 0
+
+    def fetch(self, url):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            if self.block:
+                return block_page
+            raise ConnectionError("Connection reset.")
+        return NO_RESULTS_PAGE
+
+
+def test_rate_limiter_paces_fetches():
+    limiter = RateLimiter(rate=50)
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(limiter.acquire, [url] * 11))
+    assert time.monotonic() - start >= 0.18  # 10 waits of 1/50 seconds.
+
+
+def test_rate_limiter_buckets_per_host():
+    limiter = RateLimiter(rate=1, per_host={"slow.example": 0.1})
+    start = time.monotonic()
+    for host in ("a.example", "b.example", "c.example"):
+        limiter.acquire(f"https://{host}/")
+    assert time.monotonic() - start < 0.1
+    assert limiter.per_host["slow.example"] == 0.1
+
+
+@pytest.mark.parametrize("block", [False, True])
+def test_retries_until_success(block):
+    flaky_fetcher = FlakyFetcher(failures=2, block=block)
+    fetcher = ThrottledFetcher(flaky_fetcher, retries=2, backoff=0.001)
+    assert fetcher.fetch(url) == NO_RESULTS_PAGE
+    assert flaky_fetcher.attempts == 3
+
+
+def test_gives_up_after_retries():
+    fetcher = ThrottledFetcher(FlakyFetcher(failures=5), retries=2, 
+                               backoff=0.001)
+    with pytest.raises(RuntimeError) as e:
+        fetcher.fetch(url)
+    assert isinstance(e.value.__cause__, ConnectionError)
+
+
+def test_controller_halves_on_errors_then_recovers():
+    controller = ConcurrencyController(max_concurrency=8, window=4)
+    for _ in range(4):
+        controller.acquire()
+        controller.release(0.01, ok=False)
+    assert controller.limit == 4
+    for _ in range(8):
+        controller.acquire()
+        controller.release(0.01)
+    assert controller.limit == 6
+
+
+def test_controller_halves_on_latency():
+    controller = ConcurrencyController(max_concurrency=8, window=2)
+    for latency in (0.1, 0.1, 0.5, 0.5):
+        controller.acquire()
+        controller.release(latency)
+    assert controller.limit == 4
+
+
+def test_controller_limits_in_flight():
+    controller = ConcurrencyController(max_concurrency=2)
+    in_flight = []
+    most = []
+
+    def fetch(_):
+        with controller.slot():
+            in_flight.append(1)
+            most.append(len(in_flight))
+            time.sleep(0.01)
+            in_flight.pop()
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        list(executor.map(fetch, range(12)))
+    assert max(most) <= 2
+
+
+def test_search_retries():
+    pages = paged_site(num_pages=2)
+    failed = set()
+
+    def flaky_site(page_url):
+        if page_url not in failed:  # Every page fails once.
+            failed.add(page_url)
+            return block_page
+        return pages(page_url)
+
+    fetcher = HTTPFetcher(session=FakeSession(flaky_site))
+    throttled_fetcher = ThrottledFetcher(fetcher, retries=1, backoff=0.001)
+    assert len(search(None, [], url, fetcher=throttled_fetcher)) == 6
+
+
+def test_rate_limit_alone_passes_empty_pages_on():
+    pages = paged_site(num_pages=3)
+
+    def site_with_empty_page(page_url):
+        # Page 2 has no listings, and no "No results found" either:
+        return block_page if "page=2" in page_url else pages(page_url)
+
+    fetcher = HTTPFetcher(session=FakeSession(site_with_empty_page))
+    assert len(search(None, [], url, fetcher=fetcher, rate_limit=100)) == 6
+
+
+def test_search_arguments_wrap_fetcher():
+    flaky_fetcher = FlakyFetcher(failures=1)
+    search(None, [], url, fetcher=flaky_fetcher, rate_limit=100, retries=1)
+    assert flaky_fetcher.attempts == 2
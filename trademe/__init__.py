@@ -1,5 +1,48 @@
-from .search import make_url, search
+from .async_search import async_search
+from .cache import CachingFetcher, PageCache
+from .checkpoint import Checkpoint
+from .dedupe import Deduplicator
+from .delta import Delta, SeenStore, delta_search
+from .driver_pool import DriverPool
+from .fetchers import Fetcher, HTTPFetcher, SeleniumFetcher
+from .listing import Listing, ListingBatch
+from .metrics import CrawlStats
+from .pipeline import pipelined_search
+from .planner import SearchPlan, plan_searches, planned_search
+from .search import iter_search, make_url, search
+from .sharding import sharded_search
+from .sinks import CSVSink, ParquetSink, Sink
+from .throttle import ConcurrencyController, RateLimiter, ThrottledFetcher
 
 
-__all__ = ["make_url", "search"]
-
+__all__ = [
+    "async_search", 
+    "CachingFetcher", 
+    "Checkpoint", 
+    "ConcurrencyController", 
+    "CrawlStats", 
+    "CSVSink", 
+    "Deduplicator", 
+    "Delta", 
+    "DriverPool", 
+    "Fetcher", 
+    "HTTPFetcher", 
+    "Listing", 
+    "ListingBatch", 
+    "PageCache", 
+    "ParquetSink", 
+    "RateLimiter", 
+    "SeleniumFetcher", 
+    "SearchPlan", 
+    "SeenStore", 
+    "Sink", 
+    "ThrottledFetcher", 
+    "delta_search", 
+    "iter_search", 
+    "make_url", 
+    "pipelined_search", 
+    "plan_searches", 
+    "planned_search", 
+    "search", 
+    "sharded_search"
+]
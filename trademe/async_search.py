@@ -0,0 +1,156 @@
+"""Contains async_search(), for searching TradeMe from asyncio code."""
+
+
+import asyncio
+from functools import partial
+
+try:
+    import aiohttp
+except ImportError:  # Only needed by async_search(); pip install aiohttp.
+    aiohttp = None
+
+from .fetchers import DEFAULT_HEADERS
+from .search import (
+    _check_page_source, _check_parser, _get_next_page_url, _make_soup,
+    _page_soup_to_listings
+)
+
+
+_DONE = object()  # Put on the results queue when a URL's finished.
+
+
+async def async_search(
+        *urls,
+        max_concurrency=8,
+        session=None,
+        timeout=30,
+        executor=None,
+        parser="html.parser",
+        strain=False
+        ):
+    """Searches TradeMe using URLs, without blocking the event loop.
+
+    Works like search() with fetcher="http": pages are fetched with an async
+    HTTP client (aiohttp), at most max_concurrency at once, and parsed in an
+    executor so parsing doesn't hold up the event loop either. Pages of
+    different URLs are fetched concurrently; pages of the same URL are
+    fetched in order, since each one tells us whether there's another.
+
+    Unlike search(), there's no browser to fall back on for pages that come
+    back unrendered (or blocked), so pagination stops at the first page
+    without any listing cards, rather than carrying on forever.
+
+    Use it with async for:
+
+        async for listing in async_search(url_1, url_2):
+            ...
+
+    Args:
+        *urls: URL strings to be treated as the first page of a set of search
+            results, which async_search() will paginate over.
+        max_concurrency: The most pages being fetched at any one time, and
+            the most pages' listings waiting to be iterated over.
+        session: An optional aiohttp.ClientSession to fetch with, which is
+            left open. Otherwise async_search() makes its own.
+        timeout: Seconds to wait for each page before giving up.
+        executor: The concurrent.futures executor pages are parsed in. None
+            means asyncio's default thread pool.
+        parser: The BeautifulSoup parser used for pages; see search().
+        strain: If True, only parse the parts of pages needed; see search().
+
+    Yields:
+        Listing objects, page by page, in whichever order pages finish.
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1.")
+    _check_parser(parser)
+    parse = partial(_parse_page_source, parser=parser, strain=strain)
+
+    own_session = session is None
+    if own_session:
+        if aiohttp is None:
+            raise ImportError("async_search() needs aiohttp installed.")
+        session = aiohttp.ClientSession(
+            headers=DEFAULT_HEADERS,
+            connector=aiohttp.TCPConnector(limit=max_concurrency),
+            timeout=aiohttp.ClientTimeout(total=timeout)
+        )
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    # Bounded, so a slow consumer holds fetching up, rather than pages piling
+    # up in memory:
+    results = asyncio.Queue(maxsize=max_concurrency)
+    tasks = [
+        asyncio.create_task(
+            _crawl_url(url, session, semaphore, results, executor, parse)
+        )
+        for url in urls
+    ]
+
+    try:
+        unfinished = len(tasks)
+        while unfinished:
+            page_listings = await results.get()
+            if page_listings is _DONE:
+                unfinished -= 1
+            elif isinstance(page_listings, BaseException):
+                raise page_listings
+            else:
+                for listing in page_listings:
+                    yield listing
+    finally:
+        # Also runs if the caller stops iterating early, or a URL failed:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if own_session: await session.close()
+
+
+# Private helper methods: -----------------------------------------------------
+
+
+async def _crawl_url(url, session, semaphore, results, executor, parse):
+    """Paginates over a single URL, putting each page's listings on results.
+
+    Puts _DONE on results when finished, or the exception if one's raised.
+    """
+    loop = asyncio.get_running_loop()
+    current_url = url
+    try:
+        while True:
+            async with semaphore:
+                page_source = await _fetch(session, current_url)
+
+            has_next_page, listings = await loop.run_in_executor(
+                executor, parse, page_source
+            )
+            if not has_next_page:
+                break
+
+            await results.put(listings)
+            current_url = _get_next_page_url(current_url)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        await results.put(e)
+    else:
+        await results.put(_DONE)
+
+
+async def _fetch(session, url):
+    async with session.get(url) as response:
+        response.raise_for_status()
+        return await response.text()
+
+
+def _parse_page_source(page_source, **soup_kwargs):
+    """Returns (has_next_page, listings) for a page's source.
+
+    Like a page of _iter_page_soups(), but returns plain listings, so it can
+    run in an executor. Pages without cards end pagination too, since they
+    might be unrendered ones, which the next page would be as well.
+    """
+    has_next_page, has_listings = _check_page_source(page_source)
+    if not (has_next_page and has_listings):
+        return False, []
+    return True, _page_soup_to_listings(_make_soup(page_source, **soup_kwargs))
@@ -0,0 +1,222 @@
+"""Contains PageCache and CachingFetcher, for caching pages on disk.
+
+Pass a PageCache (or just a directory) to search() as cache=..., and pages are
+read through it: re-running a search within the cache's TTL doesn't fetch
+anything, and stale pages are revalidated with conditional requests where the
+fetcher supports them.
+"""
+
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse, parse_qsl, urlencode
+
+from .fetchers import Fetcher, _is_rendered
+
+
+# Query parameters that change between otherwise identical searches:
+VOLATILE_PARAMS = {"rsqid"}
+
+
+class CacheEntry:
+    """A cached page, from PageCache.get()."""
+    __slots__ = ("url", "page_source", "fetched_at", "etag", "last_modified",
+                 "fresh")
+
+    def __init__(self, url, page_source, fetched_at, etag, last_modified,
+                 fresh):
+        self.url = url
+        self.page_source = page_source
+        self.fetched_at = fetched_at
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fresh = fresh
+
+
+class PageCache:
+    """Stores pages on disk, gzipped, keyed by a hash of their normalised URL.
+
+    Entries older than `ttl` seconds are stale: get() still returns them (so
+    they can be revalidated), flagged with fresh=False. Once the cache holds
+    more than `max_bytes`, the least recently used entries are deleted.
+    Safe to share between search() workers.
+    """
+
+    def __init__(self, directory, ttl=3600, max_bytes=500 * 2**20):
+        """
+        Args:
+            directory: Where to keep cached pages; created if need be.
+            ttl: Seconds a page stays fresh for.
+            max_bytes: Most (compressed) bytes to keep on disk.
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._size = sum(path.stat().st_size for path in self._entry_paths())
+
+
+    def get(self, url):
+        """Returns the CacheEntry for url, or None if it isn't cached."""
+        path = self._path(url)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)  # Mark as recently used, for LRU eviction.
+        except (FileNotFoundError, EOFError, OSError, ValueError):
+            return None  # Not cached, evicted mid-read, or corrupt.
+
+        return CacheEntry(
+            url=entry["url"],
+            page_source=entry["page_source"],
+            fetched_at=entry["fetched_at"],
+            etag=entry["etag"],
+            last_modified=entry["last_modified"],
+            fresh=time.time() - entry["fetched_at"] < self.ttl
+        )
+
+
+    def put(self, url, page_source, etag=None, last_modified=None):
+        """Caches a page, then evicts old entries if the cache is too big."""
+        entry = {
+            "url": url,
+            "page_source": page_source,
+            "fetched_at": time.time(),
+            "etag": etag,
+            "last_modified": last_modified,
+        }
+        path = self._path(url)
+        temp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        with gzip.open(temp, "wt", encoding="utf-8") as f:
+            json.dump(entry, f)
+
+        with self._lock:
+            self._size -= _size_or_zero(path)
+            os.replace(temp, path)  # Atomic, so get() never sees half a page.
+            self._size += _size_or_zero(path)
+            if self._size > self.max_bytes:
+                self._evict()
+
+
+    def revalidated(self, entry):
+        """Marks a stale entry as fresh again, e.g. after a 304 response."""
+        self.put(entry.url, entry.page_source, entry.etag, entry.last_modified)
+
+
+    def clear(self):
+        """Deletes every cached page."""
+        with self._lock:
+            for path in self._entry_paths():
+                path.unlink(missing_ok=True)
+            self._size = 0
+
+
+    def _path(self, url):
+        key = hashlib.sha256(normalise_url(url).encode()).hexdigest()
+        return self.directory / f"{key}.json.gz"
+
+
+    def _entry_paths(self):
+        return self.directory.glob("*.json.gz")
+
+
+    def _evict(self):
+        """Deletes least recently used entries until under max_bytes."""
+        paths = sorted(self._entry_paths(), key=_mtime_or_zero)
+        for path in paths:
+            if self._size <= self.max_bytes:
+                break
+            self._size -= _size_or_zero(path)
+            path.unlink(missing_ok=True)
+
+
+class CachingFetcher(Fetcher):
+    """Wraps another fetcher, reading pages through a PageCache.
+
+    Fresh pages come straight from the cache. Stale pages are revalidated
+    with a conditional request if the wrapped fetcher has fetch_conditional()
+    (like HTTPFetcher), otherwise fetched again. Pages that hadn't rendered
+    (e.g. a JavaScript shell, or a block page) are passed on, but never
+    cached, so they're fetched again next time.
+    """
+
+    def __init__(self, fetcher, cache):
+        """
+        Args:
+            fetcher: The Fetcher used on cache misses. Closed on close().
+            cache: A PageCache.
+        """
+        self.fetcher = fetcher
+        self.cache = cache
+
+
+    def fetch(self, url):
+        entry = self.cache.get(url)
+        if entry is not None and entry.fresh:
+            return entry.page_source
+
+        if hasattr(self.fetcher, "fetch_conditional"):
+            page_source, etag, last_modified = self.fetcher.fetch_conditional(
+                url,
+                etag=entry.etag if entry else None,
+                last_modified=entry.last_modified if entry else None
+            )
+            if page_source is None:  # Not modified.
+                self.cache.revalidated(entry)
+                return entry.page_source
+        else:
+            page_source = self.fetcher.fetch(url)
+            etag = last_modified = None
+
+        if _is_rendered(page_source):
+            self.cache.put(url, page_source, etag, last_modified)
+        return page_source
+
+
+    def close(self):
+        self.fetcher.close()
+
+
+def normalise_url(url):
+    """Normalises a search URL, so equivalent URLs compare equal.
+
+    Lowercases the scheme, host and path (TradeMe doesn't care about case),
+    drops VOLATILE_PARAMS and "page=1" (the same as no page), and sorts the
+    remaining query parameters.
+    """
+    parsed = urlparse(url)
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parsed.query)
+        if key not in VOLATILE_PARAMS and (key, value) != ("page", "1")
+    )
+    return parsed._replace(
+        scheme=parsed.scheme.lower(),
+        netloc=parsed.netloc.lower(),
+        path=parsed.path.lower().rstrip("/"),
+        query=urlencode(query),
+        fragment=""
+    ).geturl()
+
+
+# Private helper methods: -----------------------------------------------------
+
+
+def _size_or_zero(path):
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def _mtime_or_zero(path):
+    try:
+        return path.stat().st_mtime
+    except FileNotFoundError:
+        return 0
@@ -0,0 +1,133 @@
+"""Contains Checkpoint, a journal of search progress for resuming searches.
+
+Pass a path to search() or iter_search() as resume=..., and each page's
+listings are appended to a journal there as soon as the page is scraped. If
+the search dies, re-run it with the same resume= path: URLs it finished aren't
+fetched again, and URLs it was partway through carry on from the next page.
+"""
+
+
+import json
+import os
+import threading
+from pathlib import Path
+
+from .cache import normalise_url
+from .listing import Listing, ListingBatch
+
+
+class Checkpoint:
+    """An append-only journal of scraped pages, one JSON object per line.
+
+    Each line is either a page, {"url": ..., "page": 2, "listings": [...]},
+    or a finished URL, {"url": ..., "done": true}. URLs are normalised (see
+    cache.normalise_url()). Every line is fsynced as it's written, and a line
+    cut short by a crash is ignored. Safe to share between search() workers.
+
+    Only pages already in the journal when it's opened are kept in memory
+    (to be resumed from); pages recorded after that are only written to disk,
+    so memory doesn't grow with the search. To resume from them, open the
+    journal again.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path: Journal file; loaded if it exists, and appended to.
+        """
+        self.path = Path(path)
+        self._pages = {}  # URL -> {page number: list of Listings}, loaded.
+        self._done = set()
+        self._lock = threading.Lock()
+
+        if self.path.exists():
+            self._load()
+        self._file = open(self.path, "a", encoding="utf-8")
+        if self._file.tell() and not _ends_with_newline(self.path):
+            self._file.write("\n")  # So a cut off line doesn't eat the next.
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    def pages(self, url):
+        """Returns url's journalled pages, as a list of (page number, list of
+        Listings), in page order.
+
+        Page numbers are the page= each page was fetched from. Empty pages
+        aren't journalled, so the numbers can skip.
+        """
+        return sorted(self._pages.get(normalise_url(url), {}).items())
+
+
+    def is_done(self, url):
+        """Checks if every page of url has been journalled."""
+        return normalise_url(url) in self._done
+
+
+    def record_page(self, url, page, listings):
+        """Journals a page of url's listings (to disk only).
+
+        Args:
+            url: The search's first URL.
+            page: The page number the listings were on.
+            listings: The page's Listings.
+        """
+        self._write({
+            "url": normalise_url(url),
+            "page": page,
+            "listings": [
+                {field: getattr(listing, field)
+                 for field in ListingBatch.FIELDS}
+                for listing in listings
+            ],
+        })
+
+
+    def record_done(self, url):
+        """Journals that every page of url has been scraped."""
+        key = normalise_url(url)
+        self._write({"url": key, "done": True})
+        with self._lock:
+            self._done.add(key)
+
+
+    def close(self):
+        self._file.close()
+
+
+    def _write(self, entry):
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+
+    def _load(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:  # Cut short by a crash.
+                    continue
+                if entry.get("done"):
+                    self._done.add(entry["url"])
+                else:
+                    self._pages.setdefault(entry["url"], {})[entry["page"]] = [
+                        Listing(**listing) for listing in entry["listings"]
+                    ]
+
+
+# Private helper methods: -----------------------------------------------------
+
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
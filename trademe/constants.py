@@ -1,6 +1,9 @@
 """Stores project-level constants."""
 
 
+import re
+
+
 TM_BASE_URL = "https://www.trademe.co.nz"
 
 # Listings:
@@ -10,6 +13,28 @@ NORMAL_TAG = "tm-property-search-card"
 
 LISTING_TAGS = [SUPER_FEATURE_TAG, PREMIUM_TAG, NORMAL_TAG]
 
+# "No results found" message, shown once you paginate past the last page:
+NO_RESULTS_TAG = "h2"
+NO_RESULTS_CLASS = "tm-no-results__heading"
+
+# CSS selector for either of the above; a page's loaded once it has one:
+PAGE_READY_SELECTOR = ", ".join(
+    LISTING_TAGS + [f"{NO_RESULTS_TAG}.{NO_RESULTS_CLASS}"]
+)
+
+# Total number of results, e.g. "Showing 1,234 results", on each results page:
+RESULT_COUNT_TAG = "h3"
+RESULT_COUNT_CLASS = "tm-search-header-result-count__heading"
+
+# Roughly the most results TradeMe paginates through for one search; pages
+# past it say "No results found". See sharding.py.
+MAX_PAGINATED_RESULTS = 1000
+
+# Sort orders that list the newest listings first, e.g. "sort_order=expirydesc"
+# ("Latest listings"). Delta searches can stop early on these; see delta.py.
+SORT_ORDER_PARAM = "sort_order"
+NEWEST_FIRST_SORT_ORDERS = ("expirydesc",)
+
 # Listing attributes:
 
 # Common attrbute identifiers:
@@ -59,3 +84,85 @@ AGENCY_NORMAL_CLASS = "tm-property-search-card__agency-logo ng-star-inserted"
 ALT_AGENCY_NORMAL_TAG = "div"
 ALT_AGENCY_NORMAL_CLASS = "tm-property-search-card__agency-text ng-star-inserted"
 
+
+# Field patterns: -------------------------------------------------------------
+
+# Compiled once; used by normalise.py (with pandas' vectorised string methods)
+# and planner.py.
+# - Price, e.g. "$520 per week", "Enquiries over $2,295,000", "$860,000":
+PRICE_PATTERN = re.compile(r"\$\s*(?P<price_amount>\d[\d,]*(?:\.\d+)?)")
+PRICE_PERIOD_PATTERN = re.compile(
+    r"per\s+(?P<price_period>week|month)", re.IGNORECASE
+)
+# - Features, e.g. "4 bedrooms. 2 bathrooms. floor area 175 meters square.
+#   land area 239 meters square.":
+BEDROOMS_PATTERN = re.compile(r"(?P<bedrooms>\d+)\s+bedrooms?", re.IGNORECASE)
+BATHROOMS_PATTERN = re.compile(
+    r"(?P<bathrooms>\d+)\s+bathrooms?", re.IGNORECASE
+)
+FLOOR_AREA_PATTERN = re.compile(
+    r"floor area\s+(?P<floor_area>[\d,.]+)\s*(?P<unit>\w+)", re.IGNORECASE
+)
+LAND_AREA_PATTERN = re.compile(
+    r"land area\s+(?P<land_area>[\d,.]+)\s*(?P<unit>\w+)", re.IGNORECASE
+)
+# - Availability, e.g. "Available: Fri, 22 Sep", "Available: Now":
+AVAILABLE_PATTERN = re.compile(
+    r"available:?\s*"
+    r"(?:(?P<now>now)|\w+,?\s+(?P<day>\d{1,2})\s+(?P<month>\w{3}))",
+    re.IGNORECASE
+)
+
+
+# Extraction specs: -----------------------------------------------------------
+
+# For each listing type, maps field name to a list of (tag, class_, getter)
+# selectors, tried in order until one finds something. class_ can be None, 
+# and getter is either "string" (tag.string), "text" (tag.text) or the name of
+# an attribute. A selector whose tag is missing, or whose tag is missing the 
+# attribute, falls through to the next selector.
+# These are compiled once by extraction.ExtractionSpec.
+
+COMMON_FIELDS = {
+    # Address for sales, availability for rentals; Listing sorts it out.
+    "address_or_availability": [(ADDRESS_TAG, None, "string")],
+    "title": [(TITLE_TAG, None, "string")],
+    "price": [(TAG_PRICE, PRICE_CLASS, "string")],
+    "features": [(FEATURES_TAG, FEATURES_CLASS, FEATURES_KEY)],
+    "link": [("a", None, "href")],
+}
+
+# Every listing has these; the rest are None if they can't be found.
+REQUIRED_FIELDS = list(COMMON_FIELDS)
+
+SUPER_FEATURE_FIELDS = {
+    **COMMON_FIELDS,
+    "agent": [
+        (AGENT_SUPER_FEATURE_TAG, AGENT_SUPER_FEATURE_CLASS, "text"),
+        (AGENT_SUPER_FEATURE_TAG, ALT_AGENT_SUPER_FEATURE_CLASS, "text"),
+    ],
+    "agency": [
+        (AGENCY_TAG, AGENCY_SUPER_FEATURE_CLASS, "alt"),
+        (AGENCY_TAG, ALT_AGENCY_SUPER_FEATURE_CLASS, "alt"),
+    ],
+}
+
+PREMIUM_FIELDS = {
+    **COMMON_FIELDS,
+    "agent": [(AGENT_PREMIUM_TAG, AGENT_PREMIUM_CLASS, "string")],
+    "agency": [
+        # Agency in normal place, then at the top of the listing:
+        (AGENCY_TAG, AGENCY_PREMIUM_CLASS, "alt"),
+        (AGENCY_TAG, ALT_AGENCY_PREMIUM_CLASS, "alt"),
+    ],
+}
+
+NORMAL_FIELDS = {
+    **COMMON_FIELDS,
+    "agent": [(AGENT_NORMAL_TAG, None, "string")],
+    "agency": [
+        # Agency logo, then agency text:
+        (AGENCY_TAG, AGENCY_NORMAL_CLASS, "alt"),
+        (ALT_AGENCY_NORMAL_TAG, ALT_AGENCY_NORMAL_CLASS, "string"),
+    ],
+}
@@ -0,0 +1,62 @@
+"""Contains Deduplicator, which drops repeated pages and listings in search().
+
+Overlapping searches (e.g. with adjacent_suburbs=true) find lots of the same
+listings, and super feature/premium cards can show up on more than one page.
+Pass dedupe=True (or a Deduplicator, to share between searches) to search()
+and each listing is only returned the first time it's scraped, and pages
+already scraped aren't fetched again.
+"""
+
+
+import threading
+
+from .cache import normalise_url
+
+
+class Deduplicator:
+    """Remembers the pages and listings a search has had, by hash.
+
+    Listings are keyed by listing ID (or their normalised link, if they don't
+    have one), and pages by normalised URL (see cache.normalise_url()), so
+    rsqids and the like don't matter. Safe to share between search() workers.
+    """
+
+    def __init__(self):
+        self._pages = set()
+        self._listings = set()
+        self._lock = threading.Lock()
+
+
+    def __len__(self):
+        """Number of distinct listings seen."""
+        return len(self._listings)
+
+
+    def claim_page(self, url):
+        """Returns True if url hasn't been claimed before (and claims it).
+
+        A page that's already been claimed has been (or is being) scraped by
+        someone else, who'll paginate on past it too.
+        """
+        key = normalise_url(url)
+        with self._lock:
+            if key in self._pages:
+                return False
+            self._pages.add(key)
+            return True
+
+
+    def filter(self, listings):
+        """Returns the listings (in order) that haven't been seen before."""
+        new_listings = []
+        with self._lock:
+            for listing in listings:
+                key = listing.listing_id
+                if key is None and listing.link is not None:
+                    key = normalise_url(listing.link)
+                if key is None:  # Nothing to tell it apart by, so keep it.
+                    new_listings.append(listing)
+                elif key not in self._listings:
+                    self._listings.add(key)
+                    new_listings.append(listing)
+        return new_listings
@@ -0,0 +1,252 @@
+"""Contains delta_search() and SeenStore, for cheaply re-running searches.
+
+delta_search() remembers every listing it's seen (by listing ID) in a
+SeenStore, and only returns what's new, changed or removed since last time.
+For searches sorted newest first (e.g. "sort_order=expirydesc"), it also
+stops paginating at the first page of listings it's already seen, since
+every page after that is older still.
+"""
+
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+from .cache import normalise_url
+from .constants import SORT_ORDER_PARAM, NEWEST_FIRST_SORT_ORDERS
+from .listing import Listing
+from .search import (
+    _check_parser, _make_fetcher, _iter_page_soups, _page_soup_to_listings
+)
+
+
+# Fields a listing's fingerprint is made from. Not link, since its rsqid
+# changes from one search to the next, or listing_id, which never changes:
+_FINGERPRINT_FIELDS = tuple(
+    name for name in Listing.__dataclass_fields__
+    if name not in ("link", "listing_id")
+)
+
+
+@dataclass
+class Delta:
+    """What's changed since the last delta_search().
+
+    new and changed are lists of Listings; removed is a list of the listing
+    IDs (see Listing.listing_id) that have gone.
+    """
+    new: list = field(default_factory=list)
+    changed: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+
+
+class SeenStore:
+    """The listings previous delta_search()es have seen, saved as JSON.
+
+    Holds a fingerprint (hash of every field but the link, whose rsqid
+    changes between searches) of each listing seen, and the listing IDs each
+    search URL found, in page order.
+    """
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path: JSON file to load from (if it exists) and save to. If None,
+                the store only lives in memory.
+        """
+        self.path = None if path is None else Path(path)
+        self.fingerprints = {}  # listing ID -> fingerprint
+        self.url_ids = {}  # normalised URL -> listing IDs, in page order
+
+        if self.path is not None and self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                stored = json.load(f)
+            self.fingerprints = stored["fingerprints"]
+            self.url_ids = stored["url_ids"]
+
+
+    def __contains__(self, listing_id):
+        return listing_id in self.fingerprints
+
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+
+    def save(self):
+        """Writes the store to its path (if it has one)."""
+        if self.path is None:
+            return
+        temp = self.path.with_name(self.path.name + ".tmp")
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(
+                {"fingerprints": self.fingerprints, "url_ids": self.url_ids}, f
+            )
+        os.replace(temp, self.path)  # Atomic, so a crash can't corrupt it.
+
+
+# Public methods: -------------------------------------------------------------
+
+
+def delta_search(
+        *urls,
+        seen,
+        newest_first=None,
+        timeout=None,
+        driver_arguments=["--headless=new", "--start-maximized"],
+        pool=None,
+        fetcher="selenium",
+        parser="html.parser",
+        strain=False,
+        cache=None
+        ):
+    """Searches TradeMe, returning only what's changed since last time.
+
+    Listings are compared to the ones in `seen`, which is then updated (and
+    saved, once every URL's been searched) for next time. Pages are fetched
+    one at a time, so nothing is fetched past where the search stops.
+
+    Removed listings are ones a URL found last time but not this time. If a
+    search stops early, only listings that were on the pages it did search
+    last time are checked; the rest are assumed to still be listed.
+
+    Args:
+        *urls: URL strings to search; see search().
+        seen: A SeenStore, or the path of one.
+        newest_first: Whether the URLs list the newest listings first, so
+            searches can stop at the first page of only seen listings. If
+            None, worked out from each URL's sort_order.
+        timeout: Most seconds the Selenium webdriver under the hood waits for
+            each page's listings (or "No results found") to show up.
+        driver_arguments: The arguments set for the webdriver.
+        pool: An optional DriverPool to borrow webdrivers from; see search().
+        fetcher: "selenium", "http", or a Fetcher instance; see search().
+        parser: The BeautifulSoup parser used for pages; see search().
+        strain: If True, only parse the parts of pages needed; see search().
+        cache: An optional PageCache, or directory, to read pages through.
+
+    Returns:
+        A Delta.
+    """
+    if not isinstance(seen, SeenStore):
+        seen = SeenStore(seen)
+    _check_parser(parser)
+
+    fetcher, own_fetcher = _make_fetcher(
+        fetcher,
+        pool=pool,
+        workers=1,
+        timeout=timeout,
+        driver_arguments=driver_arguments,
+        cache=cache
+    )
+
+    delta = Delta()
+    try:
+        for url in urls:
+            stop_early = _is_newest_first(url) if newest_first is None \
+                else newest_first
+            _delta_search_url(
+                url, fetcher, seen, delta, stop_early, parser=parser,
+                strain=strain
+            )
+    finally:
+        if own_fetcher: fetcher.close()
+
+    # Only saved once everything's searched, so a failed search doesn't mark
+    # listings as seen that were never returned:
+    seen.save()
+    return delta
+
+
+# Private helper methods: -----------------------------------------------------
+
+
+def _delta_search_url(url, fetcher, seen, delta, stop_early, **soup_kwargs):
+    """Paginates over a single URL, adding what's changed to delta."""
+    key = normalise_url(url)
+    previous_ids = seen.url_ids.get(key, [])
+    current_ids = {}  # Dict, for a set that keeps page order.
+    complete = True
+
+    page_soups = _iter_page_soups(url, fetcher, **soup_kwargs)
+    try:
+        for _, page_soup in page_soups:
+            all_seen = True
+            for listing in _page_soup_to_listings(page_soup):
+                listing_id = listing.listing_id
+                if listing_id is None:  # Can't track it, so always new.
+                    delta.new.append(listing)
+                    all_seen = False
+                    continue
+                if listing_id in current_ids:
+                    # e.g. listed just as we paginated, pushing it onto the
+                    # next page too.
+                    continue
+                current_ids[listing_id] = None
+
+                fingerprint = _fingerprint(listing)
+                previous = seen.fingerprints.get(listing_id)
+                if previous is None:
+                    delta.new.append(listing)
+                    all_seen = False
+                elif previous != fingerprint:
+                    delta.changed.append(listing)
+                seen.fingerprints[listing_id] = fingerprint
+
+            if stop_early and all_seen:
+                complete = False
+                break
+    finally:
+        page_soups.close()  # Stops pagination, if we stopped early.
+
+    if complete:
+        unchecked = []
+        checked = previous_ids
+    else:
+        # Listings from last time up to the last one seen this time would've
+        # been on the pages searched; the rest weren't checked:
+        positions = {listing_id: i for i, listing_id in enumerate(previous_ids)}
+        reached = max(
+            (positions[listing_id] for listing_id in current_ids
+             if listing_id in positions),
+            default=-1
+        )
+        checked = previous_ids[:reached + 1]
+        unchecked = [listing_id for listing_id in previous_ids[reached + 1:]
+                     if listing_id not in current_ids]
+
+    removed = [listing_id for listing_id in checked
+               if listing_id not in current_ids]
+    seen.url_ids[key] = list(current_ids) + unchecked
+
+    if not removed:
+        return
+    listed_elsewhere = _ids_listed_elsewhere(seen, key)
+    for listing_id in removed:
+        if listing_id not in listed_elsewhere:
+            delta.removed.append(listing_id)
+            seen.fingerprints.pop(listing_id, None)
+
+
+def _is_newest_first(url):
+    sort_orders = parse_qs(urlparse(url).query).get(SORT_ORDER_PARAM, [])
+    return any(sort_order.lower() in NEWEST_FIRST_SORT_ORDERS
+               for sort_order in sort_orders)
+
+
+def _fingerprint(listing):
+    """Hashes every field of a listing except its link."""
+    values = (getattr(listing, name) for name in _FINGERPRINT_FIELDS)
+    joined = "\x1f".join("" if value is None else value for value in values)
+    return hashlib.blake2b(joined.encode(), digest_size=8).hexdigest()
+
+
+def _ids_listed_elsewhere(seen, key):
+    """Returns a set of the listing IDs every URL in seen but key still has."""
+    return {listing_id
+            for url_key, listing_ids in seen.url_ids.items() if url_key != key
+            for listing_id in listing_ids}
@@ -0,0 +1,220 @@
+"""Contains DriverPool class, for sharing Chrome webdrivers between pages."""
+
+
+import threading
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver import ChromeOptions
+
+from .metrics import time_stage
+
+
+# Chrome preferences for drivers with block_resources: don't load images.
+BLOCKING_PREFS = {"profile.managed_default_content_settings.images": 2}
+
+# URLs drivers with block_resources don't load (there's no preference for
+# fonts or ads), blocked with Chrome's DevTools protocol:
+BLOCKED_URL_PATTERNS = [
+    # Fonts:
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    # Ads and trackers:
+    "*doubleclick.net*", "*googlesyndication.com*", "*googleadservices.com*",
+    "*googletagmanager.com*", "*google-analytics.com*", "*facebook.net*",
+]
+
+
+class DriverPool:
+    """Lends out Chrome webdrivers, so Chrome only starts once per worker.
+
+    Drivers are started lazily (never more than `size` at once), checked
+    before they're lent out, and quit + replaced once they've loaded
+    `recycle_after` pages - long-lived Chrome processes tend to bloat.
+
+    Use it as a context manager (or call close()) so drivers get quit:
+
+        with DriverPool(size=2) as pool:
+            with pool.borrow() as driver:
+                driver.get(url)
+    """
+
+    def __init__(
+            self,
+            size=1,
+            timeout=None,
+            driver_arguments=["--headless=new", "--start-maximized"],
+            recycle_after=50,
+            block_resources=True,
+            stats=None
+            ):
+        """
+        Args:
+            size: The maximum number of drivers running at once.
+            timeout: Most seconds SeleniumFetcher waits for a page's listing
+                cards (or "No results found" message) to show up. None means
+                fetchers.DEFAULT_READY_TIMEOUT.
+            driver_arguments: The arguments set for each driver.
+            recycle_after: Number of pages a driver loads before it's quit and
+                replaced. None means drivers are never recycled.
+            block_resources: If True, drivers don't load images, fonts or ads,
+                none of which search() needs.
+            stats: Optional CrawlStats to time Chrome starting up in.
+        """
+        if size < 1:
+            raise ValueError("size must be at least 1.")
+
+        self.size = size
+        self.timeout = timeout
+        self.driver_arguments = list(driver_arguments)
+        self.recycle_after = recycle_after
+        self.block_resources = block_resources
+        self.stats = stats
+
+        self._idle = []  # A stack, so the warmest driver stays busy.
+        self._pages = {}  # id(driver) -> pages loaded by that driver.
+        self._started = 0  # Drivers currently running, idle or borrowed.
+        self._available = threading.Condition()
+        self._closed = False
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    @contextmanager
+    def borrow(self):
+        """Lends out a driver for the duration of a with block.
+
+        Each borrow() counts as one page loaded, for recycling purposes.
+        """
+        driver = self.acquire()
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+
+    def acquire(self):
+        """Returns a healthy driver, blocking if all `size` drivers are busy.
+
+        Drivers from acquire() must be handed back with release().
+        """
+        if self._closed:
+            raise RuntimeError("DriverPool is closed.")
+
+        while True:
+            driver = self._take()
+            if driver is None:
+                return self._start_driver()
+            if _is_healthy(driver):
+                return driver
+            self._discard(driver)  # Dead driver; loop round for another.
+
+
+    def release(self, driver, pages=1):
+        """Hands a driver back to the pool.
+
+        Args:
+            driver: A driver from acquire().
+            pages: Number of pages loaded since it was acquired.
+        """
+        with self._available:
+            self._pages[id(driver)] = self._pages.get(id(driver), 0) + pages
+            worn_out = self.recycle_after is not None and \
+                self._pages[id(driver)] >= self.recycle_after
+            if not (self._closed or worn_out):
+                self._idle.append(driver)
+                self._available.notify()
+                return
+
+        self._discard(driver)
+
+
+    def close(self):
+        """Quits every idle driver. Borrowed drivers are quit on release."""
+        with self._available:
+            self._closed = True
+            idle, self._idle = self._idle, []
+
+        for driver in idle:
+            self._discard(driver)
+
+
+    # Private helper methods: -------------------------------------------------
+
+
+    def _take(self):
+        """Returns an idle driver, or None if there's room to start one.
+
+        Blocks while every driver is borrowed.
+        """
+        with self._available:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._started < self.size:
+                    self._started += 1  # Reserve the slot before starting.
+                    return None
+                self._available.wait()
+
+
+    def _start_driver(self):
+        options = ChromeOptions()
+        for driver_argument in self.driver_arguments:
+            options.add_argument(driver_argument)
+        if self.block_resources:
+            options.add_experimental_option("prefs", BLOCKING_PREFS)
+
+        try:
+            with time_stage(self.stats, "driver_start"):
+                driver = webdriver.Chrome(options=options)
+        except Exception:
+            self._free_slot()  # Give the reserved slot back.
+            raise
+
+        # No implicit wait: SeleniumFetcher waits for exactly what it needs.
+        if self.block_resources: _block_urls(driver)
+
+        return driver
+
+
+    def _discard(self, driver):
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass  # Already dead, which is probably why it's being discarded.
+
+        with self._available:
+            self._pages.pop(id(driver), None)
+        self._free_slot()
+
+
+    def _free_slot(self):
+        with self._available:
+            self._started -= 1
+            self._available.notify()  # A waiting acquire() can start a driver.
+
+
+def _block_urls(driver):
+    """Stops a driver loading BLOCKED_URL_PATTERNS, if it's Chrome enough."""
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd(
+            "Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS}
+        )
+    except (AttributeError, WebDriverException):
+        pass  # Only costs some bandwidth.
+
+
+def _is_healthy(driver):
+    """Checks a driver's browser is still responding."""
+    try:
+        driver.current_url
+    except WebDriverException:
+        return False
+    return True
@@ -0,0 +1,138 @@
+"""Contains ExtractionSpec, which pulls fields out of listing soups.
+
+Specs are declared in constants.py (e.g. constants.NORMAL_FIELDS) as ordered
+fallback selectors for each field. ExtractionSpec compiles them once, then
+extracts every field of a listing in a single walk of its soup.
+"""
+
+
+class ExtractionSpec:
+    """A compiled extraction spec for one type of listing.
+
+    Usage:
+        spec = ExtractionSpec(constants.NORMAL_FIELDS)
+        values = spec.extract(listing_soup)  # e.g. {"title": ..., ...}
+    """
+
+    def __init__(self, fields, required=()):
+        """
+        Args:
+            fields: Dict of field name: list of (tag, class_, getter)
+                selectors, in the format described in constants.py.
+            required: Field names extract() raises ValueError for, if none of
+                their selectors find anything.
+        """
+        self.fields = list(fields)
+        self.required = [field for field in required if field in fields]
+
+        # Each selector gets a slot. Slots are grouped by tag name, so each tag
+        # in a soup costs one dict lookup:
+        # tag name -> list of (slot, class matcher or None).
+        self._by_tag = {}
+        # field -> list of (slot, getter), in fallback order.
+        self._field_slots = {}
+        slot = 0
+        for field, selectors in fields.items():
+            self._field_slots[field] = []
+            for tag, class_, getter in selectors:
+                self._by_tag.setdefault(tag, []).append(
+                    (slot, _compile_class_matcher(class_))
+                )
+                self._field_slots[field].append((slot, _compile_getter(getter)))
+                slot += 1
+        self._num_slots = slot
+
+
+    def extract(self, listing_soup, stats=None):
+        """Extracts every field from a listing soup, in one walk.
+
+        Each selector uses the *first* tag in the soup matching its tag and
+        class_, like BeautifulSoup's find(). If that tag doesn't have what the
+        getter wants, the field falls back to its next selector.
+
+        Args:
+            listing_soup: BeautifulSoup or Tag of a listing.
+            stats: Optional CrawlStats, to count fields found by fallback
+                selectors, and fields nothing was found for.
+
+        Returns:
+            Dict of field name: value, or None if no selector found anything.
+        """
+        first_tags = self._find_first_tags(listing_soup)
+
+        values = {}
+        for field, slots in self._field_slots.items():
+            values[field] = None
+            for i, (slot, getter) in enumerate(slots):
+                tag = first_tags[slot]
+                if tag is None:
+                    continue
+                try:
+                    values[field] = getter(tag)
+                except KeyError:  # Tag's missing the attribute.
+                    continue
+                if i > 0 and stats is not None:
+                    stats.count("fallback_selector_hits", field=field)
+                break
+            else:
+                if stats is not None: stats.count("failed_fields", field=field)
+                if field in self.required:
+                    raise ValueError(f"Couldn't find {field} in listing.")
+
+        return values
+
+
+    def _find_first_tags(self, listing_soup):
+        """Returns a list of the first tag matching each slot, or None."""
+        first_tags = [None] * self._num_slots
+        remaining = self._num_slots
+        by_tag = self._by_tag
+
+        for tag in listing_soup.descendants:
+            candidates = by_tag.get(tag.name)  # Strings' names are None.
+            if candidates is None:
+                continue
+            for slot, matches_class in candidates:
+                if first_tags[slot] is not None:
+                    continue
+                if matches_class is None or matches_class(tag):
+                    first_tags[slot] = tag
+                    remaining -= 1
+            if remaining == 0:
+                break
+
+        return first_tags
+
+
+# Private helper methods: -----------------------------------------------------
+
+
+def _compile_class_matcher(class_):
+    """Returns a function matching class_ like BeautifulSoup's find() does.
+
+    i.e. class_ is either one of a tag's classes, or all of them, in order.
+    """
+    if class_ is None:
+        return None
+
+    def matches_class(tag):
+        classes = tag.get("class")
+        if not classes:
+            return False
+        if isinstance(classes, str):
+            return classes == class_
+        return class_ in classes or " ".join(classes) == class_
+
+    return matches_class
+
+
+def _compile_getter(getter):
+    """Returns a function getting a value out of a tag.
+
+    Attribute getters raise KeyError if the tag doesn't have the attribute.
+    """
+    if getter == "string":
+        return lambda tag: tag.string
+    if getter == "text":
+        return lambda tag: tag.text
+    return lambda tag: tag[getter]
@@ -0,0 +1,214 @@
+"""Contains fetchers, which turn a URL into page source for search().
+
+SeleniumFetcher renders pages in Chrome, like search() always has.
+HTTPFetcher is much lighter - a plain HTTP GET over pooled keep-alive
+connections - and can fall back to another fetcher for pages that only show
+listings once JavaScript has run.
+"""
+
+
+import requests
+from requests.adapters import HTTPAdapter
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+from .constants import LISTING_TAGS, NO_RESULTS_CLASS, PAGE_READY_SELECTOR
+from .driver_pool import DriverPool
+from .metrics import time_stage
+
+
+# Most seconds SeleniumFetcher waits for a page to show listings (or "No
+# results found"), if its pool doesn't say:
+DEFAULT_READY_TIMEOUT = 10
+
+
+DEFAULT_HEADERS = {
+    # TradeMe is less keen on python-requests' default user agent:
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+                  "AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/117.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Language": "en-NZ,en;q=0.9",
+}
+
+
+class Fetcher:
+    """Base class for fetchers.
+
+    Subclasses implement fetch(), and close() if they hold resources.
+    Fetchers are shared between search() workers, so fetch() must be safe to
+    call from several threads at once.
+    """
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    def fetch(self, url):
+        """Returns the page source of url, as a string."""
+        raise NotImplementedError
+
+
+    def close(self):
+        """Releases anything the fetcher holds (drivers, connections)."""
+        pass
+
+
+class SeleniumFetcher(Fetcher):
+    """Fetches pages with Chrome webdrivers borrowed from a DriverPool.
+
+    After loading a page, waits until it shows listing cards or a "No results
+    found" message (checking every poll_interval seconds), so each page takes
+    as long as it actually takes to render. If neither shows up within the
+    pool's timeout, the page is returned as it is.
+    """
+
+    def __init__(self, pool=None, poll_interval=0.1, stats=None, 
+                 **pool_kwargs):
+        """
+        Args:
+            pool: DriverPool to borrow from. If None, the fetcher starts its
+                own pool (from pool_kwargs), and closes it on close().
+            poll_interval: Seconds between checks for whether a page's ready.
+            stats: Optional CrawlStats to time driver.get(), waiting for the
+                page, and reading its source in. Also passed to the fetcher's
+                own pool, if it starts one.
+            **pool_kwargs: Passed to DriverPool, e.g. size, timeout.
+        """
+        self._own_pool = pool is None
+        self.pool = DriverPool(stats=stats, **pool_kwargs) \
+            if self._own_pool else pool
+        self.poll_interval = poll_interval
+        self.stats = stats
+
+
+    def fetch(self, url):
+        stats = self.stats
+        with self.pool.borrow() as driver:
+            with time_stage(stats, "driver_get"):
+                driver.get(url)
+            with time_stage(stats, "page_ready"):
+                self._wait_until_ready(driver)
+            with time_stage(stats, "page_source"):
+                return driver.page_source
+
+
+    def close(self):
+        if self._own_pool: self.pool.close()
+
+
+    def _wait_until_ready(self, driver):
+        timeout = self.pool.timeout
+        try:
+            WebDriverWait(
+                driver,
+                DEFAULT_READY_TIMEOUT if timeout is None else timeout,
+                poll_frequency=self.poll_interval
+            ).until(
+                lambda driver: driver.find_elements(
+                    By.CSS_SELECTOR, PAGE_READY_SELECTOR
+                )
+            )
+        except TimeoutException:
+            pass  # Probably a block page; up to the caller what to do.
+
+
+class HTTPFetcher(Fetcher):
+    """Fetches pages with plain HTTP GETs, over pooled keep-alive connections.
+
+    If a page comes back without any listing cards or a "No results found"
+    message (i.e. it needs JavaScript to render), it's fetched again with
+    `fallback`, if one is given.
+    """
+
+    def __init__(
+            self,
+            session=None,
+            pool_maxsize=10,
+            timeout=30,
+            headers=None,
+            fallback=None,
+            stats=None
+            ):
+        """
+        Args:
+            session: A requests.Session to use. If None, the fetcher makes its
+                own, and closes it on close().
+            pool_maxsize: Number of keep-alive connections kept per host;
+                should be at least the number of search() workers.
+            timeout: Seconds to wait for a response before giving up.
+            headers: Headers sent with each request. Defaults to
+                DEFAULT_HEADERS.
+            fallback: An optional Fetcher (e.g. a SeleniumFetcher) for pages
+                that need JavaScript. HTTPFetcher closes it on close().
+            stats: Optional CrawlStats to time requests in.
+        """
+        self._own_session = session is None
+        if self._own_session:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, 
+                                  pool_maxsize=pool_maxsize)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update(DEFAULT_HEADERS if headers is None
+                                   else headers)
+        self.session = session
+        self.timeout = timeout
+        self.fallback = fallback
+        self.stats = stats
+
+
+    def fetch(self, url):
+        return self.fetch_conditional(url)[0]
+
+
+    def fetch_conditional(self, url, etag=None, last_modified=None):
+        """Fetches url, unless it hasn't changed since a previous fetch.
+
+        Args:
+            url: URL to fetch.
+            etag: ETag header from the previous fetch, if any.
+            last_modified: Last-Modified header from the previous fetch.
+
+        Returns:
+            A tuple of (page source, ETag, Last-Modified). Page source is None
+            if the server says the page hasn't changed.
+        """
+        headers = {}
+        if etag: headers["If-None-Match"] = etag
+        if last_modified: headers["If-Modified-Since"] = last_modified
+
+        with time_stage(self.stats, "http_get"):
+            response = self.session.get(url, timeout=self.timeout, 
+                                        headers=headers)
+        if response.status_code == 304:
+            return None, etag, last_modified
+        response.raise_for_status()
+        page_source = response.text
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+
+        if self.fallback is not None and not _is_rendered(page_source):
+            # Rendered by the fallback, so the headers don't describe it:
+            return self.fallback.fetch(url), None, None
+
+        return page_source, etag, last_modified
+
+
+    def close(self):
+        if self._own_session: self.session.close()
+        if self.fallback is not None: self.fallback.close()
+
+
+def _is_rendered(page_source):
+    """Checks page source has listing cards or a "No results found" message.
+
+    Anything else is probably an unrendered JavaScript shell.
+    """
+    return NO_RESULTS_CLASS in page_source or \
+        any(f"<{tag}" in page_source for tag in LISTING_TAGS)
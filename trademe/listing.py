@@ -1,18 +1,43 @@
-"""Contains Listing class."""
+"""Contains Listing and ListingBatch classes."""
 
 
-from dataclasses import dataclass
+import re
+import sys
+from dataclasses import dataclass, fields
 from bs4 import BeautifulSoup
 from . import constants
+from .extraction import ExtractionSpec
 
 
-@dataclass
+# The numeric listing ID in a listing's link, e.g. ".../listing/4117008125":
+LISTING_ID_PATTERN = re.compile(r"/listing/(\d+)")
+
+# Compiled once, and shared by every Listing constructor call:
+_SUPER_FEATURE_SPEC = ExtractionSpec(
+    constants.SUPER_FEATURE_FIELDS, 
+    required=constants.REQUIRED_FIELDS
+)
+_PREMIUM_SPEC = ExtractionSpec(
+    constants.PREMIUM_FIELDS, 
+    required=constants.REQUIRED_FIELDS
+)
+_NORMAL_SPEC = ExtractionSpec(
+    constants.NORMAL_FIELDS, 
+    required=constants.REQUIRED_FIELDS
+)
+
+
+@dataclass(slots=True)
 class Listing:
     """Turns html into listing data.
-    
+
     Provides constructors for different types of listings.
+
+    Listings only hold plain strings (not BeautifulSoup's NavigableStrings,
+    which keep their whole page's soup alive), and use __slots__ rather than
+    a __dict__, to keep them small.
     """
-    # In _construct_common_attributes:
+    # Common to every listing type:
     title: str = None
     address: str = None
     price: str = None
@@ -20,10 +45,14 @@ class Listing:
     link: str = None
     availability: str = None
 
-    # Handled individually by constructors:
+    # Located differently for each listing type (see constants.py's specs):
     agent: str = None
     agency: str = None
 
+    # Parsed out of link, which isn't comparable between searches (its rsqid
+    # changes); see get_listing_id():
+    listing_id: str = None
+
 
     # Class methods, to be used as constructors:
     # (Needed because agent and agency have to be located differently for each
@@ -31,17 +60,27 @@ class Listing:
 
 
     @classmethod
-    def _construct_common_attributes(cls, listing_soup):
-        """Helper for constructors."""
+    def _from_fields(cls, values):
+        """Helper for constructors.
+
+        Args:
+            values: Dict of field values, from ExtractionSpec.extract().
+        """
         listing = cls()
 
+        # Plain str copies, so the listing doesn't keep the soup alive:
+        values = {
+            field: None if value is None else str(value)
+            for field, value in values.items()
+        }
+
         # More complicated attributes: ----------------------------------------
 
         # Address/availability:
         # - As mentioned in constants.py, TradeMe uses the same tag for rent
         #   listings' availability date AND sales listings' addresses.
         # - Below code just differentiates the string you get:
-        address_or_availability = listing_soup.find(constants.ADDRESS_TAG).string
+        address_or_availability = values.pop("address_or_availability")
         if "available" in address_or_availability.lower():
             listing.availability = address_or_availability
         else:
@@ -65,29 +104,23 @@ class Listing:
         #            class_="tm-property-search-card-attribute-icons__metric-value"
         #        ).string
                 
-        # Less complicated attributes: ---------------------------------------- 
-        
-        # Link, title, 
-        listing.link = cls._get_link(listing_soup)
-        listing.title = listing_soup.find(constants.TITLE_TAG).string
-        listing.price = listing_soup.find(
-            constants.TAG_PRICE, 
-            class_=constants.PRICE_CLASS
-        ).string
+        # Link, and the listing ID in it:
+        listing.link = cls._get_link(values.pop("link"))
+        listing.listing_id = get_listing_id(listing.link)
+
+        # Less complicated attributes: ----------------------------------------
+
+        # Title, price, agent, agency, and anything else in the spec.
         # Note that `features` picks up virtually everything except parking:
         # e.g. bedrooms, bathrooms, floor area, etc.
-        listing.features = listing_soup.find(  
-            constants.FEATURES_TAG,
-            class_=constants.FEATURES_CLASS
-        )[constants.FEATURES_KEY]
+        for field, value in values.items():
+            setattr(listing, field, value)
 
         return listing
-    
+
 
     @classmethod
-    def _get_link(cls, listing_tag):
-        # Don't worry about it being unsafe, there'll always be an href:
-        href = listing_tag.find("a")["href"]  
+    def _get_link(cls, href):
         if href.startswith("/a/") == False:
             # Then add "/a/":
             href = "/a/" + href
@@ -95,108 +128,112 @@ class Listing:
 
 
     @classmethod
-    def from_super_feature(cls, listing_soup):
-        """Construct Listing object from super feature listing soup."""
-        
-        listing = cls._construct_common_attributes(listing_soup)
-
-        # Agent
-        try:
-            listing.agent = listing_soup.find(
-                constants.AGENT_SUPER_FEATURE_TAG,
-                class_=constants.AGENT_SUPER_FEATURE_CLASS
-            ).text
-        except AttributeError: 
-            try: 
-                listing.agent = listing_soup.find(
-                    constants.AGENT_SUPER_FEATURE_TAG,
-                    class_=constants.ALT_AGENT_SUPER_FEATURE_CLASS
-                ).text
-            except AttributeError:
-                pass  
-        
-        # Agency
-        try:
-            listing.agency = listing_soup.find(
-                constants.AGENCY_TAG,
-                class_=constants.AGENCY_SUPER_FEATURE_CLASS
-            )["alt"]
-        except (KeyError, TypeError):
-            try: 
-                listing.agency = listing_soup.find(
-                    constants.AGENCY_TAG,
-                    class_=constants.ALT_AGENCY_SUPER_FEATURE_CLASS
-                )["alt"]
-            except (KeyError, TypeError):
-                pass  # Probably a private listing
+    def from_super_feature(cls, listing_soup, stats=None):
+        """Construct Listing object from super feature listing soup.
 
-        return listing
+        If stats (a CrawlStats) is given, fallback selector hits and failed
+        fields are counted in it.
+        """
+        return cls._from_fields(_SUPER_FEATURE_SPEC.extract(listing_soup, stats))
 
 
     @classmethod
-    def from_premium_listing(cls, listing_soup):
-        """Construct Listing object from premium listing soup."""
-
-        listing = cls._construct_common_attributes(listing_soup)
-
-        # Agent
-        try:
-            listing.agent = listing_soup.find(
-                constants.AGENT_PREMIUM_TAG,
-                class_=constants.AGENT_PREMIUM_CLASS
-            ).string
-        except AttributeError:
-            pass
-        
-        # Agency
-        try:
-            # Agency in normal place:
-            listing.agency = listing_soup.find(
-                constants.AGENCY_TAG,
-                class_=constants.AGENCY_PREMIUM_CLASS
-            )["alt"]
-        except (KeyError, TypeError):
-            try:
-                # Agency at the top of the listing insteaD:
-                listing.agency = listing_soup.find(
-                    constants.AGENCY_TAG,
-                    class_=constants.ALT_AGENCY_PREMIUM_CLASS
-                )["alt"]
-            except (KeyError, TypeError):
-                pass  # Will be None if no agency found either way.
-        
-        return listing
+    def from_premium_listing(cls, listing_soup, stats=None):
+        """Construct Listing object from premium listing soup.
+
+        See from_super_feature() for stats.
+        """
+        return cls._from_fields(_PREMIUM_SPEC.extract(listing_soup, stats))
 
 
     @classmethod
-    def from_normal_listing(cls, listing_soup):
-        """Construct Listing object from normal listing soup."""
-        
-        listing = cls._construct_common_attributes(listing_soup)
-
-        # Agent
-        try:
-            listing.agent = listing_soup.find(
-                constants.AGENT_NORMAL_TAG
-            ).string
-        except AttributeError:
-            pass
-
-        # Agency
-        try:
-            # Try getting agency from logos:
-            listing.agency = listing_soup.find(
-                constants.AGENCY_TAG,
-                class_=constants.AGENCY_NORMAL_CLASS
-            )["alt"]
-        except (KeyError, TypeError): 
-            try:
-                listing.agency = listing_soup.find(
-                    constants.ALT_AGENCY_NORMAL_TAG,
-                    class_=constants.ALT_AGENCY_NORMAL_CLASS
-                ).string
-            except:
-                pass
+    def from_normal_listing(cls, listing_soup, stats=None):
+        """Construct Listing object from normal listing soup.
+
+        See from_super_feature() for stats.
+        """
+        return cls._from_fields(_NORMAL_SPEC.extract(listing_soup, stats))
+
+
+def get_listing_id(link):
+    """Returns the numeric listing ID in a listing's link, as a string.
+
+    e.g. "4117008125" for ".../palm-beach/listing/4117008125?rsqid=...". 
+    Returns None if the link doesn't have one.
+    """
+    match = LISTING_ID_PATTERN.search(link or "")
+    return match.group(1) if match else None
+
+
+# Fields with few distinct values, which ListingBatch interns so each distinct
+# value is only stored once:
+_INTERNED_FIELDS = {"price", "features", "availability", "agent", "agency"}
+
+
+class ListingBatch:
+    """Stores listings column by column: one list per Listing field.
+
+    Much lighter than a list of Listings for big searches, since there are 
+    only as many lists as fields (rather than an object per listing), and 
+    repeated values like agency names are only stored once.
+
+    Behaves like a read-only list of Listings (len(), indexing, iterating),
+    which are built on the fly, and can be added to with append()/extend().
+    """
+    __slots__ = ("columns",)
+
+    FIELDS = tuple(field.name for field in fields(Listing))
+
+
+    def __init__(self, listings=()):
+        """
+        Args:
+            listings: Optional iterable of Listings to start with.
+        """
+        self.columns = {field: [] for field in self.FIELDS}
+        self.extend(listings)
+
+
+    def __len__(self):
+        return len(self.columns[self.FIELDS[0]])
+
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return Listing(*(self.columns[field][index] for field in self.FIELDS))
+
+
+    def __iter__(self):
+        for row in zip(*self.columns.values()):
+            yield Listing(*row)
+
+
+    def __repr__(self):
+        return f"ListingBatch(<{len(self)} listings>)"
+
+
+    def append(self, listing):
+        """Adds a Listing to the end of the batch."""
+        for field, column in self.columns.items():
+            value = getattr(listing, field)
+            if field in _INTERNED_FIELDS and value is not None:
+                value = sys.intern(value)
+            column.append(value)
+
+
+    def extend(self, listings):
+        """Adds an iterable of Listings to the end of the batch."""
+        for listing in listings:
+            self.append(listing)
+
+
+    def to_dict(self):
+        """Returns a dict of field name: list of values (copies)."""
+        return {field: list(values) for field, values in self.columns.items()}
 
-        return listing
 
+    def to_dataframe(self):
+        """Returns a pandas DataFrame, with a column per field."""
+        import pandas as pd  # Optional dependency, only needed here.
+        return pd.DataFrame(self.columns, columns=self.FIELDS)
@@ -0,0 +1,252 @@
+"""Contains CrawlStats, which collects timings and counts from a search.
+
+Pass a CrawlStats to search() or iter_search() as stats=..., and it's filled
+in as the search runs:
+- Timers, for each stage a page goes through: "driver_start" (Chrome
+  starting up), "driver_get", "page_ready" (waiting for listings to render),
+  "page_source", "http_get", "fetch" (the whole fetch, whatever the fetcher),
+  "parse" (building the BeautifulSoup) and "listings" (the Listing
+  constructors). Each is a histogram of seconds, e.g. "parse_seconds".
+- Counters: "pages" (by kind: results, empty or no_results), "cards" (by
+  type), "fallback_selector_hits" (fields found by a fallback selector,
+  rather than the first) and "failed_fields" (fields nothing was found for),
+  both by field.
+- Histograms: "cards_per_page", as well as the timers.
+Export it with to_dict() or to_json(), or to_prometheus() for Prometheus'
+text format.
+
+Without stats, none of this runs: each hook is just a check for None.
+"""
+
+
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+
+
+# Histogram buckets (upper bounds) for timers, in seconds:
+TIME_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30,
+                60)
+
+# Histogram buckets for counts, e.g. cards_per_page:
+COUNT_BUCKETS = (0, 1, 5, 10, 20, 30, 50, 100)
+
+_NO_TIMER = nullcontext()  # Reusable, so timing nothing costs nothing.
+
+
+class Histogram:
+    """Counts of observed values, in buckets (Prometheus-style)."""
+    __slots__ = ("buckets", "bucket_counts", "count", "sum")
+
+    def __init__(self, buckets):
+        """
+        Args:
+            buckets: Upper bounds of the buckets, in increasing order. Values
+                above the last one are only counted in count and sum.
+        """
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0
+
+
+    def observe(self, value):
+        self.bucket_counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+    def cumulative(self):
+        """Returns a list of (upper bound, number of values <= it), ending
+        with (inf, count).
+        """
+        bounds = self.buckets + (float("inf"),)
+        totals = []
+        total = 0
+        for bound, bucket_count in zip(bounds, self.bucket_counts):
+            total += bucket_count
+            totals.append((bound, total))
+        return totals
+
+
+class CrawlStats:
+    """Counters and histograms from a search. Safe to share between search()
+    workers.
+
+    Usage:
+        stats = CrawlStats()
+        listings = search(None, [], url, stats=stats)
+        print(stats.total("parse_seconds"), stats.get("pages", kind="empty"))
+        print(stats.to_prometheus())
+
+    Attributes:
+        counters: Dict of (name, labels) -> count, where labels is a sorted
+            tuple of (label, value) pairs.
+        histograms: Dict of (name, labels) -> Histogram.
+    """
+
+    def __init__(self, callback=None):
+        """
+        Args:
+            callback: Optional function called with (name, value, labels) on
+                every count() and observe(), e.g. to pass them on to another
+                metrics library. labels is a dict.
+        """
+        self.counters = {}
+        self.histograms = {}
+        self.callback = callback
+        self._lock = threading.Lock()
+
+
+    def __repr__(self):
+        return f"CrawlStats(<{len(self.counters)} counters, " \
+            f"{len(self.histograms)} histograms>)"
+
+
+    def count(self, name, n=1, **labels):
+        """Adds n to a counter."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+        if self.callback is not None: self.callback(name, n, labels)
+
+
+    def observe(self, name, value, buckets=TIME_BUCKETS, **labels):
+        """Adds a value to a histogram.
+
+        Args:
+            name: Histogram name.
+            value: Value observed.
+            buckets: The histogram's buckets, used if it's new.
+            **labels: Labels for the value, e.g. field="price".
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+        if self.callback is not None: self.callback(name, value, labels)
+
+
+    @contextmanager
+    def timer(self, stage, **labels):
+        """Context manager timing a with block, into f"{stage}_seconds"."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(f"{stage}_seconds", time.perf_counter() - start,
+                         **labels)
+
+
+    def get(self, name, **labels):
+        """Returns a counter's value; 0 if it's never been counted."""
+        return self.counters.get((name, tuple(sorted(labels.items()))), 0)
+
+
+    def total(self, name):
+        """Returns a counter's total, or a histogram's sum, across labels."""
+        with self._lock:
+            if any(key[0] == name for key in self.histograms):
+                return sum(histogram.sum for key, histogram
+                           in self.histograms.items() if key[0] == name)
+            return sum(value for key, value in self.counters.items()
+                       if key[0] == name)
+
+
+    def to_dict(self):
+        """Returns every counter and histogram as a JSON-friendly dict.
+
+        Series are keyed Prometheus-style, e.g. 'cards{type="normal"}'.
+        """
+        with self._lock:
+            return {
+                "counters": {
+                    _series(name, labels): value
+                    for (name, labels), value in sorted(self.counters.items())
+                },
+                "histograms": {
+                    _series(name, labels): {
+                        "count": histogram.count,
+                        "sum": histogram.sum,
+                        "buckets": {
+                            _format_bound(bound): total
+                            for bound, total in histogram.cumulative()
+                        },
+                    }
+                    for (name, labels), histogram
+                    in sorted(self.histograms.items())
+                },
+            }
+
+
+    def to_json(self, **json_kwargs):
+        """Returns to_dict() as a JSON string."""
+        return json.dumps(self.to_dict(), **json_kwargs)
+
+
+    def to_prometheus(self, prefix="trademe"):
+        """Returns every counter and histogram in Prometheus' text format.
+
+        Counters are suffixed with _total, e.g. trademe_pages_total.
+        """
+        lines = []
+        with self._lock:
+            typed = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                metric = f"{prefix}_{name}_total"
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} counter")
+                    typed.add(metric)
+                lines.append(f"{_series(metric, labels)} {value}")
+
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                metric = f"{prefix}_{name}"
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} histogram")
+                    typed.add(metric)
+                for bound, total in histogram.cumulative():
+                    bucket_labels = labels + (("le", _format_bound(bound)),)
+                    lines.append(
+                        f"{_series(metric + '_bucket', bucket_labels)} {total}"
+                    )
+                lines.append(f"{_series(metric + '_sum', labels)} "
+                             f"{histogram.sum}")
+                lines.append(f"{_series(metric + '_count', labels)} "
+                             f"{histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+# Public methods: -------------------------------------------------------------
+
+
+def time_stage(stats, stage, **labels):
+    """Returns stats.timer(stage), or a do-nothing context manager if stats
+    is None.
+    """
+    if stats is None:
+        return _NO_TIMER
+    return stats.timer(stage, **labels)
+
+
+# Private helper methods: -----------------------------------------------------
+
+
+def _series(name, labels):
+    if not labels:
+        return name
+    label_text = ",".join(
+        f'{label}="{_escape(str(value))}"' for label, value in labels
+    )
+    return f"{name}{{{label_text}}}"
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(bound)
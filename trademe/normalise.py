@@ -0,0 +1,117 @@
+"""Contains normalise(), which turns listings' strings into typed columns.
+
+Needs pandas, so isn't imported by `import trademe`; use:
+
+    from trademe.normalise import normalise
+"""
+
+
+from datetime import date
+
+import pandas as pd
+
+from .constants import (
+    PRICE_PATTERN, PRICE_PERIOD_PATTERN, BEDROOMS_PATTERN, BATHROOMS_PATTERN,
+    FLOOR_AREA_PATTERN, LAND_AREA_PATTERN, AVAILABLE_PATTERN
+)
+from .listing import ListingBatch
+
+
+# How far in the past an availability date can be before it's assumed to be
+# next year's (e.g. "Available: Mon, 8 Jan", seen in December):
+_MAX_DAYS_AGO = 90
+
+
+def normalise(listings, reference_date=None):
+    """Parses listings' price, features and availability into typed columns.
+
+    All parsing is done with vectorised pandas string methods, so it's fast
+    even for hundreds of thousands of listings.
+
+    Adds these columns (missing values are NaN/NaT):
+    - price_amount (float): the first dollar amount in price. Note prices like
+      "Enquiries over $X" give X, and "Deadline sale" gives NaN.
+    - price_period (string): "week" or "month" for rentals.
+    - bedrooms, bathrooms (Int64).
+    - floor_area, land_area (float): in square metres; hectares are converted.
+    - available_date (datetime64): the date in availability. Availability
+      strings don't have years, so the year is the one that puts the date
+      closest after reference_date (allowing dates up to 90 days before it).
+      "Available: Now" gives reference_date.
+
+    Args:
+        listings: A list of Listings, a ListingBatch, or a DataFrame with
+            price, features and availability columns (e.g. from
+            ListingBatch.to_dataframe()).
+        reference_date: Date listings were scraped, for availability.
+            Defaults to today.
+
+    Returns:
+        A new DataFrame, with the original columns plus the columns above.
+    """
+    if isinstance(listings, pd.DataFrame):
+        df = listings.copy()
+    else:
+        if not isinstance(listings, ListingBatch):
+            listings = ListingBatch(listings)
+        df = listings.to_dataframe()
+
+    reference_date = pd.Timestamp(reference_date or date.today()).normalize()
+
+    price = df["price"].astype("string")
+    df["price_amount"] = _to_float(
+        price.str.extract(PRICE_PATTERN)["price_amount"]
+    )
+    df["price_period"] = price.str.extract(PRICE_PERIOD_PATTERN)["price_period"]
+
+    features = df["features"].astype("string")
+    for pattern, column in ((BEDROOMS_PATTERN, "bedrooms"),
+                            (BATHROOMS_PATTERN, "bathrooms")):
+        df[column] = pd.to_numeric(
+            features.str.extract(pattern)[column]
+        ).astype("Int64")
+    for pattern, column in ((FLOOR_AREA_PATTERN, "floor_area"),
+                            (LAND_AREA_PATTERN, "land_area")):
+        df[column] = _to_square_metres(features.str.extract(pattern), column)
+
+    df["available_date"] = _to_available_date(
+        df["availability"].astype("string"), reference_date
+    )
+
+    return df
+
+
+# Private helper methods: -----------------------------------------------------
+
+
+def _to_float(numbers):
+    """Converts a Series of strings like "2,295,000" to floats."""
+    return pd.to_numeric(numbers.str.replace(",", "", regex=False)) \
+        .astype(float)
+
+
+def _to_square_metres(extracted, column):
+    """Converts extracted (area, unit) columns to square metres."""
+    area = _to_float(extracted[column])
+    hectares = extracted["unit"].str.lower().str.startswith("hectare") \
+        .fillna(False)
+    return area.where(~hectares, area * 10_000)
+
+
+def _to_available_date(availability, reference_date):
+    """Converts availability strings to dates; see normalise()."""
+    extracted = availability.str.extract(AVAILABLE_PATTERN)
+
+    day_month = extracted["day"] + " " + extracted["month"].str.title()
+    this_year = pd.to_datetime(
+        day_month + f" {reference_date.year}", format="%d %b %Y",
+        errors="coerce"
+    )
+    next_year = pd.to_datetime(
+        day_month + f" {reference_date.year + 1}", format="%d %b %Y",
+        errors="coerce"
+    )
+    too_old = this_year < reference_date - pd.Timedelta(days=_MAX_DAYS_AGO)
+    available_date = this_year.where(~too_old, next_year)
+
+    return available_date.where(extracted["now"].isna(), reference_date)
@@ -0,0 +1,201 @@
+"""Contains pipelined_search(), which fetches and parses pages in parallel.
+
+search() fetches a page, parses it, then fetches the next, so the browser
+sits idle while Python parses, and parsing only ever gets one core (the GIL).
+pipelined_search() splits that into two stages:
+- Fetch threads only fetch pages, and push their raw source onto a bounded
+  queue. Whether there's a next page is checked on the raw source (see
+  search._check_page_source()), so they never wait on the parsers.
+- A pool of processes parses pages off the queue, and sends back plain
+  tuples of listing fields (much cheaper to pickle than soups or Listings).
+If parsing falls behind, the queue fills up and fetching waits for it. If
+the parsing side fails (e.g. a parser process dies, or Ctrl+C), fetch threads
+are told to stop, so none are left waiting on a full queue.
+"""
+
+
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from .listing import Listing, ListingBatch
+from .search import (
+    _check_parser, _make_fetcher, _make_soup, _page_soup_to_listings,
+    _check_page_source, _get_next_page_url
+)
+
+
+_DONE = object()  # Put on the page queue once every URL's been fetched.
+
+_PUT_TIMEOUT = 0.1  # Seconds between checks for stopping, on a full queue.
+
+
+# Public methods: -------------------------------------------------------------
+
+
+def pipelined_search(
+        *urls,
+        max_workers=1,
+        parse_workers=None,
+        queue_size=None,
+        timeout=None,
+        driver_arguments=["--headless=new", "--start-maximized"],
+        pool=None,
+        fetcher="selenium",
+        parser="html.parser",
+        strain=False,
+        cache=None,
+        batch=False
+        ):
+    """Searches TradeMe, fetching in threads and parsing in processes.
+
+    Returns the same listings as search(), in the same order.
+
+    Args:
+        *urls: URL strings to search; see search().
+        max_workers: Number of URLs fetched at once, each in its own thread.
+        parse_workers: Number of processes parsing pages. None means one per
+            CPU.
+        queue_size: Most fetched pages waiting to be parsed before fetching
+            waits. None means twice parse_workers.
+        timeout: Most seconds the Selenium webdriver under the hood waits for
+            each page's listings (or "No results found") to show up.
+        driver_arguments: The arguments set for the webdriver.
+        pool: An optional DriverPool to borrow webdrivers from; see search().
+        fetcher: "selenium", "http", or a Fetcher instance; see search().
+        parser: The BeautifulSoup parser used for pages; see search().
+        strain: If True, only parse the parts of pages needed; see search().
+        cache: An optional PageCache, or directory, to read pages through.
+        batch: If True, return a ListingBatch instead of a list.
+
+    Returns:
+        A list of Listing objects (or a ListingBatch), in the same order as
+        *urls.
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1.")
+    _check_parser(parser)
+    parse_workers = parse_workers or os.cpu_count() or 1
+    queue_size = queue_size or 2 * parse_workers
+
+    fetcher, own_fetcher = _make_fetcher(
+        fetcher,
+        pool=pool,
+        workers=min(max_workers, max(len(urls), 1)),
+        timeout=timeout,
+        driver_arguments=driver_arguments,
+        cache=cache
+    )
+
+    pages = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()  # Set if parsing fails, to stop fetching.
+    parsed = {}  # (URL index, page index) -> future of listing tuples.
+    try:
+        with ThreadPoolExecutor(max_workers) as fetch_executor, \
+                ProcessPoolExecutor(
+                    parse_workers, mp_context=_process_context()
+                ) as parse_executor:
+            fetches = [
+                fetch_executor.submit(
+                    _fetch_pages, i, url, fetcher, pages, stop
+                )
+                for i, url in enumerate(urls)
+            ]
+            threading.Thread(
+                target=_finish_when_done, args=(fetches, pages, stop),
+                daemon=True
+            ).start()
+
+            # Hand pages to the parsers as they arrive, but only as many at
+            # once as the queue holds, so the queue's what limits fetching:
+            parsing = threading.Semaphore(queue_size)
+            try:
+                while (page := pages.get()) is not _DONE:
+                    key, page_source = page
+                    parsing.acquire()
+                    future = parse_executor.submit(
+                        _parse_page_source, page_source, parser=parser,
+                        strain=strain
+                    )
+                    future.add_done_callback(lambda _: parsing.release())
+                    parsed[key] = future
+            except BaseException:
+                # Otherwise fetch threads could wait on the full queue
+                # forever, and leaving the with block waits for them:
+                stop.set()
+                raise
+
+            for fetch in fetches:
+                fetch.result()  # Raises if fetching failed.
+    finally:
+        if own_fetcher: fetcher.close()
+
+    all_listings = ListingBatch() if batch else []
+    for key in sorted(parsed):
+        all_listings.extend(Listing(*row) for row in parsed[key].result())
+    return all_listings
+
+
+# Private helper methods: -----------------------------------------------------
+
+
+def _fetch_pages(url_index, url, fetcher, pages, stop):
+    """Fetches every page of url, putting ((url_index, page_index),
+    page_source) on the pages queue, until there are no more or stop is set.
+    """
+    current_url = url
+    page_index = 0
+    while not stop.is_set():
+        page_source = fetcher.fetch(current_url)
+        has_next_page, has_listings = _check_page_source(page_source)
+        if not has_next_page:
+            return
+        if has_listings:  # Nothing to parse otherwise.
+            _put(pages, ((url_index, page_index), page_source), stop)
+        current_url = _get_next_page_url(current_url)
+        page_index += 1
+
+
+def _finish_when_done(fetches, pages, stop):
+    for fetch in fetches:
+        fetch.exception()  # Waits for it, without raising.
+    _put(pages, _DONE, stop)
+
+
+def _put(pages, item, stop):
+    """Puts item on the pages queue, waiting while it's full, unless stop is
+    set in the meantime.
+    """
+    while not stop.is_set():
+        try:
+            pages.put(item, timeout=_PUT_TIMEOUT)
+            return
+        except queue.Full:
+            pass
+
+
+def _process_context():
+    """Returns the multiprocessing context parser processes are started in.
+
+    Fetch threads are already running (and may hold locks, e.g. in requests
+    or selenium) by the time the first page is parsed, so parser processes
+    aren't forked from this one: they're started by a forkserver where
+    there is one (Linux, macOS), and spawned otherwise.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context(
+        "forkserver" if "forkserver" in methods else "spawn"
+    )
+
+
+def _parse_page_source(page_source, **soup_kwargs):
+    """Parses a page into tuples of listing fields (in ListingBatch.FIELDS
+    order). Runs in a parser process.
+    """
+    page_soup = _make_soup(page_source, **soup_kwargs)
+    return [
+        tuple(getattr(listing, field) for field in ListingBatch.FIELDS)
+        for listing in _page_soup_to_listings(page_soup)
+    ]
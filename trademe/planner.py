@@ -0,0 +1,345 @@
+"""Contains plan_searches() and planned_search(), for merging overlapping
+searches.
+
+Given a batch of search criteria (make_url() arguments), searches covered by
+a broader one in the batch (e.g. a suburb, when its district's being
+searched too, or 3+ bedrooms, when 2+ bedrooms is) aren't fetched at all:
+their listings are filtered out of the broader search's locally.
+
+What can be filtered locally:
+- Location, from listings' links (e.g. ".../wellington/wellington/newtown/
+  listing/...").
+- Bedroom and bathroom ranges, from listings' features. Listings without a
+  number of bedrooms/bathrooms are left out of narrower ranges.
+Every other argument (price ranges, property_type, search_string, etc.) has to
+match exactly for one search to cover another. Price ranges especially can't
+be filtered locally, since lots of listings ("Deadline sale", "Enquiries
+over...") don't show the price TradeMe filters on.
+
+Nothing's merged into a search too big for TradeMe to paginate all the way
+through (see sharding.py): it'd lose listings the narrower searches would've
+found on their own. planned_search() checks the result count of every search
+others are merged into, and searches their criteria separately instead if
+it's too big.
+"""
+
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from .constants import (
+    BEDROOMS_PATTERN, BATHROOMS_PATTERN, MAX_PAGINATED_RESULTS
+)
+from .search import (
+    make_url, _check_parser, _make_fetcher, _fetch_page, _get_result_count,
+    _search_url
+)
+
+
+LOCATION_ARGS = ("region", "district", "suburb")
+
+# Ranges that can be narrowed locally: name (as in name_min/name_max) ->
+# pattern finding the number in a listing's features.
+LOCAL_RANGES = {"bedrooms": BEDROOMS_PATTERN, "bathrooms": BATHROOMS_PATTERN}
+
+# Location in a listing's link: the three parts before "/listing/", whatever
+# comes before them, e.g.
+# ".../residential/sale/wellington/wellington/newtown/listing/3888296961" or
+# ".../new-homes/new-apartment/wellington/wellington/newtown/listing/...":
+LINK_LOCATION_PATTERN = re.compile(r"/([^/?]+)/([^/?]+)/([^/?]+)/listing/")
+
+
+class SearchPlan:
+    """The URLs to fetch for a batch of criteria, and how to split them up.
+
+    Usage:
+        plan = plan_searches(criteria)
+        results = [search(None, [], url) for url in plan.urls]
+        listings_per_criteria = plan.split(results)
+
+    Attributes:
+        criteria: List of criteria dicts, as given.
+        urls: URLs to fetch: one per criteria not covered by another.
+        merged_roots: Indices of the criteria whose URLs have narrower
+            criteria merged into them.
+    """
+
+    def __init__(self, criteria, too_big=()):
+        """
+        Args:
+            criteria: Iterable of dicts of make_url() arguments, e.g.
+                {"sale_or_rent": "rent", "region": "wellington",
+                "bedrooms_min": 2}.
+            too_big: Indices of criteria with too many results to paginate
+                through, which narrower criteria aren't merged into.
+        """
+        self.criteria = [dict(c) for c in criteria]
+        keys = [_CriteriaKey(c) for c in self.criteria]
+        # Duplicates of a search that's too big are too:
+        too_big = {
+            i for i, key in enumerate(keys)
+            if any(key.covers(keys[j]) and keys[j].covers(key)
+                   for j in too_big)
+        }
+
+        def can_merge(j, i):
+            """Checks criteria i can be filtered out of j's listings."""
+            return keys[j].covers(keys[i]) and \
+                (j not in too_big or keys[i].covers(keys[j]))
+
+        # Criteria nothing else covers (keeping the first of any duplicates):
+        roots = [
+            i for i, key in enumerate(keys)
+            if not any(
+                can_merge(j, i) and (j < i or not key.covers(other))
+                for j, other in enumerate(keys) if j != i
+            )
+        ]
+        self.urls = [make_url(**self.criteria[i]) for i in roots]
+
+        # For each criteria, (index of URL it's in, local filter or None).
+        # Covering is transitive (and duplicates of a search that's too big
+        # are too big too), so some root can always be merged into:
+        self._sources = []
+        for i, key in enumerate(keys):
+            url_index = next(
+                n for n, root in enumerate(roots) if can_merge(root, i)
+            )
+            root = keys[roots[url_index]]
+            self._sources.append((url_index, key.narrower_than(root)))
+
+        self.merged_roots = sorted({
+            roots[url_index] for url_index, matches in self._sources
+            if matches is not None
+        })
+
+
+    def __repr__(self):
+        return f"SearchPlan(<{len(self.criteria)} criteria, " \
+            f"{len(self.urls)} URLs>)"
+
+
+    def split(self, results):
+        """Splits each URL's listings back out to the criteria.
+
+        Args:
+            results: List of each URL's listings, in the same order as urls.
+
+        Returns:
+            A list of each criteria's listings, in the same order as criteria.
+        """
+        return [
+            list(results[url_index]) if matches is None
+            else [listing for listing in results[url_index]
+                  if matches(listing)]
+            for url_index, matches in self._sources
+        ]
+
+
+# Public methods: -------------------------------------------------------------
+
+
+def plan_searches(criteria, too_big=()):
+    """Merges a batch of search criteria into as few URLs as possible.
+
+    Args:
+        criteria: Iterable of dicts of make_url() arguments.
+        too_big: Indices of criteria with too many results to paginate
+            through, which nothing's merged into. planned_search() finds
+            these itself.
+
+    Returns:
+        A SearchPlan.
+    """
+    return SearchPlan(criteria, too_big=too_big)
+
+
+def planned_search(
+        criteria,
+        timeout=None,
+        driver_arguments=["--headless=new", "--start-maximized"],
+        pool=None,
+        max_workers=1,
+        fetcher="selenium",
+        prefetch=0,
+        parser="html.parser",
+        strain=False,
+        cache=None,
+        max_results=MAX_PAGINATED_RESULTS
+        ):
+    """Searches TradeMe for a batch of criteria, fetching as little as it can.
+
+    Each criteria gets the same listings it would from its own search (see
+    the module docstring for how), but only the URLs in plan_searches() are
+    fetched.
+
+    The first page of each search others are merged into is fetched first,
+    for its result count (and kept, so it isn't fetched again when that
+    search is paginated). If that's over max_results (TradeMe stops
+    paginating there), the criteria merged into it are planned again without
+    it, so they're searched on their own, or merged into a smaller search.
+    Searches without a result count on their first page are assumed to be
+    small enough. A criteria that's too big on its own still loses the
+    listings past max_results, just like its own search would; use
+    sharded_search() for those.
+
+    Args:
+        criteria: Iterable of dicts of make_url() arguments.
+        timeout: Most seconds the Selenium webdriver under the hood waits for
+            each page's listings (or "No results found") to show up.
+        driver_arguments: The arguments set for the webdriver.
+        pool: An optional DriverPool to borrow webdrivers from; see search().
+        max_workers: Number of URLs searched at once; see search().
+        fetcher: "selenium", "http", or a Fetcher instance; see search().
+        prefetch: Number of pages of each URL fetched at once; see search().
+        parser: The BeautifulSoup parser used for pages; see search().
+        strain: If True, only parse the parts of pages needed; see search().
+        cache: An optional PageCache, or directory, to read pages through.
+        max_results: Most results TradeMe paginates through.
+
+    Returns:
+        A list of lists of Listings: one per criteria, in the same order.
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1.")
+    _check_parser(parser)
+
+    criteria = [dict(c) for c in criteria]
+    plan = plan_searches(criteria)
+    fetcher, own_fetcher = _make_fetcher(
+        fetcher,
+        pool=pool,
+        workers=min(max_workers, max(len(criteria), 1)) * max(prefetch, 1),
+        timeout=timeout,
+        driver_arguments=driver_arguments,
+        cache=cache
+    )
+
+    first_fetches = {}  # URL -> _fetch_page() of its first page.
+
+    def result_count(i):
+        url = make_url(**criteria[i])
+        first_fetches[url] = _fetch_page(
+            fetcher, url, parser=parser, strain=strain
+        )
+        first_soup = first_fetches[url][1]
+        return None if first_soup is None else _get_result_count(first_soup)
+
+    def search_url(url):
+        return _search_url(
+            url, fetcher, prefetch=prefetch, parser=parser, strain=strain,
+            first_fetch=first_fetches.get(url)
+        )
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Re-plan until nothing's merged into a search that's too big
+            # (each pass counts at least one more search, so this ends):
+            counts = {}
+            while True:
+                unchecked = [
+                    i for i in plan.merged_roots if i not in counts
+                ]
+                if not unchecked:
+                    break
+                counts.update(zip(unchecked,
+                                  executor.map(result_count, unchecked)))
+                plan = plan_searches(criteria, too_big=[
+                    i for i, count in counts.items()
+                    if count is not None and count > max_results
+                ])
+            results = list(executor.map(search_url, plan.urls))
+    finally:
+        if own_fetcher: fetcher.close()
+
+    return plan.split(results)
+
+
+# Private helper methods: -----------------------------------------------------
+
+
+class _CriteriaKey:
+    """Criteria, normalised so they can be compared."""
+    __slots__ = ("sale_or_rent", "location", "ranges", "exact")
+
+    def __init__(self, criteria):
+        criteria = dict(criteria)
+        self.sale_or_rent = criteria.pop("sale_or_rent").lower()
+        # Capitalisation doesn't matter to TradeMe:
+        self.location = tuple(
+            str(criteria.pop(arg, "") or "").lower() for arg in LOCATION_ARGS
+        )
+        # name -> (min, max), with None for no bound:
+        self.ranges = {
+            name: (_to_int(criteria.pop(f"{name}_min", None)),
+                   _to_int(criteria.pop(f"{name}_max", None)))
+            for name in LOCAL_RANGES
+        }
+        # Everything else has to match exactly:
+        self.exact = frozenset(
+            (arg, str(value).lower()) for arg, value in criteria.items()
+        )
+
+
+    def covers(self, other):
+        """Checks every listing other finds, this finds too."""
+        if self.sale_or_rent != other.sale_or_rent or self.exact != other.exact:
+            return False
+        if ("adjacent_suburbs", "true") in self.exact and \
+                self.location != other.location:
+            # Adjacent suburbs can be anywhere, so can't be filtered locally.
+            return False
+        if any(part and part != other_part
+               for part, other_part in zip(self.location, other.location)):
+            return False
+        for name, (low, high) in self.ranges.items():
+            other_low, other_high = other.ranges[name]
+            if low is not None and (other_low is None or other_low < low):
+                return False
+            if high is not None and (other_high is None or other_high > high):
+                return False
+        return True
+
+
+    def narrower_than(self, root):
+        """Returns a function filtering root's listings down to this one's.
+
+        Only checks what's narrower than root (what TradeMe hasn't already
+        filtered), or returns None if nothing is.
+        """
+        location_checks = [
+            (i, part) for i, (part, root_part)
+            in enumerate(zip(self.location, root.location))
+            if part != root_part
+        ]
+        range_checks = [
+            (LOCAL_RANGES[name], low, high)
+            for name, (low, high) in self.ranges.items()
+            if (low, high) != root.ranges[name]
+        ]
+        if not location_checks and not range_checks:
+            return None
+
+        def matches(listing):
+            if location_checks:
+                match = LINK_LOCATION_PATTERN.search(listing.link or "")
+                if match is None:
+                    return False
+                location = [part.lower() for part in match.groups()]
+                if any(location[i] != part for i, part in location_checks):
+                    return False
+            for pattern, low, high in range_checks:
+                match = pattern.search(listing.features or "")
+                if match is None:
+                    return False
+                number = int(match.group(1))
+                if (low is not None and number < low) or \
+                        (high is not None and number > high):
+                    return False
+            return True
+
+        return matches
+
+
+def _to_int(value):
+    return None if value is None else int(value)
@@ -2,14 +2,68 @@
 """
 
 
+import math
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse, parse_qs, urlencode
 
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver import ChromeOptions
-
-from .constants import SUPER_FEATURE_TAG, PREMIUM_TAG, NORMAL_TAG
-from .listing import Listing
+from bs4 import BeautifulSoup, SoupStrainer
+
+from .constants import (
+    SUPER_FEATURE_TAG, PREMIUM_TAG, NORMAL_TAG, LISTING_TAGS, NO_RESULTS_TAG,
+    NO_RESULTS_CLASS, RESULT_COUNT_TAG, RESULT_COUNT_CLASS,
+    MAX_PAGINATED_RESULTS
+)
+from .cache import CachingFetcher, PageCache
+from .checkpoint import Checkpoint
+from .dedupe import Deduplicator
+from .fetchers import Fetcher, HTTPFetcher, SeleniumFetcher
+from .listing import Listing, ListingBatch
+from .metrics import COUNT_BUCKETS, time_stage
+from .throttle import ConcurrencyController, RateLimiter, ThrottledFetcher
+
+
+PARSERS = ("html.parser", "lxml", "html5lib")
+
+# Only the tags search() reads: listing cards, and the headings with "No 
+# results found" and the result count in them.
+_PAGE_STRAINER = SoupStrainer(
+    LISTING_TAGS + [NO_RESULTS_TAG, RESULT_COUNT_TAG]
+)
+_NO_RESULTS_STRAINER = SoupStrainer(NO_RESULTS_TAG)
+
+
+# The "No results found" heading, found in raw page source (comments allowed
+# around the text), so pages can be checked without being parsed. Headings it
+# doesn't recognise (e.g. other markup inside them) are left to
+# _check_page_source()'s fallback:
+_NO_RESULTS_PATTERN = re.compile(
+    rf'<{NO_RESULTS_TAG}\b[^>]*\bclass="[^"]*\b{NO_RESULTS_CLASS}\b[^"]*"'
+    r'[^>]*>(?:\s|<!--.*?-->)*no results found',
+    re.IGNORECASE | re.DOTALL
+)
+
+# Any listing card's opening tag, found in raw page source. The lookahead
+# stops it matching longer tag names (e.g. tm-property-search-card-listing-
+# title, which is inside every card anyway):
+_LISTING_TAG_PATTERN = re.compile(
+    rf"<(?:{'|'.join(map(re.escape, LISTING_TAGS))})[\s>/]"
+)
+
+
+_LISTING_CONSTRUCTORS = {
+    SUPER_FEATURE_TAG: Listing.from_super_feature,
+    PREMIUM_TAG: Listing.from_premium_listing,
+    NORMAL_TAG: Listing.from_normal_listing,
+}
+
+# Listing types, as labelled in CrawlStats' "cards" counter:
+_CARD_TYPES = {
+    SUPER_FEATURE_TAG: "super_feature",
+    PREMIUM_TAG: "premium",
+    NORMAL_TAG: "normal",
+}
 
 
 # Public methods: -------------------------------------------------------------
@@ -18,46 +72,220 @@ from .listing import Listing
 def search(
         timeout=None, 
         driver_arguments=["--headless=new", "--start-maximized"], 
-        *urls
+        *urls,
+        pool=None,
+        max_workers=1,
+        fetcher="selenium",
+        prefetch=0,
+        parser="html.parser",
+        strain=False,
+        batch=False,
+        sink=None,
+        cache=None,
+        dedupe=False,
+        rate_limit=None,
+        retries=0,
+        resume=None,
+        stats=None
         ):
     """Searches TradeMe using URLs. 
     
     For each URL, search() paginates until it can't find any more listings, 
     then returns.
     
-    Note: search() uses a Chrome webdriver, so it's recommended you have 
-    the relevant Chrome drivers downloaded in advance.
+    Note: by default search() uses a Chrome webdriver, so it's recommended you
+    have the relevant Chrome drivers downloaded in advance.
 
     Args:
-        timeout: The implicit wait used (in seconds) for the Selenium webdriver
-            under the hood.
+        timeout: Most seconds the Selenium webdriver under the hood waits for
+            each page's listings (or "No results found") to show up.
         driver_arguments: The arguments set for the webdriver.
         *urls: URL strings to be treated as the first page of a set of search
             results, which search() will paginate over.
+        pool: An optional DriverPool to borrow webdrivers from. If given, 
+            timeout and driver_arguments are ignored (the pool has its own), 
+            and the pool is left open so it can be reused. Otherwise, search() 
+            starts one driver per worker and quits them when done.
+        max_workers: Number of URLs searched at once, each in its own thread
+            with its own webdriver. Threads (rather than processes) are used 
+            because workers spend nearly all their time waiting on pages.
+        fetcher: How pages are fetched:
+            - "selenium" (default): render every page in Chrome.
+            - "http": plain HTTP requests over pooled connections, falling back
+              to Chrome for pages that need JavaScript to show listings.
+            - A Fetcher instance, which is left open once search() returns.
+        prefetch: Number of pages of each URL fetched at once. With the 
+            default of 0, each page is only fetched once the previous one's 
+            been checked for results. Otherwise, search() reads the total 
+            number of results off the first page and fetches the rest of the
+            pages concurrently, speculatively fetching `prefetch` pages ahead
+            if it can't tell how many pages there are.
+        parser: The BeautifulSoup parser used for pages: "html.parser" (the
+            default, built into Python), "lxml" (much faster; needs lxml 
+            installed), or "html5lib" (slowest; needs html5lib installed).
+        strain: If True, only listing cards and the headings search() needs 
+            are parsed, instead of the whole page. Ignored by html5lib.
+        batch: If True, return a ListingBatch instead of a list; much more
+            memory-efficient for big searches.
+        sink: An optional Sink (e.g. CSVSink) each page's listings are written
+            to as soon as the page is scraped, and flushed (unless it's a
+            sink that only flushes full buffers, like ParquetSink), so
+            they're kept even if the search fails. The sink is left open. To
+            avoid keeping every listing in memory as well, use iter_search()
+            instead.
+        cache: An optional PageCache (or a directory to keep one in) pages are
+            read through, so pages fetched recently aren't fetched again.
+        dedupe: If True, each listing (by listing ID) is only returned the 
+            first time it's scraped, and pages already scraped (e.g. because
+            URLs repeat) aren't fetched again. Pass a Deduplicator instead to
+            share what's been seen between searches.
+        rate_limit: Optional most pages fetched per second (per host), across
+            all workers. If given, the number of pages fetched at once is also
+            lowered automatically when fetches fail or slow down.
+        retries: Number of times a failed fetch (an error, or a page without
+            listings or a "No results found" message, like a block page) is 
+            retried, with exponential backoff.
+        resume: Optional path of a checkpoint journal (or a Checkpoint). Each
+            page's listings are journalled there as it's scraped; re-running 
+            a search that died with the same path skips the URLs and pages
+            it already got through.
+        stats: An optional CrawlStats, filled in with how long each stage
+            of the search took, and counts of pages, cards and fields, as the
+            search runs. See metrics.py. A pool without stats of its own
+            times Chrome starting up in these.
 
     Returns:
-        A list of Listing objects.
+        A list of Listing objects (or a ListingBatch), in the same order as 
+        *urls.
     """
-    # Get BeautifulSoups for each page of each URL:
-    all_soups = []  # Stores lists of BeautifulSoups for each URL in *urls.
-    for url in urls:
-        soups = _get_page_soups(
-            url, 
-            timeout=timeout, 
-            driver_arguments=driver_arguments
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1.")
+    if prefetch < 0:
+        raise ValueError("prefetch can't be negative.")
+    _check_parser(parser)
+
+    fetcher, own_fetcher = _make_fetcher(
+        fetcher, 
+        pool=pool, 
+        # Each worker fetches up to `prefetch` pages at once:
+        workers=min(max_workers, max(len(urls), 1)) * max(prefetch, 1), 
+        timeout=timeout, 
+        driver_arguments=driver_arguments,
+        cache=cache,
+        rate_limit=rate_limit,
+        retries=retries,
+        stats=stats
+    )
+
+    deduplicator = _make_deduplicator(dedupe)
+    checkpoint, own_checkpoint = _make_checkpoint(resume)
+
+    def search_url(url):
+        return _search_url(
+            url, fetcher, sink=sink, deduplicator=deduplicator, 
+            checkpoint=checkpoint, prefetch=prefetch, parser=parser, 
+            strain=strain, stats=stats
         )
-        all_soups.append(soups)
 
-    # Use the right constructors to make listings 
-    # This for loop is band-aid code, ideally this is map() or list comp:
-    all_listings = []
-    for url_soups in all_soups:
-        for page_soup in url_soups:
-            all_listings.extend(_page_soup_to_listings(page_soup))
+    all_listings = ListingBatch() if batch else []
+
+    # Search each URL, converting pages to listings as we go:
+    try:
+        if max_workers == 1:
+            for url in urls:
+                all_listings.extend(search_url(url))
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                # map() keeps results in the same order as urls:
+                for listings in executor.map(search_url, urls):
+                    all_listings.extend(listings)
+    finally:
+        if own_fetcher: fetcher.close()
+        if own_checkpoint: checkpoint.close()
 
     return all_listings
 
 
+def iter_search(
+        *urls,
+        timeout=None,
+        driver_arguments=["--headless=new", "--start-maximized"],
+        pool=None,
+        fetcher="selenium",
+        prefetch=0,
+        parser="html.parser",
+        strain=False,
+        sink=None,
+        cache=None,
+        dedupe=False,
+        rate_limit=None,
+        retries=0,
+        resume=None,
+        stats=None
+        ):
+    """Like search(), but yields Listings page by page as they're scraped.
+
+    Each page is turned into listings as soon as it's loaded, and its 
+    BeautifulSoup is dropped straight after, so memory doesn't grow with the
+    number of pages. URLs are searched one after another.
+
+    Args:
+        *urls: URL strings to be treated as the first page of a set of search
+            results, which iter_search() will paginate over.
+        timeout: Most seconds the Selenium webdriver under the hood waits for
+            each page's listings (or "No results found") to show up.
+        driver_arguments: The arguments set for the webdriver.
+        pool: An optional DriverPool to borrow webdrivers from; see search().
+        fetcher: "selenium", "http", or a Fetcher instance; see search().
+        prefetch: Number of pages of each URL fetched at once; see search().
+        parser: The BeautifulSoup parser used for pages; see search().
+        strain: If True, only parse the parts of pages needed; see search().
+        sink: An optional Sink each page's listings are written (and maybe
+            flushed) to, before they're yielded; see search().
+        cache: An optional PageCache, or directory, to read pages through.
+        dedupe: If True (or a Deduplicator), skip listings and pages already
+            scraped; see search().
+        rate_limit: Optional most pages fetched per second; see search().
+        retries: Number of times a failed fetch is retried; see search().
+        resume: Optional checkpoint journal path, to pick up where a search
+            that died left off; see search().
+        stats: An optional CrawlStats to fill in; see search().
+
+    Yields:
+        Listing objects, in the same order search() would return them.
+    """
+    _check_parser(parser)
+
+    fetcher, own_fetcher = _make_fetcher(
+        fetcher, 
+        pool=pool, 
+        workers=max(prefetch, 1), 
+        timeout=timeout, 
+        driver_arguments=driver_arguments,
+        cache=cache,
+        rate_limit=rate_limit,
+        retries=retries,
+        stats=stats
+    )
+
+    deduplicator = _make_deduplicator(dedupe)
+    checkpoint, own_checkpoint = _make_checkpoint(resume)
+
+    try:
+        for url in urls:
+            pages = _iter_url_pages(
+                url, fetcher, sink=sink, deduplicator=deduplicator, 
+                checkpoint=checkpoint, prefetch=prefetch, parser=parser, 
+                strain=strain, stats=stats
+            )
+            for listings in pages:
+                yield from listings
+    finally:
+        # Also runs if the caller stops iterating early:
+        if own_fetcher: fetcher.close()
+        if own_checkpoint: checkpoint.close()
+
+
 def make_url(
         sale_or_rent: str, region: str = "", district: str = "",
         suburb: str = "", **kwargs
@@ -144,79 +372,380 @@ def make_url(
 # Private helper methods: -----------------------------------------------------
 
 
-def _page_soup_to_listings(page_soup):
-    """Converts a page result BeautifulSoup object to a list of Listings."""
-    listings = []
+def _make_fetcher(fetcher, pool, workers, timeout, driver_arguments, 
+                  cache=None, rate_limit=None, retries=0, stats=None):
+    """Turns search()'s fetcher argument into a Fetcher.
 
-    # Find listings: returns ResultSets
-    super_features = page_soup.find_all(SUPER_FEATURE_TAG)
-    premiums = page_soup.find_all(PREMIUM_TAG)
-    normals = page_soup.find_all(NORMAL_TAG)
+    If cache (a PageCache or directory) is given, the Fetcher reads through it.
+    If rate_limit or retries are, fetches that miss the cache are throttled
+    (see throttle.py). If stats (a CrawlStats) is, fetchers made here time
+    their stages in it; Fetcher instances are left as they are.
 
-    # Call constructors:
-    super_listings = [Listing.from_super_feature(s) for s in super_features]
-    premium_listings = [Listing.from_premium_listing(p) for p in premiums]
-    normal_listings = [Listing.from_normal_listing(n) for n in normals]
+    Returns:
+        A tuple of (Fetcher, whether the caller should close it).
+    """
+    # Closing a CachingFetcher or ThrottledFetcher just closes the fetcher it
+    # wraps, so they're owned by whoever owns that:
+    if cache is not None:
+        if not isinstance(cache, PageCache):
+            cache = PageCache(cache)
+        fetcher, own_fetcher = _make_fetcher(
+            fetcher, pool, workers, timeout, driver_arguments, 
+            rate_limit=rate_limit, retries=retries, stats=stats
+        )
+        return CachingFetcher(fetcher, cache), own_fetcher
+
+    if rate_limit is not None or retries:
+        fetcher, own_fetcher = _make_fetcher(
+            fetcher, pool, workers, timeout, driver_arguments, stats=stats
+        )
+        throttled_fetcher = ThrottledFetcher(
+            fetcher,
+            rate_limiter=RateLimiter(rate_limit) if rate_limit else None,
+            controller=ConcurrencyController(workers) if workers > 1 else None,
+            retries=retries
+        )
+        return throttled_fetcher, own_fetcher
+
+    if isinstance(fetcher, Fetcher):
+        return fetcher, False
+
+    if fetcher not in ("selenium", "http"):
+        raise ValueError("fetcher must be 'selenium', 'http' or a Fetcher.")
+
+    # Chrome only starts if a page is actually fetched with it, so it's cheap
+    # to set up as the HTTP fallback:
+    if pool is not None:
+        # The pool times Chrome starting up, so lend it stats if it's none:
+        if pool.stats is None: pool.stats = stats
+        selenium_fetcher = SeleniumFetcher(pool, stats=stats)
+    else:
+        selenium_fetcher = SeleniumFetcher(
+            size=workers, 
+            timeout=timeout, 
+            driver_arguments=driver_arguments,
+            stats=stats
+        )
+
+    if fetcher == "http":
+        http_fetcher = HTTPFetcher(
+            pool_maxsize=workers, 
+            fallback=selenium_fetcher,
+            stats=stats
+        )
+        return http_fetcher, True
+    return selenium_fetcher, True
+
+
+def _make_deduplicator(dedupe):
+    """Turns search()'s dedupe argument into a Deduplicator, or None."""
+    if isinstance(dedupe, Deduplicator):
+        return dedupe
+    return Deduplicator() if dedupe else None
+
+
+def _make_checkpoint(resume):
+    """Turns search()'s resume argument into a Checkpoint, or None.
+
+    Returns:
+        A tuple of (Checkpoint or None, whether the caller should close it).
+    """
+    if resume is None or isinstance(resume, Checkpoint):
+        return resume, False
+    return Checkpoint(resume), True
+
+
+def _check_parser(parser):
+    if parser not in PARSERS:
+        raise ValueError(f"parser must be one of {', '.join(PARSERS)}.")
 
-    # Append Listing objects to list;
-    listings.extend(super_listings)
-    listings.extend(premium_listings)
-    listings.extend(normal_listings)
 
+def _make_soup(page_source, parser="html.parser", strain=False):
+    """Parses page source into a BeautifulSoup.
+    
+    If strain, only the tags in _PAGE_STRAINER (and everything inside them) 
+    are built. html5lib doesn't support this, so parses the whole page anyway.
+    """
+    parse_only = _PAGE_STRAINER if strain and parser != "html5lib" else None
+    return BeautifulSoup(page_source, features=parser, parse_only=parse_only)
+
+
+def _search_url(url, fetcher, **page_kwargs):
+    """Paginates over a single URL, returning its listings.
+    
+    page_kwargs are passed on to _iter_url_pages().
+    """
+    listings = []
+    for page_listings in _iter_url_pages(url, fetcher, **page_kwargs):
+        listings.extend(page_listings)
+    return listings
+
+
+def _iter_url_pages(
+        url, fetcher, sink=None, deduplicator=None, checkpoint=None, 
+        stats=None, **page_kwargs
+        ):
+    """Paginates over a single URL, yielding each page's listings.
+    
+    If sink, each page's listings are written to it as they're scraped. If 
+    deduplicator, pages and listings it's already had are skipped. If 
+    checkpoint, pages are journalled to it, and pages it already has are 
+    yielded from it instead of being fetched (and aren't written to sink 
+    again). If stats (a CrawlStats), pages are timed and counted in it. 
+    page_kwargs are passed on to _iter_page_soups().
+    """
+    if deduplicator is not None:
+        page_kwargs["claim_page"] = deduplicator.claim_page
+
+    page_url = url
+    if checkpoint is not None:
+        last_page = None
+        for last_page, page_listings in checkpoint.pages(url):
+            if deduplicator is not None:
+                page_listings = deduplicator.filter(page_listings)
+            yield page_listings
+        if checkpoint.is_done(url):
+            return
+        if last_page is not None:
+            # Carry on after the last page journalled (pages are scraped in
+            # order, and only empty ones aren't journalled):
+            page_url = _get_page_url(url, last_page + 1)
+            page_kwargs.pop("first_fetch", None)  # Not this page's.
+
+    for page, page_soup in _iter_page_soups(page_url, fetcher, stats=stats, 
+                                            **page_kwargs):
+        page_listings = _page_soup_to_listings(page_soup, stats)
+        if checkpoint is not None: 
+            checkpoint.record_page(url, page, page_listings)
+        if deduplicator is not None:
+            page_listings = deduplicator.filter(page_listings)
+        if sink is not None: _write_page(sink, page_listings)
+        yield page_listings
+
+    if checkpoint is not None: checkpoint.record_done(url)
+
+
+def _write_page(sink, listings):
+    sink.write(listings)
+    # So a page is on disk as soon as it's scraped (if the sink wants that):
+    if sink.flush_every_page: sink.flush()
+
+
+def _page_soup_to_listings(page_soup, stats=None):
+    """Converts a page result BeautifulSoup object to a list of Listings.
+    
+    Listings are in the same order as on the page. If stats (a CrawlStats),
+    the constructors are timed, and cards counted by type.
+    """
+    if stats is None:
+        # Find every type of listing in one go, then use the right 
+        # constructor:
+        return [
+            _LISTING_CONSTRUCTORS[listing_soup.name](listing_soup)
+            for listing_soup in page_soup.find_all(LISTING_TAGS)
+        ]
+
+    with stats.timer("listings"):
+        listing_soups = page_soup.find_all(LISTING_TAGS)
+        listings = [
+            _LISTING_CONSTRUCTORS[listing_soup.name](listing_soup, stats)
+            for listing_soup in listing_soups
+        ]
+    for listing_soup in listing_soups:
+        stats.count("cards", type=_CARD_TYPES[listing_soup.name])
+    stats.observe("cards_per_page", len(listings), buckets=COUNT_BUCKETS)
     return listings
 
 
-def _get_page_soups(url,
-                    timeout=None, 
-                    driver_arguments=["--headless=new", "--start-maximized"]
-                    ) -> list[BeautifulSoup]:
-    """For a particular URL, will return a list of BeautifulSoup of each page. 
+def _iter_page_soups(
+        url, fetcher, prefetch=0, parser="html.parser", strain=False,
+        claim_page=None, stats=None, first_fetch=None
+        ):
+    """For a particular URL, will yield (page number, BeautifulSoup) for each
+    page. Page numbers are the page= of the URL each page was fetched from.
 
     Originally, getting page source was decouples from making BeautifulSoups of
     page results. However, because of how convenient it is to use .find() to 
-    check for the next page, I've made this method return BeautifulSoups 
+    check for the next page, I've made this method yield BeautifulSoups 
     instead.
     
     Args:
         url: URL of search (e.g. a single suburb search).
-        timeout: The implicit wait used (in seconds) for the Selenium webdriver
-            under the hood.
-        driver_arguents: Arguments for the webdriver.
+        fetcher: Fetcher used to get each page's source.
+        prefetch: If more than 0, pages are fetched concurrently - see
+            _iter_page_soups_prefetched().
+        parser: BeautifulSoup parser to use.
+        strain: Whether to only parse the tags in _PAGE_STRAINER.
+        claim_page: Optional function called with each page's URL before it's
+            fetched (e.g. Deduplicator.claim_page). If it returns False, the
+            page's already been scraped, so pagination stops.
+        stats: Optional CrawlStats pages are timed and counted in.
+        first_fetch: Optional (has_next_page, page_soup) from _fetch_page()
+            for url, if it's already been fetched (e.g. by the planner), so
+            it isn't fetched again.
     """
-    # Set up driver
-    options = ChromeOptions()
-    for driver_argument in driver_arguments:
-        options.add_argument(driver_argument)
-            
-    driver = webdriver.Chrome(options=options)
-
-    if timeout: driver.implicitly_wait(timeout)
+    if prefetch > 0:
+        yield from _iter_page_soups_prefetched(
+            url, fetcher, prefetch, claim_page=claim_page, stats=stats, 
+            first_fetch=first_fetch, parser=parser, strain=strain
+        )
+        return
 
     # Get source, and paginate
-    soups = []
     current_url = url  # current_url set to first page URL.
+    page = _get_page_number(url)
     has_next_page = True  # set True by default, but this doesn't mess it up.
     while has_next_page:
-        # Read source
-        driver.get(current_url)
-        page_source = driver.page_source
-        page_soup = BeautifulSoup(page_source, features="html.parser")
-
-        # Check if next page:
-        has_next_page = _has_next_page(page_soup)
-        
+        if claim_page is not None and not claim_page(current_url):
+            return  # Someone else has this page, and the ones after it.
+
+        # Read source, only parsing it if it has listings:
+        if first_fetch is not None:
+            has_next_page, page_soup = first_fetch
+            first_fetch = None
+        else:
+            has_next_page, page_soup = _fetch_page(
+                fetcher, current_url, stats=stats, parser=parser, 
+                strain=strain
+            )
+
         if has_next_page:
+            # Yielding page_soup down here because we don't want to return
+            # empty pages:
+            if page_soup is not None:
+                yield page, page_soup
+
             # If there IS a next page, change current_url for the next loop:
             current_url = _get_next_page_url(current_url)
+            page += 1
+
+
+def _iter_page_soups_prefetched(
+        url, fetcher, prefetch, claim_page=None, stats=None, first_fetch=None,
+        **soup_kwargs
+        ):
+    """Like _iter_page_soups(), but fetches pages concurrently.
+
+    The first page is fetched on its own. After that, at most `prefetch`
+    pages are in flight (fetching, or fetched but not yet yielded) at once,
+    so a slow consumer holds fetching up. If the first page shows the total
+    number of results, pages up to the last one that should have results
+    are kept `prefetch` ahead, then only one page ahead past it; with no
+    result count, pages are fetched speculatively, `prefetch` pages ahead.
+    Pages are yielded in order, and anything fetched past the "No results
+    found" page is thrown away.
+
+    Pagination stops at the first page claim_page() returns False for, if
+    given. stats is passed on to _fetch_page(), and soup_kwargs to 
+    _make_soup(). first_fetch is used for the first page, if given; see
+    _iter_page_soups().
+    """
+    if claim_page is not None and not claim_page(url):
+        return
+    if first_fetch is not None:
+        has_next_page, first_soup = first_fetch
+    else:
+        has_next_page, first_soup = _fetch_page(
+            fetcher, url, stats=stats, **soup_kwargs
+        )
+    if not has_next_page:
+        return
+
+    # Estimate the last page from the result count (TradeMe stops paginating
+    # at MAX_PAGINATED_RESULTS, whatever the count), and how many cards are on
+    # the first page. It doesn't matter if it's off: pages are fetched until
+    # one says "No results found" regardless.
+    first_page = _get_page_number(url)
+    last_page = first_page
+    if first_soup is not None:
+        result_count = _get_result_count(first_soup)
+        cards_per_page = len(first_soup.find_all(LISTING_TAGS))
+        if result_count and cards_per_page:
+            last_page = math.ceil(
+                min(result_count, MAX_PAGINATED_RESULTS) / cards_per_page
+            )
+        yield first_page, first_soup
+    # Speculate less once the last page should've been reached:
+    ahead = prefetch if last_page == first_page else 1
+
+    with ThreadPoolExecutor(max_workers=prefetch) as executor:
+        # (page number, future of _fetch_page()), in page order:
+        in_flight = deque()
+        next_page = first_page + 1
+        claimed = True  # Until a page someone else has is reached.
+        try:
+            while True:
+                while claimed and len(in_flight) < \
+                        (prefetch if next_page <= last_page else ahead):
+                    page_url = _get_page_url(url, next_page)
+                    if claim_page is not None and not claim_page(page_url):
+                        claimed = False
+                        break
+                    in_flight.append((next_page, executor.submit(
+                        _fetch_page, fetcher, page_url, stats=stats, 
+                        **soup_kwargs
+                    )))
+                    next_page += 1
+
+                if not in_flight:
+                    return
+                page, future = in_flight.popleft()
+                has_next_page, page_soup = future.result()
+                if not has_next_page:
+                    return
+                if page_soup is not None:
+                    yield page, page_soup
+        finally:
+            # Don't bother fetching pages that haven't been started yet:
+            for _, future in in_flight:
+                future.cancel()
+
+
+def _fetch_page(fetcher, url, stats=None, **soup_kwargs):
+    """Fetches a page, only parsing it if it's worth parsing.
+
+    If stats (a CrawlStats), the fetch and parse are timed, and the page's 
+    counted by kind.
+
+    Returns:
+        A tuple of (has_next_page, page_soup). page_soup is None if the page
+        is the "No results found" one, or has no listing cards.
+    """
+    with time_stage(stats, "fetch"):
+        page_source = fetcher.fetch(url)
+    has_next_page, has_listings = _check_page_source(page_source)
+    if not has_next_page:
+        if stats is not None: stats.count("pages", kind="no_results")
+        return False, None
+    if not has_listings:
+        if stats is not None: stats.count("pages", kind="empty")
+        return True, None
+    if stats is not None: stats.count("pages", kind="results")
+    with time_stage(stats, "parse"):
+        return True, _make_soup(page_source, **soup_kwargs)
+
+
+def _get_result_count(page_soup):
+    """Returns the total number of results shown on a page, or None."""
+    try:
+        heading = page_soup.find(RESULT_COUNT_TAG, class_=RESULT_COUNT_CLASS)
+        count = re.search(r"\d[\d,]*", heading.get_text())
+        return int(count.group().replace(",", ""))
+    except AttributeError:  # No heading, or no number in it.
+        return None
 
-            # Appending page_soup down here because we don't want to return
-            # empty pages:
-            soups.append(page_soup)
 
-    # Quit driver
-    driver.quit()
+def _get_page_number(url):
+    """Returns a search URL's page number (1 if it doesn't say)."""
+    return int(parse_qs(urlparse(url).query).get("page", [1])[0])
 
-    return soups
+
+def _get_page_url(url, page):
+    """Returns the URL of a particular page of a search."""
+    parsed = urlparse(url)
+    query_dict = parse_qs(parsed.query)
+    query_dict["page"] = [page]
+    return parsed._replace(query=urlencode(query_dict, doseq=True)).geturl()
 
 
 def _get_next_page_url(current_url):
@@ -245,11 +774,42 @@ def _has_next_page(page_soup):
     has_next_page = True
 
     try:
-        no_results = page_soup.find("h2", class_="tm-no-results__heading")
-        if "no results found" in no_results.string.lower():
+        no_results = page_soup.find(NO_RESULTS_TAG, class_=NO_RESULTS_CLASS)
+        if "no results found" in no_results.get_text().lower():
             has_next_page = False
-    except AttributeError:  # i.e. if doing None.string.lower()
+    except AttributeError:  # i.e. if doing None.get_text()
         pass  # keep has_next_page as True
 
     return has_next_page
 
+
+def _check_page_source(page_source):
+    """Checks raw page source for a next page and listing cards.
+
+    Pages with cards are only regex-scanned. Pages without them (the last 
+    page, or an empty one) that _NO_RESULTS_PATTERN doesn't match get a 
+    small soup of just their headings, for _has_next_page() to check, so an
+    oddly marked-up "No results found" still ends pagination.
+
+    Returns:
+        A tuple of (has_next_page, has_listings).
+    """
+    if _has_listings_source(page_source):
+        return _has_next_page_source(page_source), True
+    if not _has_next_page_source(page_source):
+        return False, False
+    headings_soup = BeautifulSoup(
+        page_source, "html.parser", parse_only=_NO_RESULTS_STRAINER
+    )
+    return _has_next_page(headings_soup), False
+
+
+def _has_next_page_source(page_source):
+    """Like _has_next_page(), but only regex-scans raw page source."""
+    return _NO_RESULTS_PATTERN.search(page_source) is None
+
+
+def _has_listings_source(page_source):
+    """Checks raw page source has any listing cards, without parsing."""
+    return _LISTING_TAG_PATTERN.search(page_source) is not None
+
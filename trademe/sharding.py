@@ -0,0 +1,267 @@
+"""Contains sharded_search(), for searches too big for TradeMe to paginate.
+
+TradeMe stops paginating after a certain number of results (pages past it just
+say "No results found"), so a big enough search silently loses listings.
+sharded_search() reads each search's result count off its first page, and
+splits any search with too many results into smaller ones (shards), until
+every shard can be paginated all the way through:
+- By location, if you pass the districts/suburbs to split into. If the
+  location shards' result counts add up to less than the search's (the
+  locations passed are missing some), the search is split by price band as
+  well, so the rest aren't lost.
+- Otherwise by price band, halving the band each time. Price bands miss
+  listings that don't show a price TradeMe can filter on (e.g. "Deadline
+  sale", "Enquiries over..."), so split by location where you can.
+Shards run in parallel, then their listings are merged and de-duplicated.
+"""
+
+
+import warnings
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from .constants import MAX_PAGINATED_RESULTS
+from .dedupe import Deduplicator
+from .search import (
+    make_url, _check_parser, _make_fetcher, _fetch_page, _get_result_count,
+    _get_page_url, _iter_page_soups, _page_soup_to_listings
+)
+
+
+# Where to first split a price band with no upper bound. Bands are then halved
+# (or, above this, doubled).
+FIRST_PRICE_SPLITS = {"sale": 1_000_000, "rent": 1_000}
+
+
+# Public methods: -------------------------------------------------------------
+
+
+def sharded_search(
+        *criteria,
+        max_results=MAX_PAGINATED_RESULTS,
+        locations=None,
+        timeout=None,
+        driver_arguments=["--headless=new", "--start-maximized"],
+        pool=None,
+        max_workers=1,
+        fetcher="selenium",
+        parser="html.parser",
+        strain=False,
+        cache=None
+        ):
+    """Searches TradeMe, splitting searches with too many results into shards.
+
+    Args:
+        *criteria: Dicts of make_url() arguments, e.g. {"sale_or_rent":
+            "sale", "region": "wellington"}.
+        max_results: Most results a search can have before it's split.
+        locations: Optional dict of the locations searches can be split
+            into: region -> dict of district -> list of suburbs, e.g.
+            {"wellington": {"wellington": ["newtown", "aro-valley"],
+            "lower-hutt": ["petone"]}}. A district can map to an empty list
+            if you only want to split into districts. Searches that can't be
+            split by location are split by price (which misses unpriced
+            listings), as are ones whose locations here don't add up to all
+            of their results.
+        timeout: Most seconds the Selenium webdriver under the hood waits for
+            each page's listings (or "No results found") to show up.
+        driver_arguments: The arguments set for the webdriver.
+        pool: An optional DriverPool to borrow webdrivers from; see search().
+        max_workers: Number of shards searched at once.
+        fetcher: "selenium", "http", or a Fetcher instance; see search().
+        parser: The BeautifulSoup parser used for pages; see search().
+        strain: If True, only parse the parts of pages needed; see search().
+        cache: An optional PageCache, or directory, to read pages through.
+
+    Returns:
+        A list of Listings, without duplicates. Listings are in the same order
+        as criteria, then shards (e.g. cheapest price band first).
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1.")
+    _check_parser(parser)
+
+    fetcher, own_fetcher = _make_fetcher(
+        fetcher,
+        pool=pool,
+        workers=max_workers,
+        timeout=timeout,
+        driver_arguments=driver_arguments,
+        cache=cache
+    )
+
+    # Shard key (position in the tree of shards, e.g. (0, 1, 0)) -> listings:
+    results = {}
+    # Key of a shard split by location -> _LocationSplit:
+    location_splits = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Future -> (shard key, criteria, locations it can be split into):
+            pending = {}
+
+            def submit(key, shard_criteria, shard_locations):
+                future = executor.submit(
+                    _search_shard, shard_criteria, fetcher, max_results,
+                    shard_locations, parser=parser, strain=strain
+                )
+                pending[future] = (key, shard_criteria, shard_locations)
+
+            for i, c in enumerate(criteria):
+                submit((i,), c, locations)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key, shard_criteria, shard_locations = pending.pop(future)
+                    listings, shards, result_count = future.result()
+                    if shards is None:
+                        results[key] = listings
+                    else:
+                        for i, shard in enumerate(shards):
+                            submit(key + (i,), shard, shard_locations)
+                        if _split_by_location(shard_criteria,
+                                              shard_locations or {}):
+                            location_splits[key] = _LocationSplit(
+                                shard_criteria, result_count, len(shards)
+                            )
+
+                    # Price band shards (never split by location again) for
+                    # a location split that's missing results:
+                    for shard_key, shard in _count_location_shard(
+                            location_splits, key, result_count):
+                        submit(shard_key, shard, None)
+    finally:
+        if own_fetcher: fetcher.close()
+
+    # Shards can overlap (e.g. adjacent suburbs), so de-duplicate:
+    return Deduplicator().filter(
+        listing for key in sorted(results) for listing in results[key]
+    )
+
+
+# Private helper methods: -----------------------------------------------------
+
+
+def _search_shard(criteria, fetcher, max_results, locations, **soup_kwargs):
+    """Searches one shard, unless it has too many results.
+
+    Returns:
+        A tuple of (listings, None, result count), or (None, list of smaller
+        shards' criteria, result count) if it has too many results. The
+        result count's None if the first page doesn't show it.
+    """
+    url = make_url(**criteria)
+    has_next_page, first_soup = _fetch_page(fetcher, url, **soup_kwargs)
+    if not has_next_page:
+        return [], None, 0
+
+    result_count = None if first_soup is None \
+        else _get_result_count(first_soup)
+    if result_count is not None and result_count > max_results:
+        shards = _split(criteria, locations)
+        if shards is not None:
+            return None, shards, result_count
+        warnings.warn(
+            f"{url} has {result_count} results, but can't be split any "
+            f"further, so some of its listings may be missing."
+        )
+
+    listings = [] if first_soup is None \
+        else _page_soup_to_listings(first_soup)
+    # First page's already fetched, so carry on from the second:
+    for _, page_soup in _iter_page_soups(_get_page_url(url, 2), fetcher,
+                                         **soup_kwargs):
+        listings.extend(_page_soup_to_listings(page_soup))
+    return listings, None, result_count
+
+
+class _LocationSplit:
+    """A shard split by location, whose location shards are being counted."""
+    __slots__ = ("criteria", "result_count", "num_shards", "uncounted",
+                 "counted")
+
+    def __init__(self, criteria, result_count, num_shards):
+        self.criteria = criteria
+        self.result_count = result_count
+        self.num_shards = num_shards
+        self.uncounted = num_shards
+        self.counted = 0  # None if any shard's count is unknown.
+
+
+def _count_location_shard(location_splits, key, result_count):
+    """Adds a shard's result count to its parent's, if it's a location split.
+
+    Once every location shard's counted, checks they add up to the parent's
+    result count. If not (the locations passed are missing some), warns, and
+    returns the parent's price band shards, to make up the difference.
+
+    Returns:
+        A list of (shard key, criteria) of shards to search too; usually
+        empty.
+    """
+    split = location_splits.get(key[:-1])
+    if split is None:
+        return []
+    split.uncounted -= 1
+    if split.counted is not None:
+        split.counted = None if result_count is None \
+            else split.counted + result_count
+    if split.uncounted > 0:
+        return []
+
+    del location_splits[key[:-1]]
+    if split.counted is None or split.counted >= split.result_count:
+        return []
+    price_shards = _split_by_price(split.criteria) or []
+    warnings.warn(
+        f"{make_url(**split.criteria)} has {split.result_count} results, but "
+        f"its locations only have {split.counted}, so "
+        + ("it's being split by price too." if price_shards
+           else "some of its listings may be missing.")
+    )
+    # Keyed after the location shards:
+    return [(key[:-1] + (split.num_shards + i,), shard)
+            for i, shard in enumerate(price_shards)]
+
+
+def _split(criteria, locations):
+    """Splits criteria into smaller shards, by location then price band.
+
+    Returns:
+        A list of criteria, or None if criteria can't be split.
+    """
+    return _split_by_location(criteria, locations or {}) or \
+        _split_by_price(criteria)
+
+
+def _split_by_location(criteria, locations):
+    region = criteria.get("region")
+    district = criteria.get("district")
+    if not region or criteria.get("suburb") or \
+            str(criteria.get("adjacent_suburbs", "")).lower() == "true":
+        return None
+    districts = locations.get(region.lower(), {})
+    if not district:
+        return [{**criteria, "district": d} for d in districts] or None
+    suburbs = districts.get(district.lower(), [])
+    return [{**criteria, "suburb": s} for s in suburbs] or None
+
+
+def _split_by_price(criteria):
+    low = int(criteria.get("price_min", 0))
+    high = criteria.get("price_max")
+
+    if high is None:
+        first_split = FIRST_PRICE_SPLITS[criteria["sale_or_rent"].lower()]
+        middle = max(first_split, low * 2)
+    else:
+        high = int(high)
+        if high <= low:
+            return None  # Can't split a single price.
+        middle = (low + high) // 2
+
+    lower_band = {**criteria, "price_min": low, "price_max": middle}
+    upper_band = {**criteria, "price_min": middle + 1}
+    if high is not None:
+        upper_band["price_max"] = high
+    else:
+        upper_band.pop("price_max", None)
+    return [lower_band, upper_band]
@@ -0,0 +1,169 @@
+"""Contains sinks, which write listings to disk as a search goes.
+
+Pass one to search() or iter_search() (sink=...) and listings are written as
+the search goes, so results never have to all sit in memory, and a search
+that dies halfway keeps what it got. Sinks append to existing output, so a
+crashed search can just be re-run into the same sink.
+
+How much a crash can lose depends on the sink: CSVSink flushes each page as
+soon as it's scraped, but ParquetSink only flushes when its buffer fills (or
+on close), since every flush is a whole part file. A crash loses whatever
+ParquetSink had buffered, up to buffer_size listings.
+"""
+
+
+import csv
+import io
+import os
+import threading
+from pathlib import Path
+
+from .listing import ListingBatch
+
+
+class Sink:
+    """Base class for sinks.
+
+    Listings passed to write() are buffered, and written out by flush() (or
+    automatically, every buffer_size listings). Subclasses implement
+    _write_rows(). Sinks are safe to share between search() workers.
+
+    Attributes:
+        flush_every_page: Whether search() flushes after every page, so each
+            page is on disk as soon as it's scraped. Otherwise only full
+            buffers (and close()) are flushed.
+    """
+    flush_every_page = True
+
+    def __init__(self, buffer_size=1000):
+        """
+        Args:
+            buffer_size: Number of listings buffered before they're written.
+        """
+        self.buffer_size = buffer_size
+        self._buffer = ListingBatch()
+        self._lock = threading.Lock()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    def write(self, listings):
+        """Buffers an iterable of Listings, flushing if the buffer's full."""
+        with self._lock:
+            self._buffer.extend(listings)
+            if len(self._buffer) >= self.buffer_size:
+                self._flush()
+
+
+    def flush(self):
+        """Writes buffered listings to disk."""
+        with self._lock:
+            self._flush()
+
+
+    def close(self):
+        """Flushes, then releases the output file."""
+        self.flush()
+
+
+    def _flush(self):
+        if len(self._buffer):
+            self._write_rows(self._buffer)
+            self._buffer = ListingBatch()
+
+
+    def _write_rows(self, batch):
+        """Durably writes a ListingBatch to disk."""
+        raise NotImplementedError
+
+
+class CSVSink(Sink):
+    """Appends listings to a CSV file, with a column per Listing field.
+
+    The header's only written if the file's new (or empty). Each flush is
+    written in one go then fsynced, so a crash loses at most the listings
+    buffered since the last flush.
+    """
+
+    def __init__(self, path, buffer_size=1000):
+        """
+        Args:
+            path: CSV file to append to; created if it doesn't exist.
+            buffer_size: Number of listings buffered before they're written.
+        """
+        super().__init__(buffer_size)
+        self.path = Path(path)
+        self._file = open(self.path, "a", newline="", encoding="utf-8")
+        self._needs_header = self._file.tell() == 0
+
+
+    def close(self):
+        super().close()
+        self._file.close()
+
+
+    def _write_rows(self, batch):
+        rows = io.StringIO()
+        writer = csv.writer(rows)
+        if self._needs_header:
+            writer.writerow(ListingBatch.FIELDS)
+            self._needs_header = False
+        writer.writerows(zip(*batch.columns.values()))
+
+        self._file.write(rows.getvalue())
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+
+class ParquetSink(Sink):
+    """Appends listings to a directory of Parquet files (needs pyarrow).
+
+    Each flush is written as its own part file (part-00000.parquet,
+    part-00001.parquet, ...), written to a temporary file first then renamed,
+    so part files are never half-written. Read them all back with e.g.
+    pandas.read_parquet(path).
+
+    search() doesn't flush it after every page (which would make a tiny part
+    file per page), so it's only written every buffer_size listings, and on
+    close(). Lower buffer_size to lose less to a crash.
+    """
+    flush_every_page = False
+
+    def __init__(self, path, buffer_size=10_000):
+        """
+        Args:
+            path: Directory to write part files to; created if it doesn't
+                exist. New part files are numbered after any already there.
+            buffer_size: Number of listings buffered before they're written.
+        """
+        import pyarrow  # Optional dependency, only needed here.
+
+        super().__init__(buffer_size)
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._schema = pyarrow.schema(
+            [(field, pyarrow.string()) for field in ListingBatch.FIELDS]
+        )
+        self._next_part = 1 + max(
+            (int(part.stem.split("-")[1])
+             for part in self.path.glob("part-*.parquet")),
+            default=-1
+        )
+
+
+    def _write_rows(self, batch):
+        import pyarrow
+        import pyarrow.parquet
+
+        table = pyarrow.table(batch.columns, schema=self._schema)
+        part = self.path / f"part-{self._next_part:05d}.parquet"
+        temp = part.with_suffix(".parquet.tmp")
+        pyarrow.parquet.write_table(table, temp)
+        os.replace(temp, part)  # Atomic, so readers never see half a part.
+        self._next_part += 1
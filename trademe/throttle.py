@@ -0,0 +1,268 @@
+"""Contains ThrottledFetcher, which paces and retries another fetcher's fetches.
+
+Three parts, all safe to share between search() workers:
+- RateLimiter: a token bucket per host, so pages are fetched at a steady rate
+  however many workers there are.
+- ConcurrencyController: limits how many fetches run at once, halving the
+  limit when fetches start failing or slowing down, and creeping back up
+  while they're healthy.
+- ThrottledFetcher: wraps a fetcher with both, and retries failed fetches
+  (including block pages, if it retries at all) with exponential backoff and
+  jitter.
+
+search() and iter_search() set these up with rate_limit=... and retries=...;
+for more control, pass ThrottledFetcher(...) as the fetcher.
+"""
+
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from .fetchers import Fetcher, _is_rendered
+
+
+class RateLimiter:
+    """Token bucket rate limiter, with a bucket per host."""
+
+    def __init__(self, rate, burst=1, per_host=None):
+        """
+        Args:
+            rate: Fetches per second allowed for each host.
+            burst: Most fetches a host can have all at once, after a lull.
+            per_host: Optional dict of host: rate, for hosts that need their
+                own rate, e.g. {"www.trademe.co.nz": 0.5}.
+        """
+        if rate <= 0:
+            raise ValueError("rate must be more than 0.")
+        self.rate = rate
+        self.burst = burst
+        self.per_host = {host.lower(): host_rate
+                         for host, host_rate in (per_host or {}).items()}
+
+        self._lock = threading.Lock()
+        self._buckets = {}  # host -> [tokens, time last topped up]
+
+
+    def acquire(self, url):
+        """Blocks until url's host can be fetched from again."""
+        host = urlparse(url).netloc.lower()
+        rate = self.per_host.get(host, self.rate)
+
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._buckets.setdefault(host, [self.burst, now])
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            # Take a token even if there isn't one, reserving the next one to
+            # come, so waiting doesn't need the lock:
+            bucket[0] -= 1
+            wait = -bucket[0] / rate if bucket[0] < 0 else 0
+
+        if wait:
+            time.sleep(wait)
+
+
+class ConcurrencyController:
+    """Adaptive limit on fetches at once (additive increase, multiplicative
+    decrease).
+
+    Every `window` fetches, the limit is halved if too many failed, or if
+    their mean latency rose past `latency_factor` times the best mean seen so
+    far (or past target_latency, if given). Otherwise, it goes up by one, up to
+    max_concurrency.
+    """
+
+    def __init__(
+            self,
+            max_concurrency,
+            min_concurrency=1,
+            max_error_rate=0.2,
+            target_latency=None,
+            latency_factor=2.0,
+            window=10
+            ):
+        """
+        Args:
+            max_concurrency: Most fetches at once; also the starting limit.
+            min_concurrency: The limit's never lowered below this.
+            max_error_rate: Fraction of failed fetches a window can have.
+            target_latency: Optional mean latency (in seconds) a window
+                shouldn't go over. If None, uses latency_factor instead.
+            latency_factor: How much slower than the best window so far a
+                window can be.
+            window: Number of fetches between adjustments.
+        """
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_error_rate = max_error_rate
+        self.target_latency = target_latency
+        self.latency_factor = latency_factor
+        self.window = window
+        self.limit = max_concurrency
+
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._latencies = []
+        self._errors = 0
+        self._best_latency = None
+
+
+    @contextmanager
+    def slot(self):
+        """Context manager holding a slot for one fetch, and timing it.
+
+        The fetch counts as failed if the with block raises.
+        """
+        self.acquire()
+        start = time.monotonic()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.release(time.monotonic() - start, ok)
+
+
+    def acquire(self):
+        """Blocks until a fetch can start."""
+        with self._condition:
+            while self._in_flight >= self.limit:
+                self._condition.wait()
+            self._in_flight += 1
+
+
+    def release(self, latency, ok=True):
+        """Records a finished fetch, adjusting the limit every window."""
+        with self._condition:
+            self._in_flight -= 1
+            self._latencies.append(latency)
+            if not ok: self._errors += 1
+            if len(self._latencies) >= self.window:
+                self._adjust()
+            self._condition.notify_all()
+
+
+    def _adjust(self):
+        error_rate = self._errors / len(self._latencies)
+        mean_latency = sum(self._latencies) / len(self._latencies)
+        self._latencies = []
+        self._errors = 0
+
+        if self.target_latency is not None:
+            too_slow = mean_latency > self.target_latency
+        else:
+            too_slow = self._best_latency is not None and \
+                mean_latency > self._best_latency * self.latency_factor
+        if error_rate <= self.max_error_rate:
+            # Only healthy windows count towards the best latency:
+            self._best_latency = mean_latency if self._best_latency is None \
+                else min(self._best_latency, mean_latency)
+
+        if error_rate > self.max_error_rate or too_slow:
+            self.limit = max(self.min_concurrency, self.limit // 2)
+        else:
+            self.limit = min(self.max_concurrency, self.limit + 1)
+
+
+class ThrottledFetcher(Fetcher):
+    """Wraps another fetcher, pacing its fetches and retrying failures.
+
+    A fetch fails if it raises, or returns a page with neither listing cards
+    nor a "No results found" message (e.g. a block or captcha page). Failed
+    fetches are retried up to `retries` times, waiting a random time (full
+    jitter) up to backoff * 2**attempt seconds, capped at max_backoff.
+    """
+
+    def __init__(
+            self,
+            fetcher,
+            rate_limiter=None,
+            controller=None,
+            retries=3,
+            backoff=1.0,
+            max_backoff=60.0
+            ):
+        """
+        Args:
+            fetcher: The Fetcher to wrap. Closed on close().
+            rate_limiter: Optional RateLimiter, waited on before each attempt.
+            controller: Optional ConcurrencyController each attempt takes a
+                slot from.
+            retries: Number of times a failed fetch is retried. Pages with
+                no listings and no "No results found" message (probably
+                block pages) only count as failures if this is more than 0;
+                otherwise they're passed on, like an unthrottled fetcher
+                would.
+            backoff: Base wait (in seconds) before retrying.
+            max_backoff: Longest wait before retrying.
+        """
+        self.fetcher = fetcher
+        self.rate_limiter = rate_limiter
+        self.controller = controller
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+
+    def fetch(self, url):
+        return self._fetch_with_retries(self.fetcher.fetch, url)
+
+
+    def fetch_conditional(self, url, etag=None, last_modified=None):
+        """Like HTTPFetcher.fetch_conditional(), with pacing and retries.
+
+        If the wrapped fetcher doesn't do conditional fetches, just fetches.
+        """
+        if not hasattr(self.fetcher, "fetch_conditional"):
+            return self.fetch(url), None, None
+        return self._fetch_with_retries(
+            self.fetcher.fetch_conditional, url, etag=etag,
+            last_modified=last_modified
+        )
+
+
+    def close(self):
+        self.fetcher.close()
+
+
+    def _fetch_with_retries(self, fetch, url, **kwargs):
+        for attempt in range(self.retries + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(url)
+            try:
+                return self._attempt(fetch, url, **kwargs)
+            except Exception as e:
+                if attempt == self.retries:
+                    raise RuntimeError(
+                        f"Couldn't fetch {url} after {attempt + 1} attempts."
+                    ) from e
+            time.sleep(random.uniform(
+                0, min(self.max_backoff, self.backoff * 2**attempt)
+            ))
+
+
+    def _attempt(self, fetch, url, **kwargs):
+        """Fetches once, raising if the fetch fails or (if retrying) gets a
+        block page.
+        """
+        slot = self.controller.slot() if self.controller is not None \
+            else _no_slot()
+        with slot:
+            result = fetch(url, **kwargs)
+            page_source = result[0] if isinstance(result, tuple) else result
+            if self.retries and page_source is not None and \
+                    not _is_rendered(page_source):
+                raise ValueError(f"{url} has no listings or no results "
+                                 f"message; probably a block page.")
+        return result
+
+
+# Private helper methods: -----------------------------------------------------
+
+
+@contextmanager
+def _no_slot():
+    yield